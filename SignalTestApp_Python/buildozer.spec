@@ -36,7 +36,7 @@ version = 1.0
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy,pillow,pandas,openpyxl,requests,matplotlib
+requirements = python3,kivy,pillow,numpy,pandas,openpyxl,requests,matplotlib
 
 # (str) Custom source folders for requirements
 # Sets custom source for any requirements with recipes
@@ -0,0 +1,236 @@
+# Burst and time-lapse capture module
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from kivy.clock import Clock
+from photo_encoder import encode_frame
+from worker_pool import get_worker_pool
+
+class BurstCapture:
+    """Take a photo every N seconds, or a burst of frames, each with the live reading
+    
+    Frames are grabbed on the UI thread and encoded in a process pool. Encoded
+    frames are cataloged and stored in batches by a single writer thread. A
+    frame holds a slot from grab until its row is written; while max_pending
+    slots are taken, capture ticks are skipped, so capture slows down to what
+    encoding and storage can sustain instead of queuing frames in memory.
+    """
+    
+    # Samples written per storage transaction
+    BATCH_SIZE = 10
+    
+    def __init__(self, camera_utils, signal_collector, storage_utils=None, location_service=None,
+                 max_pending=6, batch_size=BATCH_SIZE):
+        self.camera_utils = camera_utils
+        self.signal_collector = signal_collector
+        self.storage_utils = storage_utils
+        self.location_service = location_service
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.pending_count = 0
+        self.remaining = None
+        self.callback = None
+        self.location_description = None
+        self.stats = self._new_stats()
+        self._event = None
+        self._batch = []
+        self._encoding = set()
+        self._lock = threading.Lock()
+    
+    def _new_stats(self):
+        """Get zeroed capture counters"""
+        return {'captured': 0, 'saved': 0, 'failed': 0, 'throttled': 0}
+    
+    def _get_executor(self):
+        """Get the shared worker pool"""
+        return get_worker_pool()
+    
+    def is_running(self):
+        """Check if a burst or time-lapse is in progress"""
+        return self._event is not None
+    
+    def start(self, interval=0, count=None, callback=None):
+        """Start capturing
+        
+        Args:
+            interval (float): Seconds between frames; 0 takes one frame per
+                UI frame (burst)
+            count (int): Number of frames to take, or None to run until stop()
+            callback (callable): Called on the UI thread with get_stats() after
+                each stored batch
+        
+        Returns:
+            bool: False if already running or the camera is not initialized
+        """
+        if self.is_running() or not self.camera_utils.is_camera_active():
+            return False
+        
+        with self._lock:
+            self.stats = self._new_stats()
+        self.remaining = count
+        self.callback = callback
+        self._get_executor()
+        
+        # Reverse geocoding is a network call, so it is done once per run off the UI thread
+        if self.location_service:
+            self.writer.submit(self._refresh_location_description)
+        
+        self._event = Clock.schedule_interval(self._capture_tick, interval)
+        return True
+    
+    def stop(self):
+        """Stop capturing; frames already grabbed are still encoded and stored"""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        self.writer.submit(self._flush)
+    
+    def _refresh_location_description(self):
+        """Look up the address used for this run's overlays"""
+        try:
+            self.location_description = self.location_service.get_location_description()
+        except Exception as e:
+            print(f"Error getting location description: {e}")
+    
+    def _capture_tick(self, dt):
+        """Grab one frame and queue it for encoding"""
+        with self._lock:
+            if self.pending_count >= self.max_pending:
+                self.stats['throttled'] += 1
+                return
+            self.pending_count += 1
+        
+        frame = self.camera_utils.capture_frame()
+        if not frame:
+            self._release_slots(1)
+            return
+        
+        try:
+            signal_data = self.signal_collector.get_signal_data()
+            if self.location_service:
+                location = self.location_service.get_location()
+                signal_data.latitude = location['latitude']
+                signal_data.longitude = location['longitude']
+                signal_data.location_description = self.location_description or (
+                    f"{location['latitude']:.6f}, {location['longitude']:.6f}"
+                )
+            
+            capture_time = time.time()
+            signal_data.photo_path = self.camera_utils.new_photo_path(capture_time)
+            
+            # Raw bytes and a plain dict pickle cheaply to the worker process
+            pixels, size = frame
+            future = self._get_executor().submit(
+                encode_frame, bytes(pixels), size, signal_data.to_dict(),
+                signal_data.photo_path, self.camera_utils.get_thumbnail_path(signal_data.photo_path),
+                self.camera_utils.encoding
+            )
+        except Exception as e:
+            print(f"Error capturing burst frame: {e}")
+            self._release_slots(1)
+            return
+        
+        with self._lock:
+            self._encoding.add(future)
+        future.add_done_callback(
+            lambda f: self._on_frame_encoded(f, signal_data, capture_time)
+        )
+        
+        with self._lock:
+            self.stats['captured'] += 1
+        
+        if self.remaining is not None:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.stop()
+    
+    def _on_frame_encoded(self, future, signal_data, capture_time):
+        """Queue an encoded frame for the next storage batch"""
+        with self._lock:
+            self._encoding.discard(future)
+        try:
+            photo_path, thumbnail_path = future.result()
+        except Exception as e:
+            print(f"Error encoding burst frame: {e}")
+            self.camera_utils.discard_photo_path(signal_data.photo_path)
+            with self._lock:
+                self.stats['failed'] += 1
+            self._release_slots(1)
+            return
+        
+        with self._lock:
+            self._batch.append((signal_data, capture_time, thumbnail_path))
+            flush_due = self._flush_due()
+        
+        if flush_due:
+            self.writer.submit(self._flush)
+    
+    def _flush_due(self):
+        """Check if queued frames should be stored now (call with the lock held)
+        
+        Besides full batches, a partial batch is stored when capture is blocked
+        on slots, since those slots are only freed by storing.
+        """
+        return bool(self._batch) and (
+            len(self._batch) >= self.batch_size
+            or self.pending_count >= self.max_pending
+            or not self.is_running()
+        )
+    
+    def _flush(self):
+        """Catalog and store queued frames in one batch (writer thread)"""
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if not batch:
+            return
+        
+        signal_data_list = [signal_data for signal_data, _, _ in batch]
+        try:
+            # Catalog first so the sample insert listener can link each photo
+            if self.camera_utils.photo_catalog:
+                self.camera_utils.photo_catalog.add_photos([
+                    (signal_data.photo_path, capture_time, thumbnail_path, None)
+                    for signal_data, capture_time, thumbnail_path in batch
+                ])
+            
+            saved = True
+            if self.storage_utils:
+                saved = self.storage_utils.insert_signal_data_batch(signal_data_list)
+        except Exception as e:
+            print(f"Error storing burst frames: {e}")
+            saved = False
+        
+        with self._lock:
+            self.stats['saved' if saved else 'failed'] += len(batch)
+        self._release_slots(len(batch))
+        
+        if self.callback:
+            stats = self.get_stats()
+            Clock.schedule_once(lambda dt: self.callback(stats))
+    
+    def _release_slots(self, count):
+        """Free capture slots"""
+        with self._lock:
+            self.pending_count -= count
+    
+    def get_stats(self):
+        """Get counters of the current or last run"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = self.pending_count
+        stats['running'] = self.is_running()
+        return stats
+    
+    def shutdown(self):
+        """Stop capturing and finish storing frames already grabbed"""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        # The pool is shared, so only this run's frames are waited for
+        with self._lock:
+            encoding = list(self._encoding)
+        wait(encoding)
+        self.writer.submit(self._flush)
+        self.writer.shutdown(wait=True)
@@ -1,20 +1,43 @@
 # Camera functionality module
 
 import os
+import time
 import platform
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from kivy.graphics.texture import Texture
 from kivy.core.image import Image as CoreImage
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
+from profiler import timed
+from photo_overlay import OverlayCompositor
+from photo_encoder import (
+    THUMBNAIL_SIZE, DEFAULT_ENCODING, FORMAT_EXTENSIONS, frame_to_image, save_thumbnail,
+    save_image, get_extension
+)
 
 class CameraUtils:
     """Camera utilities for taking photos and overlaying signal info"""
     
-    def __init__(self, app=None):
+    # Thumbnails fit in this box and live in a subdirectory next to the photos
+    THUMBNAIL_SIZE = THUMBNAIL_SIZE
+    THUMBNAIL_DIRECTORY = '.thumbnails'
+    
+    # Camera capture resolution used unless configured otherwise
+    DEFAULT_RESOLUTION = (640, 480)
+    
+    def __init__(self, app=None, resolution=DEFAULT_RESOLUTION, encoding=None):
         self.app = app
         self.camera = None
+        self.resolution = tuple(resolution)
+        self.encoding = dict(DEFAULT_ENCODING, **(encoding or {}))
         self.is_android = platform.system() == 'Android'
         self.photo_directory = self._get_photo_directory()
+        self.overlay_compositor = OverlayCompositor()
+        self.photo_catalog = None
+        self._thumbnail_executor = None
+        self._thumbnail_requests = {}
+        self._thumbnail_lock = threading.Lock()
     
     def _get_photo_directory(self):
         """Get directory for storing photos"""
@@ -38,103 +61,174 @@ class CameraUtils:
         return app_dir
     
     def initialize_camera(self):
-        """Initialize camera"""
+        """Open the camera and start streaming, restarting a warm instance if there is one"""
         try:
-            from kivy.uix.camera import Camera
-            self.camera = Camera(play=True, resolution=(640, 480))
+            if self.camera is None:
+                from kivy.uix.camera import Camera
+                self.camera = Camera(play=True, resolution=self.resolution)
+            else:
+                self.camera.play = True
             return True
         except Exception as e:
             print(f"Error initializing camera: {e}")
             return False
     
+    def stop_camera(self):
+        """Stop streaming frames but keep the camera open for a quick restart"""
+        if self.camera:
+            self.camera.play = False
+    
+    def release_camera(self):
+        """Stop streaming and release the camera device"""
+        camera = self.camera
+        if camera is None:
+            return
+        self.camera = None
+        
+        try:
+            camera.play = False
+            if camera.parent:
+                camera.parent.remove_widget(camera)
+            
+            # Stopping only halts the preview; the Android provider frees the device here
+            core_camera = getattr(camera, '_camera', None)
+            release = getattr(core_camera, '_release_camera', None)
+            if release:
+                release()
+        except Exception as e:
+            print(f"Error releasing camera: {e}")
+    
+    def is_camera_active(self):
+        """Check if the camera is open and streaming"""
+        return bool(self.camera and self.camera.play)
+    
+    def set_resolution(self, resolution):
+        """Set capture resolution; an open camera is reopened to apply it"""
+        self.resolution = tuple(resolution)
+        if self.camera:
+            was_active = self.is_camera_active()
+            self.release_camera()
+            if was_active:
+                return self.initialize_camera()
+        return True
+    
+    def set_encoding(self, **encoding):
+        """Update photo encoding options (format, quality, optimize, progressive, method)"""
+        self.encoding.update(encoding)
+    
+    @timed('camera')
     def take_photo(self, signal_data):
         """Take photo and overlay signal information"""
-        if not self.camera:
+        if not self.is_camera_active():
             print("Camera not initialized")
             return None
         
+        frame = self.capture_frame()
+        if not frame:
+            print("No camera texture available")
+            return None
+        
+        return self.save_photo(frame, signal_data)
+    
+    @timed('camera')
+    def capture_frame(self):
+        """Grab the current camera frame as (pixels, size)
+        
+        Reads the GL texture, so it must be called on the UI thread. The pixels
+        are a read-only memoryview over the texture read-back, so handing the
+        frame to a worker never copies it.
+        """
         try:
-            # Get current time for filename
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"signal_test_{timestamp}.jpg"
-            filepath = os.path.join(self.photo_directory, filename)
-            
-            # Take photo
-            texture = self.camera.texture
+            texture = self.camera.texture if self.camera else None
             if texture:
-                # Save texture to image
-                pixels = texture.pixels
-                size = texture.size
-                
-                # Create PIL image
-                image = Image.frombytes('RGBA', size, pixels)
-                image = image.convert('RGB')  # Convert to RGB
-                
-                # Overlay signal information
-                self._overlay_signal_info(image, signal_data)
-                
-                # Save image
-                image.save(filepath)
-                print(f"Photo saved to: {filepath}")
-                
-                # Update signal data with photo path
-                signal_data.photo_path = filepath
-                
-                return filepath
-            else:
-                print("No camera texture available")
-                return None
-                
+                return memoryview(texture.pixels), texture.size
+            return None
         except Exception as e:
-            print(f"Error taking photo: {e}")
+            print(f"Error capturing frame: {e}")
             return None
     
-    def _overlay_signal_info(self, image, signal_data):
-        """Overlay signal information on image"""
+    @timed('camera')
+    def save_photo(self, frame, signal_data):
+        """Overlay signal information on a captured frame and save it
+        
+        Does not touch Kivy objects, so it is safe to call from a worker thread.
+        """
+        filepath = None
         try:
-            draw = ImageDraw.Draw(image)
+            capture_time = time.time()
+            filepath = self.new_photo_path(capture_time)
             
-            # Try to load a font, fallback to default if not available
-            try:
-                font = ImageFont.truetype('arial', 12)
-            except Exception:
-                font = ImageFont.load_default()
+            image = self._frame_to_image(frame)
             
-            # Prepare signal info text
-            info_lines = [
-                f"Network: {signal_data.network_type}",
-                f"Operator: {signal_data.operator}",
-                f"Signal: {signal_data.get_signal_strength()} dBm",
-                f"Quality: {signal_data.get_signal_quality()}",
-                f"PCI: {signal_data.pci or signal_data.nr_pci}",
-                f"Band: {signal_data.band or signal_data.nr_band}",
-                f"Location: {signal_data.location_description}",
-                f"Time: {signal_data.timestamp}"
-            ]
+            # Overlay signal information
+            self._overlay_signal_info(image, signal_data)
             
-            # Calculate text position (bottom left corner)
-            x = 10
-            y = image.height - 10 - len(info_lines) * 15
+            # Save image with the reading embedded as metadata
+            save_image(image, filepath, dict(signal_data.to_dict(), photo_path=filepath), self.encoding)
+            print(f"Photo saved to: {filepath}")
             
-            # Draw semi-transparent background
-            box_height = len(info_lines) * 15 + 10
-            box_width = max([draw.textlength(line, font=font) for line in info_lines]) + 20
+            # Build the thumbnail from the in-memory image while we have it
+            thumbnail_path = None
+            try:
+                thumbnail_path = self._save_thumbnail(image, filepath)
+            except Exception as e:
+                print(f"Error creating thumbnail: {e}")
             
-            # Draw background rectangle
-            draw.rectangle(
-                [(x-5, y-5), (x + box_width, y + box_height)],
-                fill=(0, 0, 0, 128)
-            )
+            # The sample is linked to the photo when it is stored
+            if self.photo_catalog:
+                self.photo_catalog.add_photo(filepath, capture_time, thumbnail_path)
             
-            # Draw text
-            for i, line in enumerate(info_lines):
-                draw.text(
-                    (x, y + i * 15),
-                    line,
-                    font=font,
-                    fill=(255, 255, 255)
-                )
-                
+            # Update signal data with photo path
+            signal_data.photo_path = filepath
+            
+            return filepath
+        except Exception as e:
+            print(f"Error taking photo: {e}")
+            if filepath:
+                self.discard_photo_path(filepath)
+            return None
+    
+    def new_photo_path(self, capture_time=None):
+        """Get a new, unique photo file path and reserve it
+        
+        Names carry milliseconds plus a counter suffix when needed, and the
+        file is created exclusively, so shots in the same second (bursts,
+        concurrent workers) never overwrite each other.
+        """
+        if capture_time is None:
+            capture_time = time.time()
+        moment = datetime.fromtimestamp(capture_time)
+        timestamp = f"{moment.strftime('%Y%m%d_%H%M%S')}_{moment.microsecond // 1000:03d}"
+        extension = get_extension(self.encoding)
+        
+        suffix = 0
+        while True:
+            counter = f"_{suffix}" if suffix else ''
+            name = f"signal_test_{timestamp}{counter}{extension}"
+            filepath = os.path.join(self.photo_directory, name)
+            try:
+                os.close(os.open(filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return filepath
+            except FileExistsError:
+                suffix += 1
+    
+    def discard_photo_path(self, filepath):
+        """Remove a reserved photo file that was never written"""
+        try:
+            if os.path.getsize(filepath) == 0:
+                os.remove(filepath)
+        except OSError:
+            pass
+    
+    def _frame_to_image(self, frame):
+        """Convert an RGBA texture frame to an upright RGB image"""
+        pixels, size = frame
+        return frame_to_image(pixels, size)
+    
+    def _overlay_signal_info(self, image, signal_data):
+        """Overlay signal information on image"""
+        try:
+            self.overlay_compositor.apply(image, signal_data)
         except Exception as e:
             print(f"Error overlaying signal info: {e}")
     
@@ -149,12 +243,73 @@ class CameraUtils:
             print(f"Error getting photo preview: {e}")
             return None
     
-    def get_photo_list(self):
-        """Get list of saved photos"""
+    def get_thumbnail_path(self, photo_path):
+        """Get thumbnail file path of a photo (always a JPEG)"""
+        directory, filename = os.path.split(photo_path)
+        name = os.path.splitext(filename)[0]
+        return os.path.join(directory, self.THUMBNAIL_DIRECTORY, f"{name}.jpg")
+    
+    def _save_thumbnail(self, image, photo_path):
+        """Shrink image in place and save it as the photo's thumbnail"""
+        return save_thumbnail(image, self.get_thumbnail_path(photo_path), self.THUMBNAIL_SIZE)
+    
+    def get_thumbnail(self, photo_path):
+        """Get thumbnail path of a photo, building it if missing or stale"""
+        try:
+            thumbnail_path = self.get_thumbnail_path(photo_path)
+            if (os.path.exists(thumbnail_path) and
+                    os.path.getmtime(thumbnail_path) >= os.path.getmtime(photo_path)):
+                return thumbnail_path
+            
+            with Image.open(photo_path) as image:
+                # Let the JPEG decoder scale down by up to 8x instead of decoding full size
+                image.draft('RGB', self.THUMBNAIL_SIZE)
+                return self._save_thumbnail(image.convert('RGB'), photo_path)
+        except Exception as e:
+            print(f"Error getting thumbnail: {e}")
+            return None
+    
+    def request_thumbnail(self, photo_path, callback):
+        """Get a thumbnail on a background thread
+        
+        callback(photo_path, thumbnail_path) runs on the worker thread; UI code
+        should hop back with Clock.schedule_once. Concurrent requests for the
+        same photo share one build.
+        """
+        with self._thumbnail_lock:
+            callbacks = self._thumbnail_requests.get(photo_path)
+            if callbacks is not None:
+                callbacks.append(callback)
+                return
+            self._thumbnail_requests[photo_path] = [callback]
+            
+            if self._thumbnail_executor is None:
+                self._thumbnail_executor = ThreadPoolExecutor(max_workers=2)
+        
+        self._thumbnail_executor.submit(self._build_requested_thumbnail, photo_path)
+    
+    def _build_requested_thumbnail(self, photo_path):
+        """Build a requested thumbnail and notify waiting callbacks"""
+        thumbnail_path = self.get_thumbnail(photo_path)
+        
+        with self._thumbnail_lock:
+            callbacks = self._thumbnail_requests.pop(photo_path, [])
+        
+        for callback in callbacks:
+            try:
+                callback(photo_path, thumbnail_path)
+            except Exception as e:
+                print(f"Error in thumbnail callback: {e}")
+    
+    def get_photo_list(self, limit=None, offset=0):
+        """Get list of saved photos, newest first"""
+        if self.photo_catalog:
+            return self.photo_catalog.get_photos(limit=limit, offset=offset)
+        
         try:
             photos = []
             for file in os.listdir(self.photo_directory):
-                if file.lower().endswith('.jpg'):
+                if file.lower().endswith(tuple(FORMAT_EXTENSIONS.values())):
                     filepath = os.path.join(self.photo_directory, file)
                     photos.append({
                         'filename': file,
@@ -164,7 +319,9 @@ class CameraUtils:
             
             # Sort by timestamp (newest first)
             photos.sort(key=lambda x: x['timestamp'], reverse=True)
-            return photos
+            if limit is not None:
+                return photos[offset:offset + limit]
+            return photos[offset:]
         except Exception as e:
             print(f"Error getting photo list: {e}")
             return []
@@ -174,6 +331,13 @@ class CameraUtils:
         try:
             if os.path.exists(photo_path):
                 os.remove(photo_path)
+                
+                thumbnail_path = self.get_thumbnail_path(photo_path)
+                if os.path.exists(thumbnail_path):
+                    os.remove(thumbnail_path)
+                
+                if self.photo_catalog:
+                    self.photo_catalog.remove_photo(photo_path)
                 return True
             return False
         except Exception as e:
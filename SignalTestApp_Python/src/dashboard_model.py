@@ -0,0 +1,79 @@
+# Dashboard view-model module
+
+import time
+from collections import deque
+
+# Dashboard fields in display order
+DASHBOARD_FIELDS = (
+    'network_type', 'operator', 'signal_strength', 'signal_quality', 'cgi',
+    'pci', 'band', 'frequency', 'location', 'timestamp'
+)
+
+def format_dashboard(signal_data):
+    """Get the dashboard text of each field for a sample"""
+    fields = {
+        'network_type': signal_data.network_type,
+        'operator': signal_data.operator,
+        'signal_strength': f"{signal_data.get_signal_strength()} dBm",
+        'signal_quality': signal_data.get_signal_quality(),
+        'location': signal_data.location_description,
+        'timestamp': signal_data.timestamp
+    }
+    
+    # Use 5G values if available
+    if signal_data.network_type == "5G":
+        fields['cgi'] = signal_data.nr_cgi
+        fields['pci'] = str(signal_data.nr_pci) if signal_data.nr_pci != 0 else "N/A"
+        fields['band'] = signal_data.nr_band
+        fields['frequency'] = str(signal_data.nr_frequency) if signal_data.nr_frequency != 0 else "N/A"
+    else:
+        fields['cgi'] = signal_data.cgi
+        fields['pci'] = str(signal_data.pci) if signal_data.pci != 0 else "N/A"
+        fields['band'] = signal_data.band
+        fields['frequency'] = str(signal_data.frequency) if signal_data.frequency != 0 else "N/A"
+    
+    return fields
+
+class DashboardViewModel:
+    """Track the dashboard text on screen and report only what changed
+    
+    Every label text assignment re-renders the label's texture, so the screen
+    applies only the fields diff() returns. Applied updates are counted for
+    the last minute as an instrumentation figure.
+    """
+    
+    def __init__(self):
+        self.shown = {}
+        self.update_count = 0
+        self._update_times = deque()
+    
+    def diff(self, signal_data):
+        """Get {field: text} of the fields whose text differs from what is shown"""
+        fields = format_dashboard(signal_data)
+        return {
+            field: text for field, text in fields.items()
+            if self.shown.get(field) != text
+        }
+    
+    def mark_shown(self, changes):
+        """Record that changed fields were written to their labels"""
+        self.shown.update(changes)
+        
+        now = time.monotonic()
+        self.update_count += len(changes)
+        self._update_times.extend([now] * len(changes))
+        self._trim(now)
+    
+    def invalidate(self, field):
+        """Forget a field's text, after its label was written outside the view-model"""
+        self.shown.pop(field, None)
+    
+    def _trim(self, now):
+        """Drop update times older than a minute"""
+        while self._update_times and self._update_times[0] < now - 60.0:
+            self._update_times.popleft()
+    
+    def get_updates_per_minute(self):
+        """Get number of label updates in the last minute"""
+        self._trim(time.monotonic())
+        return len(self._update_times)
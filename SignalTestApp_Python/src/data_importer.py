@@ -0,0 +1,273 @@
+# Bulk sample import module
+
+import os
+import hashlib
+import sqlite3
+from collections import deque
+from datetime import datetime
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from storage_utils import SAMPLE_COLUMNS, content_hashes
+from worker_pool import get_worker_pool
+
+# File types written by StorageUtils.export_to_csv / export_to_excel
+IMPORT_FORMATS = ('.csv', '.xlsx')
+
+# Columns a file must have; the others default to 0 or ''
+REQUIRED_COLUMNS = ('network_type', 'timestamp')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def parse_chunk(header, values, session_id=None):
+    """Validate and convert raw rows of an export file
+    
+    Module-level so it can run in a worker process. Columns are converted
+    with pandas in one pass each; rows with a non-numeric value in a numeric
+    column, a fractional integer, an unparseable timestamp or coordinates out
+    of range are rejected. Columns other than SAMPLE_COLUMNS (id, session_id)
+    are local to the exporting database and ignored.
+    
+    Args:
+        header (list): Column names
+        values (list): Rows of raw values (strings from CSV, cell values from XLSX)
+        session_id (int): Session to assign the rows to, or None
+    
+    Returns:
+        tuple: (rows, rejected) with rows as storage_utils.INSERT_COLUMNS
+            tuples ready for StorageUtils.insert_rows_bulk
+    """
+    import pandas as pd
+    
+    frame = pd.DataFrame(values, columns=header, dtype=object)
+    missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    
+    count = len(frame)
+    valid = np.ones(count, dtype=bool)
+    columns = {}
+    for column, kind in SAMPLE_COLUMNS.items():
+        if column not in frame.columns:
+            columns[column] = np.full(count, {'integer': 0, 'real': 0.0}.get(kind, ''), dtype=object)
+            continue
+        
+        raw = frame[column]
+        blank = (raw.isna() | (raw == '')).to_numpy()
+        if kind == 'text':
+            columns[column] = raw.mask(blank, '').astype(str).to_numpy()
+            continue
+        
+        numbers = np.array(pd.to_numeric(raw.mask(blank, 0), errors='coerce'), dtype=np.float64)
+        invalid = np.isnan(numbers)
+        numbers[invalid] = 0
+        if kind == 'integer':
+            invalid |= numbers != np.floor(numbers)
+            columns[column] = numbers.astype(np.int64)
+        else:
+            columns[column] = numbers
+        valid &= ~invalid
+    
+    valid &= pd.to_datetime(
+        pd.Series(columns['timestamp']), format=TIMESTAMP_FORMAT, errors='coerce'
+    ).notna().to_numpy()
+    valid &= (np.abs(columns['latitude']) <= 90) & (np.abs(columns['longitude']) <= 180)
+    
+    # tolist() gives the Python values content_hashes expects
+    columns = {column: values[valid].tolist() for column, values in columns.items()}
+    rows = list(zip(
+        *(columns[column] for column in SAMPLE_COLUMNS),
+        repeat(session_id),
+        content_hashes(columns)
+    ))
+    return rows, int(count - valid.sum())
+
+def file_hash(path):
+    """Get a digest of a file's bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class DataImporter:
+    """Import samples from CSV/XLSX files in the app's export format
+    
+    Files are read in chunks on a coordinator thread, parsed and validated in
+    a worker pool, and written by StorageUtils.insert_rows_bulk with one
+    executemany transaction per chunk. Samples already stored (same content
+    hash) are skipped by the unique index, and files imported before are
+    recognised by their digest and skipped without being read.
+    """
+    
+    # Rows per chunk (one worker task and one transaction)
+    IMPORT_CHUNK_SIZE = 50000
+    
+    def __init__(self, storage_utils, max_workers=None):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.max_workers = max_workers
+        self.coordinator = ThreadPoolExecutor(max_workers=1)
+        self._init_table()
+    
+    def _init_table(self):
+        """Create imported_files table"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS imported_files (
+                    file_hash TEXT PRIMARY KEY,
+                    path TEXT,
+                    size INTEGER,
+                    row_count INTEGER,
+                    inserted_count INTEGER,
+                    rejected_count INTEGER,
+                    imported_at TEXT
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error initializing import table: {e}")
+    
+    def _get_executor(self):
+        """Get the shared worker pool (sized by max_workers if this creates it)"""
+        return get_worker_pool(self.max_workers)
+    
+    def import_file(self, path, session_id=None, callback=None):
+        """Import a file in the background
+        
+        Args:
+            path (str): CSV or XLSX file written by the export functions
+            session_id (int): Session to assign the samples to, or None
+            callback (callable): Called as callback(result) when done, with
+                the dict described in import_file_sync. It runs on a worker
+                thread, so UI code should hop back with Clock.schedule_once.
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the same result dict
+        """
+        def run():
+            result = self.import_file_sync(path, session_id)
+            if callback:
+                callback(result)
+            return result
+        return self.coordinator.submit(run)
+    
+    def import_file_sync(self, path, session_id=None):
+        """Import a file in this thread
+        
+        Returns:
+            dict: path, inserted, duplicates, rejected and skipped (True when
+                the file was imported before), plus error on failure
+        """
+        result = {'path': path, 'inserted': 0, 'duplicates': 0, 'rejected': 0, 'skipped': False}
+        try:
+            if os.path.splitext(path)[1].lower() not in IMPORT_FORMATS:
+                raise ValueError(f"Unsupported import format: {path}")
+            
+            digest = file_hash(path)
+            if self._is_imported(digest):
+                result['skipped'] = True
+                print(f"Already imported: {path}")
+                return result
+            
+            stats = {'rejected': 0, 'error': None}
+            counts = self.storage_utils.insert_rows_bulk(self._parse_chunks(path, session_id, stats))
+            if counts is None:
+                raise RuntimeError(stats['error'] or "Rows could not be stored")
+            
+            inserted, total = counts
+            result.update(inserted=inserted, duplicates=total - inserted, rejected=stats['rejected'])
+            self._record_import(digest, path, total + stats['rejected'], inserted, stats['rejected'])
+            print(f"Imported {inserted} samples from {path} "
+                  f"({total - inserted} duplicates, {stats['rejected']} rejected)")
+        except Exception as e:
+            print(f"Error importing {path}: {e}")
+            result['error'] = str(e)
+        return result
+    
+    def _is_imported(self, digest):
+        """Check if a file with this digest was imported"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM imported_files WHERE file_hash = ?', (digest,))
+        imported = cursor.fetchone() is not None
+        conn.close()
+        return imported
+    
+    def _record_import(self, digest, path, row_count, inserted, rejected):
+        """Remember an imported file"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            INSERT OR REPLACE INTO imported_files
+            (file_hash, path, size, row_count, inserted_count, rejected_count, imported_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            digest, os.path.abspath(path), os.path.getsize(path), row_count, inserted, rejected,
+            datetime.now().strftime(TIMESTAMP_FORMAT)
+        ))
+        conn.commit()
+        conn.close()
+    
+    def _read_chunks(self, path):
+        """Yield (header, rows) chunks of raw values from a file"""
+        if path.lower().endswith('.csv'):
+            import pandas as pd
+            
+            # All columns as text, so parsing and validation happen in the workers;
+            # keep_default_na keeps values like 'N/A' as written
+            reader = pd.read_csv(
+                path, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                chunksize=self.IMPORT_CHUNK_SIZE
+            )
+            with reader:
+                for chunk in reader:
+                    yield chunk.columns.tolist(), chunk.to_numpy(dtype=object)
+            return
+        
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(name) for name in next(rows, ())]
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == self.IMPORT_CHUNK_SIZE:
+                    yield header, chunk
+                    chunk = []
+            if chunk:
+                yield header, chunk
+        finally:
+            workbook.close()
+    
+    def _parse_chunks(self, path, session_id, stats):
+        """Yield parsed row lists, parsing a few chunks ahead in the worker pool"""
+        executor = self._get_executor()
+        ahead = (self.max_workers or os.cpu_count() or 2) + 1
+        pending = deque()
+        
+        def next_rows():
+            rows, rejected = pending.popleft().result()
+            stats['rejected'] += rejected
+            return rows
+        
+        try:
+            for header, values in self._read_chunks(path):
+                pending.append(executor.submit(parse_chunk, header, values, session_id))
+                if len(pending) > ahead:
+                    yield next_rows()
+            while pending:
+                yield next_rows()
+        except Exception as e:
+            # insert_rows_bulk only reports that storing failed; keep the cause
+            stats['error'] = str(e)
+            for future in pending:
+                future.cancel()
+            raise
+    
+    def shutdown(self):
+        """Stop the coordinator thread (the worker pool is shared)"""
+        self.coordinator.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+# Derived table rebuild module
+
+import time
+import sqlite3
+import threading
+
+# Pause after each rebuild chunk: SQLite's busy handler polls, so a writer
+# waiting for the lock would otherwise rarely get it between chunks
+CHUNK_PAUSE = 0.05
+
+class RebuildGate:
+    """Track which stored samples a rebuild of derived tables has covered
+    
+    While building is set, add_samples leaves new samples to the rebuild;
+    afterwards samples up to built_through were covered by it, so a listener
+    call for one of them that arrives late is not counted twice. Read both
+    with the database write lock held (after BEGIN IMMEDIATE).
+    """
+    
+    def __init__(self, building=False):
+        self.building = building
+        self.built_through = 0
+        self.lock = threading.Lock()
+    
+    def new_samples(self, signal_data_list):
+        """Get the samples no rebuild has covered"""
+        if self.building:
+            return []
+        return [
+            data for data in signal_data_list
+            if data.id is None or data.id > self.built_through
+        ]
+
+def has_samples(cursor):
+    """Check whether signal_data holds any sample, i.e. new derived tables need a rebuild"""
+    cursor.execute('SELECT 1 FROM signal_data LIMIT 1')
+    return cursor.fetchone() is not None
+
+def rebuild_in_chunks(db_path, gate, columns, reset, store, chunk_size):
+    """Rebuild derived tables from all stored samples without blocking inserts for long
+    
+    Samples are read in id order, one chunk per write transaction, so an
+    insert waits for one chunk at most and can run from a background thread.
+    The final, empty read is made with the write lock held, so every sample
+    committed before it is covered and every later one goes through
+    add_samples.
+    
+    Args:
+        db_path (str): Database path
+        gate (RebuildGate): The engine's gate
+        columns (str): signal_data columns to read, after id
+        reset (callable): reset(cursor) deletes the derived rows
+        store (callable): store(cursor, rows) adds (id, *columns) rows
+        chunk_size (int): Rows per transaction
+    
+    Returns:
+        int: Number of samples read
+    """
+    with gate.lock:
+        gate.building = True
+        last_id = 0
+        sample_count = 0
+        try:
+            while True:
+                conn = sqlite3.connect(db_path)
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute('BEGIN IMMEDIATE')
+                    if not last_id:
+                        reset(cursor)
+                    cursor.execute(
+                        f'SELECT id, {columns} FROM signal_data WHERE id > ? ORDER BY id LIMIT ?',
+                        (last_id, chunk_size)
+                    )
+                    rows = cursor.fetchall()
+                    if rows:
+                        store(cursor, rows)
+                        last_id = rows[-1][0]
+                        sample_count += len(rows)
+                    else:
+                        gate.built_through = last_id
+                        gate.building = False
+                    conn.commit()
+                finally:
+                    conn.close()
+                if not rows:
+                    return sample_count
+                time.sleep(CHUNK_PAUSE)
+        finally:
+            # After a failure, new samples are added again
+            gate.building = False
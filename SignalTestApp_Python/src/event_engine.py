@@ -0,0 +1,664 @@
+# Drive-test event detection module
+
+import time
+import sqlite3
+import threading
+from collections import deque
+import numpy as np
+from kpi_engine import serving_cells, valid_readings
+from track_geometry import signal_strengths
+from derived_data import CHUNK_PAUSE, RebuildGate, has_samples
+
+# Event types
+HANDOVER = 'handover'
+RAT_CHANGE = 'rat_change'
+PCI_CHANGE = 'pci_change'
+PING_PONG = 'ping_pong'
+SIGNAL_DROP = 'signal_drop'
+COVERAGE_HOLE = 'coverage_hole'
+EVENT_TYPES = (HANDOVER, RAT_CHANGE, PCI_CHANGE, PING_PONG, SIGNAL_DROP, COVERAGE_HOLE)
+
+# A return to the previous cell within this many seconds is a ping-pong
+PING_PONG_WINDOW = 10.0
+
+# Fall in signal strength between consecutive samples reported as a drop (dB)
+SIGNAL_DROP_DB = 15.0
+
+# Samples weaker than this (dBm) for at least the duration form a coverage hole
+COVERAGE_HOLE_DBM = -110.0
+COVERAGE_HOLE_MIN_DURATION = 5.0
+
+# Consecutive samples further apart than this (seconds) are not compared
+MAX_SAMPLE_GAP = 60.0
+
+# Sample fields events are detected from, in query order
+SAMPLE_FIELDS = (
+    'id', 'timestamp', 'network_type', 'cgi', 'nr_cgi', 'pci', 'nr_pci',
+    'rsrp', 'rssi', 'latitude', 'longitude'
+)
+
+# signal_events columns, in the order events are produced
+EVENT_FIELDS = (
+    'event_type', 'sample_id', 'timestamp', 'from_cell', 'to_cell',
+    'from_network_type', 'to_network_type', 'from_pci', 'to_pci',
+    'signal_before', 'signal_after', 'duration', 'latitude', 'longitude'
+)
+
+def weak_signals(signal):
+    """Get a mask of real readings below COVERAGE_HOLE_DBM"""
+    return valid_readings(signal) & (signal < COVERAGE_HOLE_DBM)
+
+def sample_columns(rows):
+    """Convert sample rows (SAMPLE_FIELDS tuples) to the column arrays detect_events uses"""
+    ids, timestamps, network_types, cgis, nr_cgis, pcis, nr_pcis, rsrp, rssi, latitudes, longitudes = zip(*rows)
+    
+    network_types = np.array([network_type or '' for network_type in network_types])
+    pcis = np.array([pci or 0 for pci in pcis], dtype=np.int64)
+    nr_pcis = np.array([pci or 0 for pci in nr_pcis], dtype=np.int64)
+    
+    # Samples without a parseable time get NaN, so they are never compared
+    timestamps = np.array([timestamp or '' for timestamp in timestamps])
+    times = np.array(timestamps, dtype='datetime64[s]')
+    valid = ~np.isnat(times)
+    times = np.where(valid, times.astype(np.int64), 0).astype(np.float64)
+    times[~valid] = np.nan
+    
+    return {
+        'id': np.array(ids, dtype=object),
+        'timestamp': timestamps,
+        'time': times,
+        'network_type': network_types,
+        'cell': serving_cells(network_types, cgis, nr_cgis),
+        'pci': np.where((network_types == '5G') & (nr_pcis != 0), nr_pcis, pcis),
+        'signal': signal_strengths(network_types, [value or 0 for value in rsrp], [value or 0 for value in rssi]),
+        'latitude': np.array([value or 0.0 for value in latitudes], dtype=np.float64),
+        'longitude': np.array([value or 0.0 for value in longitudes], dtype=np.float64)
+    }
+
+def _event_rows(event_type, columns, at, before, duration=None):
+    """Build EVENT_FIELDS tuples for events at sample indexes at, compared to indexes before"""
+    if duration is None:
+        duration = np.zeros(len(at))
+    rows = zip(
+        columns['id'][at], columns['timestamp'][at].tolist(),
+        columns['cell'][before].tolist(), columns['cell'][at].tolist(),
+        columns['network_type'][before].tolist(), columns['network_type'][at].tolist(),
+        columns['pci'][before].tolist(), columns['pci'][at].tolist(),
+        columns['signal'][before].tolist(), columns['signal'][at].tolist(),
+        np.asarray(duration, dtype=np.float64).tolist(),
+        columns['latitude'][at].tolist(), columns['longitude'][at].tolist()
+    )
+    return [(event_type,) + row for row in rows]
+
+def detect_events(columns, start=0):
+    """Detect events in time-ordered sample columns
+    
+    Every rule is one vectorized pass over consecutive sample pairs: a serving
+    cell change is a handover (a RAT change when network_type also changes),
+    a PCI change on the same cell is a PCI change, a return to the previous
+    cell within PING_PONG_WINDOW is a ping-pong, a fall of SIGNAL_DROP_DB is a
+    signal drop, and a run of samples below COVERAGE_HOLE_DBM lasting
+    COVERAGE_HOLE_MIN_DURATION is a coverage hole (reported once the signal
+    recovers, at the run's first sample).
+    
+    Args:
+        columns (dict): Arrays from sample_columns()
+        start (int): Events triggered by samples before this index are left
+            out (those samples are context from an earlier batch)
+    
+    Returns:
+        list: (trigger index, EVENT_FIELDS tuple) pairs in trigger order
+    """
+    count = len(columns['time'])
+    if count < 2:
+        return []
+    
+    times = columns['time']
+    cells = columns['cell']
+    network_types = columns['network_type']
+    pcis = columns['pci']
+    signal = columns['signal']
+    
+    # Pair k compares sample k with sample k + 1
+    contiguous = (times[1:] - times[:-1]) <= MAX_SAMPLE_GAP
+    known_rat = (network_types[1:] != '') & (network_types[:-1] != '') & \
+        (network_types[1:] != 'Unknown') & (network_types[:-1] != 'Unknown')
+    rat_changed = contiguous & known_rat & (network_types[1:] != network_types[:-1])
+    cell_changed = contiguous & (cells[1:] != '') & (cells[:-1] != '') & (cells[1:] != cells[:-1])
+    pci_changed = contiguous & ~cell_changed & ~rat_changed & \
+        (pcis[1:] != 0) & (pcis[:-1] != 0) & (pcis[1:] != pcis[:-1])
+    # Placeholders (e.g. CellInfo.UNAVAILABLE) are no readings either
+    valid = valid_readings(signal)
+    measured = valid[1:] & valid[:-1]
+    dropped = contiguous & measured & (signal[:-1] - signal[1:] >= SIGNAL_DROP_DB)
+    
+    events = []
+    for event_type, pairs in (
+        (HANDOVER, cell_changed & ~rat_changed),
+        (RAT_CHANGE, rat_changed),
+        (PCI_CHANGE, pci_changed),
+        (SIGNAL_DROP, dropped)
+    ):
+        at = np.flatnonzero(pairs) + 1
+        events.extend(zip(at.tolist(), _event_rows(event_type, columns, at, at - 1)))
+    
+    # Ping-pong: consecutive cell changes A -> B -> A within the window
+    changes = np.flatnonzero(cell_changed) + 1
+    if len(changes) > 1:
+        first, second = changes[:-1], changes[1:]
+        returned = (cells[second] == cells[first - 1]) & (cells[second - 1] == cells[first]) & \
+            (times[second] - times[first] <= PING_PONG_WINDOW)
+        first, second = first[returned], second[returned]
+        rows = _event_rows(PING_PONG, columns, first, first - 1, times[second] - times[first])
+        events.extend(zip(second.tolist(), rows))
+    
+    # Coverage holes: runs of weak samples that ended within these columns
+    weak = weak_signals(signal)
+    edges = np.diff(np.concatenate(([0], weak.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    ended = run_ends < count
+    run_starts, run_ends = run_starts[ended], run_ends[ended]
+    durations = times[run_ends] - times[run_starts]
+    holes = durations >= COVERAGE_HOLE_MIN_DURATION
+    run_starts, run_ends = run_starts[holes], run_ends[holes]
+    rows = _event_rows(
+        COVERAGE_HOLE, columns, run_starts, np.maximum(run_starts - 1, 0), durations[holes]
+    )
+    events.extend(zip(run_ends.tolist(), rows))
+    
+    events = [event for event in events if event[0] >= start]
+    events.sort(key=lambda event: event[0])
+    return events
+
+class EventStream:
+    """Detect events incrementally over consecutive batches of samples
+    
+    The tail of the previous batches is kept as context: enough samples to
+    reach back PING_PONG_WINDOW, and an unfinished weak-signal run with the
+    sample before it. Each push runs detect_events over context plus batch and
+    returns only the events the batch triggered, so batching never changes
+    the events found.
+    """
+    
+    def __init__(self):
+        self._context = None
+    
+    def reset(self):
+        """Forget previous samples"""
+        self._context = None
+    
+    def last_time(self):
+        """Get time of the last pushed sample in seconds, or None"""
+        if self._context is None:
+            return None
+        return self._context['time'][-1]
+    
+    def last_key(self):
+        """Get (time, id) of the last pushed sample, the order samples are streamed in, or None"""
+        if self._context is None:
+            return None
+        return (self._context['time'][-1], self._context['id'][-1] or 0)
+    
+    def push(self, columns):
+        """Add time-ordered sample columns and get the events they trigger
+        
+        Returns:
+            list: EVENT_FIELDS tuples
+        """
+        if not len(columns['time']):
+            return []
+        
+        start = 0
+        if self._context is not None:
+            start = len(self._context['time'])
+            columns = {
+                key: np.concatenate((self._context[key], values))
+                for key, values in columns.items()
+            }
+        
+        events = [event for index, event in detect_events(columns, start)]
+        self._context = self._tail(columns)
+        return events
+    
+    def _tail(self, columns):
+        """Get the samples later pushes still need for context"""
+        times = columns['time']
+        count = len(times)
+        
+        # The sample before the window start holds the "from" cell of a ping-pong,
+        # the one before a weak run the signal a coverage hole is compared with
+        recent = int(np.searchsorted(times, times[-1] - PING_PONG_WINDOW, side='left'))
+        keep = max(min(recent, count - 1) - 1, 0)
+        
+        signal = columns['signal']
+        weak = weak_signals(signal)
+        if weak[-1]:
+            strong = np.flatnonzero(~weak)
+            keep = min(keep, int(strong[-1]) if len(strong) else 0)
+        
+        return {key: values[keep:] for key, values in columns.items()}
+
+class EventEngine:
+    """Detect drive-test events in stored samples and keep them in signal_events
+    
+    Stored samples are fed through an EventStream as they are inserted, and
+    rebuild() streams all existing samples through it in time order (on first
+    use, from a background thread; needs_rebuild is set until then).
+    Samples older than ones already streamed (e.g. a delayed insert) re-detect
+    only a window around them, replacing that window's stored events.
+    Samples from the collector's live stream (not stored) go through a second
+    EventStream; their events are kept in memory in live_events.
+    """
+    
+    # Rows read per chunk when rebuilding events from signal_data
+    REBUILD_CHUNK_SIZE = 50000
+    
+    # Stored samples replayed on startup to restore the stream's context
+    CONTEXT_ROWS = 1000
+    
+    # Rows read per step when extending a re-detection window
+    WINDOW_STEP = 100
+    
+    # Live events kept in memory
+    LIVE_EVENT_LIMIT = 200
+    
+    def __init__(self, storage_utils):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.stream = EventStream()
+        self.live_stream = EventStream()
+        self.live_events = deque(maxlen=self.LIVE_EVENT_LIMIT)
+        self.event_listeners = []
+        self._lock = threading.Lock()
+        self._pending = []
+        self.needs_rebuild = False
+        self._init_table()
+        self.gate = RebuildGate(building=self.needs_rebuild)
+        
+        # Keep events up to date as samples are stored
+        storage_utils.add_insert_listener(self.add_samples)
+        storage_utils.add_clear_listener(self.clear)
+        storage_utils.add_import_listener(self.rebuild)
+    
+    def _init_table(self):
+        """Create signal_events table; needs_rebuild is set if it is new and samples exist"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='signal_events'"
+            )
+            table_exists = cursor.fetchone() is not None
+            needs_rebuild = not table_exists and has_samples(cursor)
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS signal_events (
+                    id INTEGER PRIMARY KEY,
+                    event_type TEXT,
+                    sample_id INTEGER,
+                    timestamp TEXT,
+                    from_cell TEXT,
+                    to_cell TEXT,
+                    from_network_type TEXT,
+                    to_network_type TEXT,
+                    from_pci INTEGER,
+                    to_pci INTEGER,
+                    signal_before REAL,
+                    signal_after REAL,
+                    duration REAL,
+                    latitude REAL,
+                    longitude REAL
+                )
+            ''')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_signal_events_type_time ON signal_events (event_type, timestamp)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_signal_events_time ON signal_events (timestamp)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_signal_events_to_cell ON signal_events (to_cell, timestamp)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_signal_events_sample ON signal_events (sample_id)'
+            )
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error initializing events table: {e}")
+            return
+        
+        if needs_rebuild:
+            # Events of existing samples are detected by rebuild(), off the UI thread
+            self.needs_rebuild = True
+        else:
+            self._restore_context()
+    
+    def _select_samples(self, cursor, where='', params=(), descending=False, limit=None):
+        """Execute a signal_data query for SAMPLE_FIELDS in time order"""
+        order = 'DESC' if descending else 'ASC'
+        query = f'''
+            SELECT {', '.join(SAMPLE_FIELDS)} FROM signal_data {where}
+            ORDER BY timestamp {order}, id {order}
+        '''
+        if limit is not None:
+            query += f' LIMIT {int(limit)}'
+        cursor.execute(query, params)
+    
+    def _restore_context(self):
+        """Replay the latest stored samples so new samples are compared with them"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            self._select_samples(cursor, descending=True, limit=self.CONTEXT_ROWS)
+            rows = cursor.fetchall()
+            conn.close()
+            
+            # Their events are already stored
+            if rows:
+                self.stream.push(sample_columns(rows[::-1]))
+        except Exception as e:
+            print(f"Error restoring event context: {e}")
+    
+    def _insert_events(self, cursor, events):
+        """Store event tuples"""
+        cursor.executemany(f'''
+            INSERT INTO signal_events ({', '.join(EVENT_FIELDS)})
+            VALUES ({', '.join('?' * len(EVENT_FIELDS))})
+        ''', [
+            (event[0], int(event[1]) if event[1] is not None else None) + event[2:]
+            for event in events
+        ])
+    
+    def add_samples(self, signal_data_list):
+        """Detect events triggered by newly stored samples"""
+        try:
+            rows = [
+                tuple(getattr(signal_data, field) for field in SAMPLE_FIELDS)
+                for signal_data in signal_data_list
+            ]
+            if not rows:
+                return True
+            
+            columns = sample_columns(rows)
+            order = np.lexsort((np.arange(len(rows)), columns['time']))
+            columns = {key: values[order] for key, values in columns.items()}
+            
+            with self._lock:
+                if self.gate.building:
+                    # Detected once the rebuild has caught up
+                    self._pending.extend(rows)
+                    return True
+                
+                last_key = self.stream.last_key()
+                if last_key is not None and (columns['time'][0], columns['id'][0] or 0) <= last_key:
+                    # Samples older than ones already streamed
+                    return self._redetect_window(columns)
+                
+                events = self.stream.push(columns)
+                if events:
+                    conn = sqlite3.connect(self.db_path)
+                    self._insert_events(conn.cursor(), events)
+                    conn.commit()
+                    conn.close()
+            return True
+        except Exception as e:
+            print(f"Error detecting events: {e}")
+            return False
+    
+    def _window_edge(self, cursor, where, params, descending, span=None):
+        """Get the samples beyond one edge of a re-detection window, nearest first
+        
+        Samples are taken up to span seconds past the first one, then on
+        through a weak-signal run, ending with the first sample that is
+        neither (the context events at the edge are compared with).
+        """
+        self._select_samples(cursor, where, params, descending)
+        rows = []
+        until_time = None
+        while True:
+            chunk = cursor.fetchmany(self.WINDOW_STEP)
+            if not chunk:
+                return rows
+            columns = sample_columns(chunk)
+            weak = weak_signals(columns['signal'])
+            if until_time is None and span is not None:
+                until_time = columns['time'][0] + span
+            for index, row in enumerate(chunk):
+                rows.append(row)
+                if not weak[index] and not (until_time is not None and columns['time'][index] <= until_time):
+                    return rows
+    
+    def _redetect_window(self, columns):
+        """Detect events again around late samples (call with _lock held)
+        
+        Every event a sample can change is stored at a sample between
+        PING_PONG_WINDOW before it (or the start of a weak run reaching into
+        that span) and the sample after it. Those events are deleted and
+        detected again from the stored samples around them, which gives the
+        same events as a full rebuild.
+        """
+        valid = ~np.isnan(columns['time'])
+        if not valid.any():
+            # Samples without a time are never compared
+            return True
+        new_ids = {int(sample_id) for sample_id in columns['id'] if sample_id is not None}
+        start = np.datetime64(int(columns['time'][valid][0] - PING_PONG_WINDOW), 's')
+        start = str(start).replace('T', ' ')
+        end = columns['timestamp'][valid][-1]
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        before = self._window_edge(cursor, 'WHERE timestamp < ?', (start,), descending=True)
+        self._select_samples(cursor, 'WHERE timestamp >= ? AND timestamp <= ?', (start, end))
+        rows = before[::-1] + cursor.fetchall()
+        rows += self._window_edge(cursor, 'WHERE timestamp > ?', (end,), descending=False, span=PING_PONG_WINDOW)
+        
+        window = sample_columns(rows) if rows else None
+        positions = [] if window is None else [
+            index for index, sample_id in enumerate(window['id']) if sample_id in new_ids
+        ]
+        if positions:
+            times = window['time']
+            weak = weak_signals(window['signal'])
+            first = positions[0]
+            while first > 0 and times[first - 1] >= times[positions[0]] - PING_PONG_WINDOW:
+                first -= 1
+            while first > 0 and weak[first - 1]:
+                first -= 1
+            last = min(positions[-1] + 1, len(rows) - 1)
+            
+            window_ids = {int(sample_id) for sample_id in window['id'][first:last + 1]}
+            events = [event for index, event in detect_events(window) if event[1] in window_ids]
+            cursor.executemany(
+                'DELETE FROM signal_events WHERE sample_id = ?', [(sample_id,) for sample_id in window_ids]
+            )
+            self._insert_events(cursor, events)
+        conn.commit()
+        conn.close()
+        
+        # Continue the stream from the stored samples, late ones included
+        self.stream.reset()
+        self._restore_context()
+        return True
+    
+    def add_live_sample(self, signal_data):
+        """Detect events on the live sample stream (usable as a SignalCollector sample listener)"""
+        try:
+            columns = sample_columns([tuple(getattr(signal_data, field) for field in SAMPLE_FIELDS)])
+            with self._lock:
+                last_time = self.live_stream.last_time()
+                if last_time is not None and not columns['time'][0] >= last_time:
+                    self.live_stream.reset()
+                events = self.live_stream.push(columns)
+            
+            if events:
+                events = [dict(zip(EVENT_FIELDS, event)) for event in events]
+                self.live_events.extend(events)
+                for callback in list(self.event_listeners):
+                    callback(events)
+        except Exception as e:
+            print(f"Error detecting live events: {e}")
+    
+    def add_event_listener(self, callback):
+        """Register callback(events) for live events, each a dict of EVENT_FIELDS
+        
+        Callbacks run on the thread that collected the sample (LiveSampler's
+        worker), so UI code should hop back with Clock.schedule_once.
+        """
+        if callback not in self.event_listeners:
+            self.event_listeners.append(callback)
+    
+    def remove_event_listener(self, callback):
+        """Unregister a live event callback"""
+        if callback in self.event_listeners:
+            self.event_listeners.remove(callback)
+    
+    def rebuild(self):
+        """Detect all events again from stored samples (safe to run on a background thread)
+        
+        Samples are streamed in time order, one chunk per _lock hold, so
+        inserts are not held up for the whole rebuild. Samples inserted
+        meanwhile are kept in _pending and re-detected at the end, which
+        covers those older than the chunks already streamed; samples without
+        a timestamp are never compared, so they are left out.
+        """
+        try:
+            with self.gate.lock:
+                with self._lock:
+                    self.gate.building = True
+                    self._pending = []
+                    self.stream.reset()
+                
+                last_key = None
+                event_count = 0
+                while True:
+                    with self._lock:
+                        conn = sqlite3.connect(self.db_path)
+                        cursor = conn.cursor()
+                        if last_key is None:
+                            cursor.execute('DELETE FROM signal_events')
+                        self._select_samples(
+                            cursor, 'WHERE (timestamp, id) > (?, ?)', last_key or ('', 0),
+                            limit=self.REBUILD_CHUNK_SIZE
+                        )
+                        rows = cursor.fetchall()
+                        if rows:
+                            events = self.stream.push(sample_columns(rows))
+                            self._insert_events(cursor, events)
+                            event_count += len(events)
+                            last_key = (rows[-1][1], rows[-1][0])
+                        conn.commit()
+                        conn.close()
+                        
+                        if not rows:
+                            self.gate.building = False
+                            pending, self._pending = self._pending, []
+                            if pending:
+                                columns = sample_columns(pending)
+                                order = np.lexsort((np.arange(len(pending)), columns['time']))
+                                self._redetect_window({key: values[order] for key, values in columns.items()})
+                            break
+                    time.sleep(CHUNK_PAUSE)
+            
+            self.needs_rebuild = False
+            if event_count:
+                print(f"Detected {event_count} events")
+            return True
+        except Exception as e:
+            print(f"Error rebuilding events: {e}")
+            return False
+        finally:
+            # After a failure, new samples are detected again
+            self.gate.building = False
+    
+    def clear(self):
+        """Delete all events"""
+        try:
+            with self._lock:
+                conn = sqlite3.connect(self.db_path)
+                conn.execute('DELETE FROM signal_events')
+                conn.commit()
+                conn.close()
+                self.stream.reset()
+            return True
+        except Exception as e:
+            print(f"Error clearing events: {e}")
+            return False
+    
+    def get_events(self, event_type=None, start_time=None, end_time=None, cell=None,
+                   session_id=None, limit=1000):
+        """Get stored events in time order
+        
+        Args:
+            event_type (str): One of EVENT_TYPES, None for all
+            start_time, end_time (str): 'YYYY-MM-DD HH:MM:SS' bounds
+            cell (str): Only events from or to this cell
+            session_id (int): Only events of this session's samples
+            limit (int): Maximum number of events
+        
+        Returns:
+            list: Event dicts with id and EVENT_FIELDS
+        """
+        conditions = []
+        params = []
+        if event_type is not None:
+            conditions.append('event_type = ?')
+            params.append(event_type)
+        if start_time is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append('timestamp <= ?')
+            params.append(end_time)
+        if cell is not None:
+            conditions.append('(to_cell = ? OR from_cell = ?)')
+            params.extend([cell, cell])
+        if session_id is not None:
+            conditions.append('sample_id IN (SELECT id FROM signal_data WHERE session_id = ?)')
+            params.append(session_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM signal_events {where}
+                ORDER BY timestamp, id
+                LIMIT ?
+            ''', params + [limit])
+            rows = cursor.fetchall()
+            conn.close()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting events: {e}")
+            return []
+    
+    def get_event_counts(self, start_time=None, end_time=None):
+        """Get {event type: count} of stored events, optionally within a time range"""
+        conditions = []
+        params = []
+        if start_time is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append('timestamp <= ?')
+            params.append(end_time)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT event_type, COUNT(*) FROM signal_events {where} GROUP BY event_type', params)
+            counts = {event_type: 0 for event_type in EVENT_TYPES}
+            counts.update(dict(cursor.fetchall()))
+            conn.close()
+            return counts
+        except Exception as e:
+            print(f"Error getting event counts: {e}")
+            return {}
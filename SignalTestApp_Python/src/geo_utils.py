@@ -0,0 +1,47 @@
+# Geographic tile math module
+
+import math
+import numpy as np
+
+# Latitude limit of the Web Mercator projection
+MAX_LATITUDE = 85.05112878
+
+def lat_lon_to_tile(latitude, longitude, zoom):
+    """Get slippy-map tile (x, y) containing a point"""
+    n = 2 ** zoom
+    lat = min(max(latitude, -MAX_LATITUDE), MAX_LATITUDE)
+    lat_rad = math.radians(lat)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def lat_lon_to_tiles(latitudes, longitudes, zoom):
+    """Get slippy-map tile x and y arrays for arrays of points (vectorized)"""
+    n = 2 ** zoom
+    lat = np.clip(np.asarray(latitudes, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    lat_rad = np.radians(lat)
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n)
+    x = np.clip(x, 0, n - 1).astype(np.int64)
+    y = np.clip(y, 0, n - 1).astype(np.int64)
+    return x, y
+
+def tile_to_lat_lon(x, y, zoom):
+    """Get (latitude, longitude) of a tile's north-west corner"""
+    n = 2 ** zoom
+    longitude = x / n * 360.0 - 180.0
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    return latitude, longitude
+
+def tile_bounds(x, y, zoom):
+    """Get (min_lat, min_lon, max_lat, max_lon) of a tile"""
+    max_lat, min_lon = tile_to_lat_lon(x, y, zoom)
+    min_lat, max_lon = tile_to_lat_lon(x + 1, y + 1, zoom)
+    return min_lat, min_lon, max_lat, max_lon
+
+def tile_range(min_lat, min_lon, max_lat, max_lon, zoom):
+    """Get (min_x, min_y, max_x, max_y) of the tiles covering a bounding box"""
+    min_x, min_y = lat_lon_to_tile(max_lat, min_lon, zoom)
+    max_x, max_y = lat_lon_to_tile(min_lat, max_lon, zoom)
+    return min_x, min_y, max_x, max_y
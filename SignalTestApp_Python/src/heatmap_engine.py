@@ -0,0 +1,242 @@
+# Coverage heatmap aggregation module
+
+import sqlite3
+import numpy as np
+from geo_utils import lat_lon_to_tiles, tile_range, tile_bounds
+from kpi_engine import VALUE_OFFSET, valid_readings
+from derived_data import RebuildGate, has_samples, rebuild_in_chunks
+
+# Zoom levels bins are kept for, from city scale down to street level
+ZOOM_LEVELS = (10, 12, 14, 16)
+
+class HeatmapEngine:
+    """Aggregate stored samples into per-tile coverage bins at several zoom levels"""
+    
+    # Rows read per chunk when rebuilding bins from signal_data
+    REBUILD_CHUNK_SIZE = 50000
+    
+    def __init__(self, storage_utils, zoom_levels=ZOOM_LEVELS):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.zoom_levels = tuple(sorted(zoom_levels))
+        self.needs_rebuild = False
+        self._init_table()
+        self.gate = RebuildGate(building=self.needs_rebuild)
+        
+        # Keep bins up to date as samples are stored
+        storage_utils.add_insert_listener(self.add_samples)
+        storage_utils.add_clear_listener(self.clear)
+        storage_utils.add_import_listener(self.rebuild)
+    
+    def _init_table(self):
+        """Create heatmap_bins table
+        
+        needs_rebuild is set if the table is new and samples exist, or if its
+        sums include placeholder readings.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='heatmap_bins'"
+            )
+            table_exists = cursor.fetchone() is not None
+            needs_rebuild = not table_exists and has_samples(cursor)
+            if table_exists:
+                # Bins summed before placeholders were left out are rebuilt
+                cursor.execute('''
+                    SELECT 1 FROM heatmap_bins
+                    WHERE ABS(rsrp_sum) >= ? * MAX(rsrp_count, 1) OR ABS(rssi_sum) >= ? * MAX(rssi_count, 1)
+                    LIMIT 1
+                ''', (VALUE_OFFSET, VALUE_OFFSET))
+                needs_rebuild = cursor.fetchone() is not None
+            
+            # Sums are stored instead of averages so bins can be merged by addition
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS heatmap_bins (
+                    zoom INTEGER,
+                    x INTEGER,
+                    y INTEGER,
+                    sample_count INTEGER,
+                    rsrp_sum REAL,
+                    rsrp_count INTEGER,
+                    rssi_sum REAL,
+                    rssi_count INTEGER,
+                    PRIMARY KEY (zoom, x, y)
+                ) WITHOUT ROWID
+            ''')
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error initializing heatmap table: {e}")
+            return
+        
+        # Bins for existing samples are built by rebuild(), off the UI thread
+        self.needs_rebuild = needs_rebuild
+    
+    def _aggregate(self, latitudes, longitudes, rsrp, rssi):
+        """Bin sample arrays into per-tile rows for every zoom level
+        
+        Zero, NaN and placeholder RSRP/RSSI values mean "not measured" and are
+        left out of the averages.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        rsrp = np.asarray(rsrp, dtype=np.float64)
+        rssi = np.asarray(rssi, dtype=np.float64)
+        
+        # Skip samples without a location fix
+        located = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        located &= ~((latitudes == 0) & (longitudes == 0))
+        latitudes = latitudes[located]
+        longitudes = longitudes[located]
+        rsrp = rsrp[located]
+        rssi = rssi[located]
+        
+        rsrp_valid = valid_readings(rsrp)
+        rssi_valid = valid_readings(rssi)
+        rsrp = np.where(rsrp_valid, rsrp, 0.0)
+        rssi = np.where(rssi_valid, rssi, 0.0)
+        
+        bins = []
+        if latitudes.size == 0:
+            return bins
+        
+        for zoom in self.zoom_levels:
+            x, y = lat_lon_to_tiles(latitudes, longitudes, zoom)
+            keys = x * (2 ** zoom) + y
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            
+            counts = np.bincount(inverse)
+            rsrp_sums = np.bincount(inverse, weights=rsrp)
+            rsrp_counts = np.bincount(inverse, weights=rsrp_valid)
+            rssi_sums = np.bincount(inverse, weights=rssi)
+            rssi_counts = np.bincount(inverse, weights=rssi_valid)
+            
+            tile_x, tile_y = np.divmod(unique_keys, 2 ** zoom)
+            bins.extend(zip(
+                [zoom] * len(unique_keys),
+                tile_x.tolist(), tile_y.tolist(), counts.tolist(),
+                rsrp_sums.tolist(), rsrp_counts.astype(np.int64).tolist(),
+                rssi_sums.tolist(), rssi_counts.astype(np.int64).tolist()
+            ))
+        
+        return bins
+    
+    def _upsert_bins(self, cursor, bins):
+        """Add aggregated rows onto stored bins"""
+        cursor.executemany('''
+            INSERT INTO heatmap_bins (
+                zoom, x, y, sample_count, rsrp_sum, rsrp_count, rssi_sum, rssi_count
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (zoom, x, y) DO UPDATE SET
+                sample_count = sample_count + excluded.sample_count,
+                rsrp_sum = rsrp_sum + excluded.rsrp_sum,
+                rsrp_count = rsrp_count + excluded.rsrp_count,
+                rssi_sum = rssi_sum + excluded.rssi_sum,
+                rssi_count = rssi_count + excluded.rssi_count
+        ''', bins)
+    
+    def add_samples(self, signal_data_list):
+        """Add newly stored samples to the bins"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            signal_data_list = self.gate.new_samples(signal_data_list)
+            bins = self._aggregate(
+                [data.latitude for data in signal_data_list],
+                [data.longitude for data in signal_data_list],
+                [data.rsrp for data in signal_data_list],
+                [data.rssi for data in signal_data_list]
+            )
+            if bins:
+                self._upsert_bins(cursor, bins)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error updating heatmap bins: {e}")
+            return False
+    
+    def rebuild(self):
+        """Recompute all bins from stored samples (safe to run on a background thread)"""
+        def store(cursor, rows):
+            columns = np.array(rows, dtype=np.float64)
+            self._upsert_bins(cursor, self._aggregate(
+                columns[:, 1], columns[:, 2], columns[:, 3], columns[:, 4]
+            ))
+        
+        try:
+            sample_count = rebuild_in_chunks(
+                self.db_path, self.gate, 'latitude, longitude, rsrp, rssi',
+                lambda cursor: cursor.execute('DELETE FROM heatmap_bins'), store,
+                self.REBUILD_CHUNK_SIZE
+            )
+            self.needs_rebuild = False
+            if sample_count:
+                print(f"Heatmap bins built for {sample_count} samples")
+            return True
+        except Exception as e:
+            print(f"Error rebuilding heatmap bins: {e}")
+            return False
+    
+    def clear(self):
+        """Delete all bins"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('DELETE FROM heatmap_bins')
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error clearing heatmap bins: {e}")
+            return False
+    
+    def resolve_zoom(self, zoom):
+        """Get the stored zoom level to use for a map zoom"""
+        levels = [level for level in self.zoom_levels if level <= zoom]
+        return levels[-1] if levels else self.zoom_levels[0]
+    
+    def query_viewport(self, min_lat, min_lon, max_lat, max_lon, zoom):
+        """Get coverage bins for the tiles covering a viewport
+        
+        Args:
+            min_lat, min_lon, max_lat, max_lon (float): Viewport in degrees
+            zoom (int): Map zoom, snapped down to the nearest stored level
+        
+        Returns:
+            list: Dicts with zoom, x, y, bounds, sample_count, avg_rsrp and avg_rssi
+                (averages are None for tiles without that measurement)
+        """
+        try:
+            zoom = self.resolve_zoom(zoom)
+            min_x, min_y, max_x, max_y = tile_range(min_lat, min_lon, max_lat, max_lon, zoom)
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT x, y, sample_count, rsrp_sum, rsrp_count, rssi_sum, rssi_count
+                FROM heatmap_bins
+                WHERE zoom = ? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ?
+            ''', (zoom, min_x, max_x, min_y, max_y))
+            rows = cursor.fetchall()
+            conn.close()
+            
+            tiles = []
+            for x, y, sample_count, rsrp_sum, rsrp_count, rssi_sum, rssi_count in rows:
+                tiles.append({
+                    'zoom': zoom,
+                    'x': x,
+                    'y': y,
+                    'bounds': tile_bounds(x, y, zoom),
+                    'sample_count': sample_count,
+                    'avg_rsrp': rsrp_sum / rsrp_count if rsrp_count else None,
+                    'avg_rssi': rssi_sum / rssi_count if rssi_count else None
+                })
+            return tiles
+        except Exception as e:
+            print(f"Error querying heatmap bins: {e}")
+            return []
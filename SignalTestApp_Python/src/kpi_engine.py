@@ -0,0 +1,526 @@
+# Per-cell KPI aggregation module
+
+import sqlite3
+import numpy as np
+from derived_data import RebuildGate, has_samples, rebuild_in_chunks
+
+# Signal columns KPIs are kept for, and the percentiles reported for each
+KPI_COLUMNS = ('rsrp', 'rssi', 'sinr', 'rsrq')
+KPI_PERCENTILES = (5, 50, 95)
+
+# Statistics stored per column in cell_kpis, usable for ranking cells
+KPI_STATISTICS = ('count', 'mean', 'min', 'max') + tuple(f'p{p}' for p in KPI_PERCENTILES)
+
+# Period key of the all-time sketches; other periods are sample dates (YYYY-MM-DD)
+ALL_PERIODS = '*'
+
+# Offset packing (group, value) pairs into one integer key; readings are within +/-2048
+VALUE_OFFSET = 2048
+KEY_STRIDE = 4096
+
+def serving_cell(network_type, cgi, nr_cgi):
+    """Get the serving cell id of a sample: the NR cell on 5G, otherwise the LTE cell"""
+    if network_type == '5G' and nr_cgi and nr_cgi != 'N/A':
+        return nr_cgi
+    if cgi and cgi != 'N/A':
+        return cgi
+    return ''
+
+def valid_readings(readings):
+    """Get a mask of real readings in a float array
+    
+    Zero and NaN mean no reading; values outside +/-VALUE_OFFSET are
+    placeholders such as Android's CellInfo.UNAVAILABLE (2147483647), which
+    is stored as-is for RSSI and SINR.
+    """
+    return (readings != 0) & (np.abs(readings) < VALUE_OFFSET)
+
+def serving_cells(network_types, cgis, nr_cgis):
+    """Get serving cell ids for sample arrays (vectorized serving_cell)"""
+    network_types = np.asarray(network_types)
+    cgis = np.array([cgi if cgi and cgi != 'N/A' else '' for cgi in cgis])
+    nr_cgis = np.array([nr_cgi if nr_cgi and nr_cgi != 'N/A' else '' for nr_cgi in nr_cgis])
+    return np.where((network_types == '5G') & (nr_cgis != ''), nr_cgis, cgis)
+
+class QuantileSketch:
+    """Mergeable histogram of integer readings
+    
+    Signal readings are whole dBm/dB values in a range of ~100, so a histogram
+    of counts per value is both small (bounded by the value range, not the
+    sample count) and exact: quantiles, mean, min and max computed from it
+    equal those of the raw samples. Sketches merge by adding counts, so
+    per-period sketches combine into any larger period.
+    """
+    
+    def __init__(self, values=None, counts=None):
+        self.values = np.asarray(values if values is not None else [], dtype=np.int64)
+        self.counts = np.asarray(counts if counts is not None else [], dtype=np.int64)
+    
+    @classmethod
+    def from_samples(cls, samples):
+        """Build a sketch from readings (zero, NaN and placeholder readings are skipped)"""
+        samples = np.asarray(samples, dtype=np.float64)
+        samples = samples[valid_readings(samples)]
+        values, counts = np.unique(np.rint(samples).astype(np.int64), return_counts=True)
+        return cls(values, counts)
+    
+    @classmethod
+    def from_bytes(cls, blob):
+        """Load a sketch stored with to_bytes()"""
+        if not blob:
+            return cls()
+        size = len(blob) // 6
+        values = np.frombuffer(blob, dtype='<i2', count=size)
+        counts = np.frombuffer(blob, dtype='<u4', count=size, offset=size * 2)
+        return cls(values, counts)
+    
+    def to_bytes(self):
+        """Get compact storage form: int16 values followed by uint32 counts"""
+        return self.values.astype('<i2').tobytes() + self.counts.astype('<u4').tobytes()
+    
+    def merge(self, other):
+        """Get a sketch of the readings of both sketches"""
+        if not len(other.values):
+            return self
+        if not len(self.values):
+            return other
+        values, inverse = np.unique(np.concatenate((self.values, other.values)), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate((self.counts, other.counts)))
+        return QuantileSketch(values, counts.astype(np.int64))
+    
+    @property
+    def count(self):
+        """Get number of readings"""
+        return int(self.counts.sum())
+    
+    def quantile(self, q):
+        """Get the nearest-rank q quantile (0-1), or None if empty"""
+        total = self.count
+        if not total:
+            return None
+        rank = max(int(np.ceil(q * total)), 1)
+        return int(self.values[np.searchsorted(np.cumsum(self.counts), rank)])
+    
+    def get_stats(self):
+        """Get {statistic: value} for KPI_STATISTICS (None values when empty)"""
+        total = self.count
+        if not total:
+            return {statistic: (0 if statistic == 'count' else None) for statistic in KPI_STATISTICS}
+        
+        stats = {
+            'count': total,
+            'mean': float((self.values * self.counts).sum() / total),
+            'min': int(self.values[0]),
+            'max': int(self.values[-1])
+        }
+        for percentile in KPI_PERCENTILES:
+            stats[f'p{percentile}'] = self.quantile(percentile / 100.0)
+        return stats
+
+class KpiEngine:
+    """Keep per-cell signal statistics up to date as samples are stored
+    
+    Samples are summarised per serving cell and sample date into a quantile
+    sketch per signal column, plus an all-time sketch per cell whose statistics
+    are stored as plain columns in cell_kpis. Queries read those tables only,
+    never signal_data.
+    """
+    
+    # Rows read per chunk when rebuilding from signal_data
+    REBUILD_CHUNK_SIZE = 50000
+    
+    def __init__(self, storage_utils):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.needs_rebuild = False
+        self._init_tables()
+        self.gate = RebuildGate(building=self.needs_rebuild)
+        
+        # Keep KPIs up to date as samples are stored
+        storage_utils.add_insert_listener(self.add_samples)
+        storage_utils.add_clear_listener(self.clear)
+        storage_utils.add_import_listener(self.rebuild)
+    
+    def _init_tables(self):
+        """Create KPI tables; needs_rebuild is set if they are new and samples exist"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='cell_kpis'"
+            )
+            table_exists = cursor.fetchone() is not None
+            needs_rebuild = not table_exists and has_samples(cursor)
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cell_kpi_periods (
+                    cell TEXT,
+                    period TEXT,
+                    sample_count INTEGER,
+                    first_seen TEXT,
+                    last_seen TEXT,
+                    PRIMARY KEY (cell, period)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cell_kpi_sketches (
+                    cell TEXT,
+                    period TEXT,
+                    metric TEXT,
+                    sketch BLOB,
+                    PRIMARY KEY (cell, period, metric)
+                ) WITHOUT ROWID
+            ''')
+            
+            stat_columns = ',\n'.join(
+                f"{column}_{statistic} {'INTEGER' if statistic == 'count' else 'REAL'}"
+                for column in KPI_COLUMNS for statistic in KPI_STATISTICS
+            )
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS cell_kpis (
+                    cell TEXT PRIMARY KEY,
+                    network_type TEXT,
+                    operator TEXT,
+                    sample_count INTEGER,
+                    first_seen TEXT,
+                    last_seen TEXT,
+                    {stat_columns}
+                ) WITHOUT ROWID
+            ''')
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error initializing KPI tables: {e}")
+            return
+        
+        # KPIs of existing samples are built by rebuild(), off the UI thread
+        self.needs_rebuild = needs_rebuild
+    
+    def _aggregate(self, cells, network_types, operators, timestamps, columns):
+        """Summarise sample arrays per (cell, period)
+        
+        Args:
+            cells, network_types, operators, timestamps (list): Per-sample values
+            columns (dict): {column: readings} for KPI_COLUMNS
+        
+        Returns:
+            list: (cell, period, summary) with summary holding sample_count,
+                first_seen, last_seen, network_type, operator and a
+                QuantileSketch per column
+        """
+        # Samples without a cell id cannot be attributed
+        keep = [index for index, cell in enumerate(cells) if cell]
+        if not keep:
+            return []
+        if len(keep) < len(cells):
+            cells = [cells[index] for index in keep]
+            network_types = [network_types[index] for index in keep]
+            operators = [operators[index] for index in keep]
+            timestamps = [timestamps[index] for index in keep]
+            columns = {column: np.asarray(readings)[keep] for column, readings in columns.items()}
+        
+        timestamps = np.array([timestamp or '' for timestamp in timestamps])
+        periods = np.array([timestamp[:10] for timestamp in timestamps.tolist()])
+        group_keys = np.char.add(np.char.add(np.array(cells), '|'), periods)
+        unique_keys, inverse = np.unique(group_keys, return_inverse=True)
+        
+        # Time order within each group gives first/last seen and the latest cell info
+        order = np.lexsort((timestamps, inverse))
+        boundaries = np.searchsorted(inverse[order], np.arange(len(unique_keys) + 1))
+        
+        groups = []
+        for index, key in enumerate(unique_keys.tolist()):
+            cell, period = key.rsplit('|', 1)
+            first, last = order[boundaries[index]], order[boundaries[index + 1] - 1]
+            groups.append((cell, period, {
+                'sample_count': int(boundaries[index + 1] - boundaries[index]),
+                'first_seen': timestamps[first],
+                'last_seen': timestamps[last],
+                'network_type': network_types[last],
+                'operator': operators[last]
+            }))
+        
+        # One np.unique per column over packed (group, value) keys builds all sketches
+        for column, readings in columns.items():
+            readings = np.asarray(readings, dtype=np.float64)
+            valid = valid_readings(readings)
+            values = np.rint(readings[valid]).astype(np.int64)
+            packed, counts = np.unique(
+                inverse[valid] * KEY_STRIDE + values + VALUE_OFFSET, return_counts=True
+            )
+            group_index, packed_values = np.divmod(packed, KEY_STRIDE)
+            splits = np.searchsorted(group_index, np.arange(len(unique_keys) + 1))
+            for index, (cell, period, summary) in enumerate(groups):
+                start, end = splits[index], splits[index + 1]
+                summary[column] = QuantileSketch(
+                    packed_values[start:end] - VALUE_OFFSET, counts[start:end]
+                )
+        
+        return groups
+    
+    def _load_sketches(self, cursor, cell, period):
+        """Get {column: QuantileSketch} stored for a cell and period"""
+        cursor.execute(
+            'SELECT metric, sketch FROM cell_kpi_sketches WHERE cell = ? AND period = ?',
+            (cell, period)
+        )
+        return {metric: QuantileSketch.from_bytes(blob) for metric, blob in cursor.fetchall()}
+    
+    def _store_groups(self, cursor, groups):
+        """Merge per-(cell, period) summaries into the stored tables"""
+        # Per-cell totals of this batch, merged into the all-time sketches
+        cell_totals = {}
+        for cell, period, summary in groups:
+            total = cell_totals.get(cell)
+            if total is None:
+                cell_totals[cell] = dict(summary)
+                continue
+            total['sample_count'] += summary['sample_count']
+            total['first_seen'] = min(total['first_seen'], summary['first_seen'])
+            if summary['last_seen'] >= total['last_seen']:
+                total['last_seen'] = summary['last_seen']
+                total['network_type'] = summary['network_type']
+                total['operator'] = summary['operator']
+            for column in KPI_COLUMNS:
+                total[column] = total[column].merge(summary[column])
+        
+        period_rows = [(cell, period, summary) for cell, period, summary in groups]
+        period_rows.extend((cell, ALL_PERIODS, total) for cell, total in cell_totals.items())
+        
+        sketch_rows = []
+        merged_totals = {}
+        for cell, period, summary in period_rows:
+            stored = self._load_sketches(cursor, cell, period)
+            merged = {}
+            for column in KPI_COLUMNS:
+                merged[column] = stored.get(column, QuantileSketch()).merge(summary[column])
+                sketch_rows.append((cell, period, column, merged[column].to_bytes()))
+            if period == ALL_PERIODS:
+                merged_totals[cell] = merged
+        
+        cursor.executemany('''
+            INSERT INTO cell_kpi_periods (cell, period, sample_count, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (cell, period) DO UPDATE SET
+                sample_count = sample_count + excluded.sample_count,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen)
+        ''', [
+            (cell, period, summary['sample_count'], summary['first_seen'], summary['last_seen'])
+            for cell, period, summary in period_rows
+        ])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO cell_kpi_sketches (cell, period, metric, sketch)
+            VALUES (?, ?, ?, ?)
+        ''', sketch_rows)
+        
+        # cell_kpis mirrors the all-time period row plus statistics of the merged sketches
+        stat_names = [f'{column}_{statistic}' for column in KPI_COLUMNS for statistic in KPI_STATISTICS]
+        kpi_rows = []
+        for cell, total in cell_totals.items():
+            stats = []
+            for column in KPI_COLUMNS:
+                column_stats = merged_totals[cell][column].get_stats()
+                stats.extend(column_stats[statistic] for statistic in KPI_STATISTICS)
+            kpi_rows.append([cell, total['network_type'], total['operator']] + stats + [cell])
+        
+        cursor.executemany(f'''
+            INSERT OR REPLACE INTO cell_kpis (
+                cell, network_type, operator, sample_count, first_seen, last_seen,
+                {', '.join(stat_names)}
+            )
+            SELECT ?, ?, ?, sample_count, first_seen, last_seen, {', '.join('?' * len(stat_names))}
+            FROM cell_kpi_periods WHERE cell = ? AND period = '{ALL_PERIODS}'
+        ''', kpi_rows)
+    
+    def add_samples(self, signal_data_list):
+        """Add newly stored samples to the KPIs"""
+        try:
+            # Take the write lock before reading the stored sketches, so that
+            # concurrent inserts cannot merge into the same old sketch
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            signal_data_list = self.gate.new_samples(signal_data_list)
+            groups = self._aggregate(
+                [serving_cell(data.network_type, data.cgi, data.nr_cgi) for data in signal_data_list],
+                [data.network_type for data in signal_data_list],
+                [data.operator for data in signal_data_list],
+                [data.timestamp for data in signal_data_list],
+                {
+                    column: [getattr(data, column) or 0 for data in signal_data_list]
+                    for column in KPI_COLUMNS
+                }
+            )
+            if groups:
+                self._store_groups(cursor, groups)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error updating cell KPIs: {e}")
+            return False
+    
+    def _store_rows(self, cursor, rows):
+        """Add (id, network_type, cgi, nr_cgi, operator, timestamp, *KPI_COLUMNS) rows"""
+        columns = list(zip(*rows))
+        self._store_groups(cursor, self._aggregate(
+            [serving_cell(*row[1:4]) for row in rows],
+            list(columns[1]), list(columns[4]), list(columns[5]),
+            {
+                column: [value or 0 for value in columns[6 + index]]
+                for index, column in enumerate(KPI_COLUMNS)
+            }
+        ))
+    
+    def _delete_all(self, cursor):
+        """Delete the rows of all KPI tables"""
+        for table in ('cell_kpi_periods', 'cell_kpi_sketches', 'cell_kpis'):
+            cursor.execute(f'DELETE FROM {table}')
+    
+    def rebuild(self):
+        """Recompute all KPIs from stored samples (safe to run on a background thread)"""
+        try:
+            sample_count = rebuild_in_chunks(
+                self.db_path, self.gate,
+                f"network_type, cgi, nr_cgi, operator, timestamp, {', '.join(KPI_COLUMNS)}",
+                self._delete_all, self._store_rows, self.REBUILD_CHUNK_SIZE
+            )
+            self.needs_rebuild = False
+            if sample_count:
+                print(f"Cell KPIs built for {sample_count} samples")
+            return True
+        except Exception as e:
+            print(f"Error rebuilding cell KPIs: {e}")
+            return False
+    
+    def clear(self):
+        """Delete all KPIs"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            self._delete_all(conn.cursor())
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error clearing cell KPIs: {e}")
+            return False
+    
+    def get_cell_kpis(self, cell):
+        """Get all-time KPIs of a cell
+        
+        Returns:
+            dict: cell, network_type, operator, sample_count, first_seen,
+                last_seen and {column}_{statistic} for every KPI column and
+                statistic, or None if the cell has no samples
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM cell_kpis WHERE cell = ?', (cell,))
+            row = cursor.fetchone()
+            conn.close()
+            return dict(row) if row else None
+        except Exception as e:
+            print(f"Error getting cell KPIs: {e}")
+            return None
+    
+    def get_top_cells(self, metric='rsrp', statistic='p50', limit=10, worst=False, min_samples=1):
+        """Get cells ranked by a KPI
+        
+        Args:
+            metric (str): One of KPI_COLUMNS
+            statistic (str): One of KPI_STATISTICS
+            limit (int): Number of cells
+            worst (bool): Lowest values first instead of highest (higher is
+                better for every KPI column)
+            min_samples (int): Leave out cells with fewer readings of metric
+        
+        Returns:
+            list: KPI dicts as returned by get_cell_kpis
+        """
+        if metric not in KPI_COLUMNS or statistic not in KPI_STATISTICS:
+            raise ValueError(f"Invalid KPI: {metric} {statistic}")
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM cell_kpis
+                WHERE {metric}_count >= ? AND {metric}_{statistic} IS NOT NULL
+                ORDER BY {metric}_{statistic} {'ASC' if worst else 'DESC'}
+                LIMIT ?
+            ''', (min_samples, limit))
+            rows = cursor.fetchall()
+            conn.close()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting top cells: {e}")
+            return []
+    
+    def get_periods(self, cell=None):
+        """Get the periods with stored sketches, optionally for one cell"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            if cell is None:
+                cursor.execute(
+                    'SELECT DISTINCT period FROM cell_kpi_periods WHERE period != ? ORDER BY period',
+                    (ALL_PERIODS,)
+                )
+            else:
+                cursor.execute(
+                    'SELECT period FROM cell_kpi_periods WHERE cell = ? AND period != ? ORDER BY period',
+                    (cell, ALL_PERIODS)
+                )
+            periods = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return periods
+        except Exception as e:
+            print(f"Error getting KPI periods: {e}")
+            return []
+    
+    def merge_sketches(self, metric='rsrp', cells=None, periods=None):
+        """Merge stored sketches into one, e.g. a cell over some days or a cluster of cells
+        
+        Args:
+            metric (str): One of KPI_COLUMNS
+            cells (list): Cell ids, None for all cells
+            periods (list): Periods (sample dates), None for all time
+        
+        Returns:
+            QuantileSketch: Merged sketch; get_stats() gives its KPIs
+        """
+        if metric not in KPI_COLUMNS:
+            raise ValueError(f"Invalid KPI column: {metric}")
+        
+        try:
+            conditions = ['metric = ?']
+            params = [metric]
+            if periods is None:
+                conditions.append('period = ?')
+                params.append(ALL_PERIODS)
+            else:
+                conditions.append(f"period IN ({', '.join('?' * len(periods))})")
+                params.extend(periods)
+            if cells is not None:
+                conditions.append(f"cell IN ({', '.join('?' * len(cells))})")
+                params.extend(cells)
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT sketch FROM cell_kpi_sketches WHERE {' AND '.join(conditions)}", params
+            )
+            merged = QuantileSketch()
+            for (blob,) in cursor.fetchall():
+                merged = merged.merge(QuantileSketch.from_bytes(blob))
+            conn.close()
+            return merged
+        except Exception as e:
+            print(f"Error merging KPI sketches: {e}")
+            return QuantileSketch()
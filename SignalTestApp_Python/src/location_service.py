@@ -1,7 +1,7 @@
 # Location services module
 
 import platform
-import requests
+from profiler import timed
 
 class LocationService:
     """Location services for GPS and geocoding"""
@@ -128,6 +128,8 @@ class LocationService:
     def _reverse_geocode(self, latitude, longitude):
         """Reverse geocode coordinates to address"""
         try:
+            import requests
+            
             # Use OpenStreetMap Nominatim API
             url = f"https://nominatim.openstreetmap.org/reverse"
             params = {
@@ -152,6 +154,7 @@ class LocationService:
         
         return None
     
+    @timed('location')
     def update_signal_data_location(self, signal_data):
         """Update signal data with location information"""
         location = self.get_location()
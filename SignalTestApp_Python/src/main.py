@@ -1,32 +1,43 @@
 # Main application entry point
 
+import startup_timer
+import profiler
+
+# Opt-in profiling starts before anything else is imported so imports are timed too
+profiler.enable_if_requested()
+
+# Workers are forked before Kivy or any service starts a thread
+from worker_pool import get_worker_pool, shutdown_worker_pool
+get_worker_pool()
+
 import kivy
 kivy.require('2.0.0')
 
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager
 from kivy.lang import Builder
 from kivy.core.window import Window
 from kivy.core.text import LabelBase
+from kivy.clock import Clock
 from kivy.config import Config
 import os
+import threading
 
 # Set default font to support Chinese characters
 # Use system fonts that are likely to support Chinese
 Config.set('kivy', 'default_font', ['Arial Unicode MS', 'PingFang SC', 'Hiragino Sans GB', 'WenQuanYi Micro Hei', 'Arial', 'sans-serif'])
 
-# Import screens
+# Only what the first screen needs is imported up front; other screens and
+# services (NumPy, PIL, pandas, requests) are imported when first used
+from ui.lazy_screen_manager import LazyScreenManager
 from ui.main_screen import MainScreen
-from ui.camera_screen import CameraScreen
-from ui.history_screen import HistoryScreen
-from ui.chart_screen import ChartScreen
 
 # Import services
 from signal_collector import SignalCollector
-from camera_utils import CameraUtils
 from location_service import LocationService
 from storage_utils import StorageUtils
 
+startup_timer.mark('imports')
+
 class SignalTestApp(App):
     """Main application class"""
     
@@ -36,63 +47,229 @@ class SignalTestApp(App):
         self.camera_utils = None
         self.location_service = None
         self.storage_utils = None
+        self.heatmap_engine = None
+        self.kpi_engine = None
+        self.event_engine = None
+        self.session_manager = None
+        self.report_generator = None
+        self.data_importer = None
+        self.rebuild_thread = None
+        self.tile_renderer = None
+        self.photo_pipeline = None
+        self.photo_catalog = None
+        self.burst_capture = None
+        self.time_series_source = None
+        self.live_buffer = None
+        self.live_sampler = None
+        self.chart_exporter = None
         self.screen_manager = None
         self.android_context = None
     
     def build(self):
         """Build the application"""
+        with profiler.span('SignalTestApp.build'):
+            return self._build()
+    
+    def _build(self):
+        """Build services and the main screen"""
         # Set window size for desktop
         Window.size = (800, 600)
         
         # Initialize services
         self._initialize_services()
         
-        # Create screen manager
-        self.screen_manager = ScreenManager()
+        # Create screen manager; screens other than main are built on first visit
+        self.screen_manager = LazyScreenManager()
+        self.screen_manager.register('camera', self._build_camera_screen)
+        self.screen_manager.register('history', self._build_history_screen)
+        self.screen_manager.register('chart', self._build_chart_screen)
+        self.screen_manager.register('gallery', self._build_gallery_screen)
         
-        # Create screens
         main_screen = MainScreen(name='main')
         main_screen.signal_collector = self.signal_collector
         main_screen.location_service = self.location_service
         main_screen.storage_utils = self.storage_utils
         main_screen.camera_utils = self.camera_utils
-        
-        camera_screen = CameraScreen(name='camera')
-        camera_screen.camera_utils = self.camera_utils
-        camera_screen.signal_collector = self.signal_collector
-        camera_screen.location_service = self.location_service
-        camera_screen.storage_utils = self.storage_utils
-        
-        history_screen = HistoryScreen(name='history')
-        history_screen.storage_utils = self.storage_utils
-        
-        chart_screen = ChartScreen(name='chart')
-        chart_screen.storage_utils = self.storage_utils
-        
-        # Add screens to manager
         self.screen_manager.add_widget(main_screen)
-        self.screen_manager.add_widget(camera_screen)
-        self.screen_manager.add_widget(history_screen)
-        self.screen_manager.add_widget(chart_screen)
         
         # Set initial screen
         self.screen_manager.current = 'main'
         
+        startup_timer.mark('build')
         return self.screen_manager
     
+    def on_start(self):
+        """Handle app start"""
+        Window.bind(on_flip=self._on_first_frame)
+    
+    def _on_first_frame(self, *args):
+        """Finish startup once the first frame is on screen"""
+        Window.unbind(on_flip=self._on_first_frame)
+        startup_timer.mark('first frame')
+        profiler.instant('first frame')
+        
+        # Camera and analysis services are started after the first frame;
+        # no sample can be stored before this runs
+        self._initialize_deferred_services()
+        startup_timer.mark('deferred services')
+        startup_timer.report()
+        
+        if startup_timer.is_benchmark_run():
+            Clock.schedule_once(lambda dt: self.stop())
+    
+    @profiler.timed('phase')
     def _initialize_services(self):
-        """Initialize all services"""
+        """Initialize services the main screen needs"""
         # Try to get Android context if running on Android
         self._get_android_context()
         
         # Initialize services
         self.signal_collector = SignalCollector(context=self.android_context)
-        self.camera_utils = CameraUtils(app=self)
         self.location_service = LocationService(context=self.android_context)
         self.storage_utils = StorageUtils(app=self)
         
         print("Services initialized successfully")
     
+    @profiler.timed('phase')
+    def _initialize_deferred_services(self):
+        """Initialize camera and analysis services (once)"""
+        if self.camera_utils:
+            return
+        
+        from camera_utils import CameraUtils
+        from heatmap_engine import HeatmapEngine
+        from kpi_engine import KpiEngine
+        from event_engine import EventEngine
+        from session_manager import SessionManager
+        from report_generator import ReportGenerator
+        from data_importer import DataImporter
+        from tile_renderer import TileRenderer
+        from photo_pipeline import PhotoCapturePipeline
+        from photo_catalog import PhotoCatalog
+        from burst_capture import BurstCapture
+        
+        self.camera_utils = CameraUtils(app=self)
+        self.heatmap_engine = HeatmapEngine(self.storage_utils)
+        self.kpi_engine = KpiEngine(self.storage_utils)
+        self.event_engine = EventEngine(self.storage_utils)
+        self.signal_collector.add_sample_listener(self._on_live_sample)
+        self.session_manager = SessionManager(self.storage_utils)
+        self.report_generator = ReportGenerator(
+            self.storage_utils, self.session_manager, self.event_engine
+        )
+        self.data_importer = DataImporter(self.storage_utils)
+        self.tile_renderer = TileRenderer(self.storage_utils)
+        self.photo_catalog = PhotoCatalog(
+            self.storage_utils, self.camera_utils.photo_directory,
+            self.camera_utils.get_thumbnail_path
+        )
+        self.camera_utils.photo_catalog = self.photo_catalog
+        self.burst_capture = BurstCapture(
+            self.camera_utils, self.signal_collector, self.storage_utils, self.location_service
+        )
+        self.photo_pipeline = PhotoCapturePipeline(
+            self.camera_utils, self.storage_utils, self.location_service
+        )
+        
+        # New derived tables are built from existing samples off the UI thread
+        engines = [
+            engine for engine in (
+                self.heatmap_engine, self.kpi_engine, self.event_engine, self.session_manager
+            )
+            if engine.needs_rebuild
+        ]
+        if engines:
+            self.rebuild_thread = threading.Thread(
+                target=self._rebuild_derived_data, args=(engines,), daemon=True
+            )
+            self.rebuild_thread.start()
+        
+        main_screen = self.screen_manager.get_built_screen('main') if self.screen_manager else None
+        if main_screen:
+            main_screen.camera_utils = self.camera_utils
+            main_screen.session_manager = self.session_manager
+            main_screen.report_generator = self.report_generator
+            main_screen.event_engine = self.event_engine
+            self.event_engine.add_event_listener(main_screen.on_live_events)
+        
+        print("Deferred services initialized successfully")
+    
+    def _rebuild_derived_data(self, engines):
+        """Rebuild engines' tables from stored samples (runs on rebuild_thread)"""
+        for engine in engines:
+            engine.rebuild()
+    
+    def _on_live_sample(self, signal_data):
+        """Feed a collected sample, with the current location, to live event detection
+        
+        Sample listeners run on the collecting thread (LiveSampler's worker at
+        10 Hz), so only the last known location is attached here; reverse
+        geocoding stays in update_signal_data_location.
+        """
+        if not signal_data.latitude and not signal_data.longitude:
+            location = self.location_service.get_location()
+            signal_data.latitude = location['latitude']
+            signal_data.longitude = location['longitude']
+        self.event_engine.add_live_sample(signal_data)
+    
+    @profiler.timed('phase')
+    def _build_camera_screen(self):
+        """Build camera screen"""
+        from ui.camera_screen import CameraScreen
+        self._initialize_deferred_services()
+        
+        camera_screen = CameraScreen(name='camera')
+        camera_screen.camera_utils = self.camera_utils
+        camera_screen.signal_collector = self.signal_collector
+        camera_screen.location_service = self.location_service
+        camera_screen.storage_utils = self.storage_utils
+        camera_screen.photo_pipeline = self.photo_pipeline
+        camera_screen.burst_capture = self.burst_capture
+        return camera_screen
+    
+    @profiler.timed('phase')
+    def _build_history_screen(self):
+        """Build history screen"""
+        from ui.history_screen import HistoryScreen
+        
+        history_screen = HistoryScreen(name='history')
+        history_screen.storage_utils = self.storage_utils
+        return history_screen
+    
+    @profiler.timed('phase')
+    def _build_chart_screen(self):
+        """Build chart screen"""
+        from ui.chart_screen import ChartScreen
+        from time_series import TimeSeriesSource, SampleRingBuffer, LiveSampler
+        from chart_export import ChartExporter
+        
+        if not self.time_series_source:
+            self.time_series_source = TimeSeriesSource(self.storage_utils)
+            
+            # Every collected sample feeds the live chart's buffer
+            self.live_buffer = SampleRingBuffer()
+            self.signal_collector.add_sample_listener(self.live_buffer.push)
+            self.live_sampler = LiveSampler(self.signal_collector)
+            self.chart_exporter = ChartExporter(self.storage_utils)
+        
+        chart_screen = ChartScreen(name='chart')
+        chart_screen.storage_utils = self.storage_utils
+        chart_screen.time_series_source = self.time_series_source
+        chart_screen.live_buffer = self.live_buffer
+        chart_screen.live_sampler = self.live_sampler
+        chart_screen.chart_exporter = self.chart_exporter
+        return chart_screen
+    
+    @profiler.timed('phase')
+    def _build_gallery_screen(self):
+        """Build gallery screen"""
+        from ui.gallery_screen import GalleryScreen
+        self._initialize_deferred_services()
+        
+        gallery_screen = GalleryScreen(name='gallery')
+        gallery_screen.camera_utils = self.camera_utils
+        return gallery_screen
+    
     def _get_android_context(self):
         """Get Android context using PyJNIus"""
         try:
@@ -113,11 +290,47 @@ class SignalTestApp(App):
         """Get Android context (for storage utils)"""
         return self.android_context
     
+    def on_pause(self):
+        """Handle app pause, releasing the camera while in the background"""
+        camera_screen = self.screen_manager.get_built_screen('camera') if self.screen_manager else None
+        if camera_screen:
+            camera_screen.release_camera()
+        
+        # The app may be killed while paused, so save the profile now
+        self._write_profile()
+        return True
+    
+    def on_resume(self):
+        """Handle app resume, reopening the camera if its screen is shown"""
+        if self.screen_manager and self.screen_manager.current == 'camera':
+            self.screen_manager.get_screen('camera').on_enter()
+    
     def on_stop(self):
         """Handle app stop"""
         print("App stopping...")
         # Clean up resources if needed
+        if self.photo_pipeline:
+            self.photo_pipeline.shutdown()
+        if self.burst_capture:
+            self.burst_capture.shutdown()
+        if self.live_sampler:
+            self.live_sampler.stop()
+        if self.chart_exporter:
+            self.chart_exporter.shutdown()
+        if self.session_manager:
+            self.session_manager.stop_session()
+        if self.report_generator:
+            self.report_generator.shutdown()
+        if self.data_importer:
+            self.data_importer.shutdown()
+        shutdown_worker_pool()
+        self._write_profile()
         super(SignalTestApp, self).on_stop()
+    
+    def _write_profile(self):
+        """Write the profiling trace next to the database, if profiling is on"""
+        if profiler.is_enabled() and self.storage_utils:
+            profiler.write_report(os.path.dirname(os.path.abspath(self.storage_utils.db_path)))
 
 if __name__ == '__main__':
     # Run the application
@@ -4,6 +4,9 @@ class SignalData:
     """Signal data model to store all signal-related information"""
     
     def __init__(self):
+        # Database row ID (set when loaded from storage)
+        self.id = None
+        
         # Network information
         self.network_type = "Unknown"
         self.operator = "Unknown"
@@ -34,6 +37,9 @@ class SignalData:
         
         # Photo path (if any)
         self.photo_path = ""
+        
+        # Test session the sample was recorded in (if any)
+        self.session_id = None
     
     def to_dict(self):
         """Convert to dictionary for storage"""
@@ -56,7 +62,8 @@ class SignalData:
             "longitude": self.longitude,
             "location_description": self.location_description,
             "timestamp": self.timestamp,
-            "photo_path": self.photo_path
+            "photo_path": self.photo_path,
+            "session_id": self.session_id
         }
     
     @classmethod
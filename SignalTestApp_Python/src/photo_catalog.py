@@ -0,0 +1,309 @@
+# Photo catalog module
+
+import os
+import time
+import sqlite3
+import threading
+
+# Extensions of files picked up when reconciling a photo directory
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.webp')
+
+class PhotoCatalog:
+    """Index of saved photos in SQLite, maintained at capture and delete time
+    
+    Listing photos is an indexed query on capture time instead of a directory
+    scan, and each photo is linked to the signal_data row stored with it.
+    """
+    
+    def __init__(self, storage_utils, photo_directory, thumbnail_path_func=None):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.photo_directory = photo_directory
+        self.thumbnail_path_func = thumbnail_path_func
+        self.reconcile_thread = None
+        self._init_table()
+        
+        # Link photos to their samples as the samples are stored
+        storage_utils.add_insert_listener(self._on_samples_inserted)
+        storage_utils.add_clear_listener(self._on_samples_cleared)
+    
+    def _init_table(self):
+        """Create photos table, cataloging existing photos once in the background"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='photos'"
+            )
+            table_exists = cursor.fetchone() is not None
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS photos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL UNIQUE,
+                    filename TEXT,
+                    size INTEGER,
+                    capture_time REAL,
+                    thumbnail_path TEXT,
+                    signal_data_id INTEGER REFERENCES signal_data (id) ON DELETE SET NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_photos_capture_time
+                ON photos (capture_time)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_photos_signal_data_id
+                ON photos (signal_data_id)
+            ''')
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error initializing photo catalog: {e}")
+            return
+        
+        if not table_exists:
+            self.reconcile_thread = threading.Thread(target=self.reconcile, daemon=True)
+            self.reconcile_thread.start()
+    
+    def _row_to_photo(self, row):
+        """Convert a photos row to a photo dict"""
+        return {
+            'filename': row['filename'],
+            'path': row['path'],
+            'timestamp': row['capture_time'],
+            'size': row['size'],
+            'thumbnail_path': row['thumbnail_path'],
+            'signal_data_id': row['signal_data_id']
+        }
+    
+    def add_photo(self, photo_path, capture_time=None, thumbnail_path=None, signal_data_id=None):
+        """Add or update a photo in the catalog"""
+        return self.add_photos([(photo_path, capture_time, thumbnail_path, signal_data_id)])
+    
+    def add_photos(self, photos):
+        """Add or update many photos in one transaction
+        
+        Args:
+            photos (list): (photo_path, capture_time, thumbnail_path, signal_data_id)
+                tuples; capture_time defaults to now
+        """
+        try:
+            now = time.time()
+            rows = [
+                (
+                    photo_path, os.path.basename(photo_path), os.path.getsize(photo_path),
+                    now if capture_time is None else capture_time, thumbnail_path, signal_data_id
+                )
+                for photo_path, capture_time, thumbnail_path, signal_data_id in photos
+            ]
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO photos (
+                    path, filename, size, capture_time, thumbnail_path, signal_data_id
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    size = excluded.size,
+                    capture_time = excluded.capture_time,
+                    thumbnail_path = COALESCE(excluded.thumbnail_path, thumbnail_path),
+                    signal_data_id = COALESCE(excluded.signal_data_id, signal_data_id)
+            ''', rows)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error adding photos to catalog: {e}")
+            return False
+    
+    def remove_photo(self, photo_path):
+        """Remove a photo from the catalog"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM photos WHERE path = ?', (photo_path,))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error removing photo from catalog: {e}")
+            return False
+    
+    def _build_where(self, start_time=None, end_time=None, linked=None):
+        """Get WHERE clause and parameters for photo filters"""
+        conditions = []
+        params = []
+        if start_time is not None:
+            conditions.append('capture_time >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append('capture_time <= ?')
+            params.append(end_time)
+        if linked is not None:
+            conditions.append('signal_data_id IS NOT NULL' if linked else 'signal_data_id IS NULL')
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+    
+    def get_photos(self, limit=None, offset=0, start_time=None, end_time=None, linked=None):
+        """Get photos, newest first
+        
+        Args:
+            limit (int): Maximum number of photos, or None for all
+            offset (int): Number of photos to skip
+            start_time (float): Earliest capture time (epoch seconds)
+            end_time (float): Latest capture time (epoch seconds)
+            linked (bool): Only photos with (True) or without (False) a sample
+        
+        Returns:
+            list: Photo dicts (filename, path, timestamp, size, thumbnail_path,
+                signal_data_id)
+        """
+        try:
+            where, params = self._build_where(start_time, end_time, linked)
+            
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM photos
+                {where}
+                ORDER BY capture_time DESC
+                LIMIT ? OFFSET ?
+            ''', params + [-1 if limit is None else limit, offset])
+            rows = cursor.fetchall()
+            conn.close()
+            
+            return [self._row_to_photo(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting photos: {e}")
+            return []
+    
+    def get_photo_count(self, start_time=None, end_time=None, linked=None):
+        """Get number of cataloged photos"""
+        try:
+            where, params = self._build_where(start_time, end_time, linked)
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT COUNT(*) FROM photos {where}', params)
+            count = cursor.fetchone()[0]
+            conn.close()
+            
+            return count
+        except Exception as e:
+            print(f"Error getting photo count: {e}")
+            return 0
+    
+    def get_photo_for_sample(self, signal_data_id):
+        """Get the photo linked to a signal_data row, or None"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT * FROM photos WHERE signal_data_id = ? LIMIT 1', (signal_data_id,)
+            )
+            row = cursor.fetchone()
+            conn.close()
+            
+            return self._row_to_photo(row) if row else None
+        except Exception as e:
+            print(f"Error getting photo for sample: {e}")
+            return None
+    
+    def _on_samples_inserted(self, signal_data_list):
+        """Link stored samples to their photos"""
+        links = [
+            (signal_data.id, signal_data.photo_path)
+            for signal_data in signal_data_list
+            if signal_data.photo_path and signal_data.id is not None
+        ]
+        if not links:
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('UPDATE photos SET signal_data_id = ? WHERE path = ?', links)
+        conn.commit()
+        conn.close()
+    
+    def _on_samples_cleared(self):
+        """Unlink photos after all samples were deleted"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('UPDATE photos SET signal_data_id = NULL')
+        conn.commit()
+        conn.close()
+    
+    def reconcile(self, photo_directory=None):
+        """Sync the catalog with the photos on disk
+        
+        Scans the directory once with os.scandir, adds photos missing from the
+        catalog, drops rows whose file is gone, and links photos to samples by
+        their stored photo_path.
+        
+        Returns:
+            dict: Numbers of photos added, updated and removed, or None on error
+        """
+        photo_directory = photo_directory or self.photo_directory
+        try:
+            on_disk = {}
+            with os.scandir(photo_directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(PHOTO_EXTENSIONS):
+                        stat = entry.stat()
+                        on_disk[entry.path] = (entry.name, stat.st_size, stat.st_mtime)
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # Only rows of this directory are compared, other folders are left alone
+            directory_prefix = os.path.join(photo_directory, '')
+            cursor.execute(
+                "SELECT path, size FROM photos WHERE substr(path, 1, ?) = ?",
+                (len(directory_prefix), directory_prefix)
+            )
+            cataloged = dict(cursor.fetchall())
+            
+            cursor.execute('''
+                SELECT photo_path, MAX(id) FROM signal_data
+                WHERE photo_path IS NOT NULL AND photo_path != ''
+                GROUP BY photo_path
+            ''')
+            sample_ids = dict(cursor.fetchall())
+            
+            added = []
+            updated = []
+            for path, (filename, size, mtime) in on_disk.items():
+                if path not in cataloged:
+                    thumbnail_path = self.thumbnail_path_func(path) if self.thumbnail_path_func else None
+                    if thumbnail_path and not os.path.exists(thumbnail_path):
+                        thumbnail_path = None
+                    added.append((path, filename, size, mtime, thumbnail_path, sample_ids.get(path)))
+                elif cataloged[path] != size:
+                    updated.append((size, path))
+            removed = [(path,) for path in cataloged if path not in on_disk]
+            
+            # add_photo may catalog the same file between the scan and here
+            cursor.executemany('''
+                INSERT OR IGNORE INTO photos (
+                    path, filename, size, capture_time, thumbnail_path, signal_data_id
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            ''', added)
+            added_count = cursor.rowcount
+            cursor.executemany('UPDATE photos SET size = ? WHERE path = ?', updated)
+            cursor.executemany('DELETE FROM photos WHERE path = ?', removed)
+            
+            conn.commit()
+            conn.close()
+            
+            result = {'added': added_count, 'updated': len(updated), 'removed': len(removed)}
+            print(f"Photo catalog reconciled: {result}")
+            return result
+        except Exception as e:
+            print(f"Error reconciling photo catalog: {e}")
+            return None
@@ -0,0 +1,176 @@
+# Photo encoding module
+
+import os
+import json
+from xml.sax.saxutils import escape
+from PIL import Image
+from photo_overlay import OverlayCompositor
+from models.signal_data import SignalData
+
+# Bounding box of generated thumbnails
+THUMBNAIL_SIZE = (256, 256)
+
+# Output codecs and the file extension each one is saved with
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg',
+    'WEBP': '.webp'
+}
+
+# Default photo encoding; see get_save_options for the recognized keys. PIL's
+# default quality with an optimized Huffman table is ~15% smaller than plain
+# PIL output at the same quality (tools/benchmark_photo_encoding.py)
+DEFAULT_ENCODING = {
+    'format': 'JPEG',
+    'quality': 75,
+    'optimize': True,
+    'progressive': False
+}
+
+# EXIF tags the reading is written to
+EXIF_IMAGE_DESCRIPTION = 0x010E
+EXIF_SOFTWARE = 0x0131
+EXIF_DATETIME = 0x0132
+EXIF_GPS_IFD = 0x8825
+
+# XMP namespace of the embedded reading
+XMP_NAMESPACE = 'http://signaltestapp.local/ns/signal/1.0/'
+
+# One compositor per process, so worker processes keep their font caches between frames
+_compositor = None
+
+def frame_to_image(pixels, size):
+    """Convert an RGBA texture frame to an upright RGB image
+    
+    The raw decoder drops the alpha byte ('RGBX') and flips the bottom-up
+    Kivy texture rows (orientation -1) in a single pass over the buffer,
+    without intermediate RGBA copies.
+    """
+    return Image.frombytes('RGB', size, pixels, 'raw', 'RGBX', 0, -1)
+
+def save_thumbnail(image, thumbnail_path, thumbnail_size=THUMBNAIL_SIZE):
+    """Shrink image in place and save it as a thumbnail"""
+    os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+    image.thumbnail(thumbnail_size)
+    image.save(thumbnail_path, 'JPEG', quality=80)
+    return thumbnail_path
+
+def get_extension(encoding=None):
+    """Get photo file extension for an encoding"""
+    return FORMAT_EXTENSIONS[(encoding or DEFAULT_ENCODING).get('format', 'JPEG').upper()]
+
+def get_save_options(encoding=None):
+    """Get (format, Image.save keyword arguments) for an encoding dict
+    
+    Recognized keys: format ('JPEG' or 'WEBP'), quality (1-100), and for JPEG
+    optimize, progressive and subsampling, for WebP method (0-6, slower is
+    smaller) and lossless.
+    """
+    encoding = dict(DEFAULT_ENCODING, **(encoding or {}))
+    image_format = encoding['format'].upper()
+    if image_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported photo format: {encoding['format']}")
+    
+    options = {'quality': encoding['quality']}
+    if image_format == 'JPEG':
+        options['optimize'] = encoding.get('optimize', False)
+        options['progressive'] = encoding.get('progressive', False)
+        if 'subsampling' in encoding:
+            options['subsampling'] = encoding['subsampling']
+    else:
+        options['method'] = encoding.get('method', 4)
+        options['lossless'] = encoding.get('lossless', False)
+    return image_format, options
+
+def _gps_coordinate(value):
+    """Get an EXIF degrees/minutes/seconds triple for a coordinate"""
+    total_seconds = round(abs(value) * 3600, 2)
+    degrees, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return (float(degrees), float(minutes), round(seconds, 2))
+
+def build_exif(signal_dict):
+    """Get EXIF block carrying a reading
+    
+    The full reading is stored as JSON in ImageDescription (ASCII-escaped, as
+    EXIF text is ASCII) and the location as standard GPS tags.
+    """
+    exif = Image.Exif()
+    exif[EXIF_IMAGE_DESCRIPTION] = json.dumps(signal_dict, ensure_ascii=True)
+    exif[EXIF_SOFTWARE] = 'SignalTestApp'
+    
+    timestamp = signal_dict.get('timestamp')
+    if timestamp:
+        # EXIF wants "YYYY:MM:DD HH:MM:SS"
+        exif[EXIF_DATETIME] = str(timestamp)[:19].replace('-', ':', 2)
+    
+    latitude = signal_dict.get('latitude')
+    longitude = signal_dict.get('longitude')
+    if latitude or longitude:
+        gps = exif.get_ifd(EXIF_GPS_IFD)
+        gps[1] = 'N' if latitude >= 0 else 'S'
+        gps[2] = _gps_coordinate(latitude)
+        gps[3] = 'E' if longitude >= 0 else 'W'
+        gps[4] = _gps_coordinate(longitude)
+    return exif
+
+def build_xmp(signal_dict):
+    """Get XMP packet carrying a reading, one signal:<field> property per key"""
+    properties = ''.join(
+        f'<signal:{key}>{escape(str(value))}</signal:{key}>'
+        for key, value in signal_dict.items()
+    )
+    return (
+        '<?xpacket begin="\ufeff" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+        '<x:xmpmeta xmlns:x="adobe:ns:meta/">'
+        '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+        f'<rdf:Description rdf:about="" xmlns:signal="{XMP_NAMESPACE}">'
+        f'{properties}'
+        '</rdf:Description></rdf:RDF></x:xmpmeta>'
+        '<?xpacket end="w"?>'
+    ).encode('utf-8')
+
+def read_signal_metadata(photo_path):
+    """Get the reading embedded in a photo, or None"""
+    try:
+        with Image.open(photo_path) as image:
+            description = image.getexif().get(EXIF_IMAGE_DESCRIPTION)
+        return json.loads(description) if description else None
+    except Exception as e:
+        print(f"Error reading photo metadata: {e}")
+        return None
+
+def save_image(image, photo_path, signal_dict=None, encoding=None):
+    """Encode an image to photo_path, embedding the reading as EXIF and XMP"""
+    image_format, options = get_save_options(encoding)
+    if signal_dict:
+        options['exif'] = build_exif(signal_dict)
+        # Pillow versions without XMP support for a format ignore the option
+        options['xmp'] = build_xmp(signal_dict)
+    image.save(photo_path, image_format, **options)
+    return photo_path
+
+def encode_frame(pixels, size, signal_dict, photo_path, thumbnail_path=None, encoding=None):
+    """Overlay a reading on a raw frame and write the photo and its thumbnail
+    
+    Module-level and Kivy-free so it can run in a worker process; the reading
+    is passed as a dict because SignalData instances are rebuilt on this side.
+    
+    Returns:
+        tuple: (photo_path, thumbnail_path), thumbnail_path is None if it failed
+    """
+    global _compositor
+    if _compositor is None:
+        _compositor = OverlayCompositor()
+    
+    image = frame_to_image(pixels, size)
+    _compositor.apply(image, SignalData.from_dict(signal_dict))
+    save_image(image, photo_path, signal_dict, encoding)
+    
+    if thumbnail_path:
+        try:
+            save_thumbnail(image, thumbnail_path)
+        except Exception as e:
+            print(f"Error creating thumbnail: {e}")
+            thumbnail_path = None
+    
+    return photo_path, thumbnail_path
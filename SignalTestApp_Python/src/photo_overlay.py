@@ -0,0 +1,180 @@
+# Photo signal overlay compositing module
+
+import threading
+from PIL import Image, ImageDraw, ImageFont
+
+# Fonts tried in order; CJK-capable ones first so Chinese addresses render
+FONT_CANDIDATES = (
+    '/system/fonts/NotoSansCJK-Regular.ttc',
+    '/system/fonts/DroidSansFallback.ttf',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'wqy-microhei.ttc',
+    'arial.ttf',
+    'DejaVuSans.ttf'
+)
+
+# Overlay line templates, formatted with the fields from _get_template_fields
+TEMPLATES = {
+    'default': (
+        "Network: {network_type}",
+        "Operator: {operator}",
+        "Signal: {signal_strength} dBm",
+        "Quality: {signal_quality}",
+        "PCI: {pci}",
+        "Band: {band}",
+        "Location: {location_description}",
+        "Time: {timestamp}"
+    ),
+    'compact': (
+        "{network_type} {operator} {signal_strength} dBm ({signal_quality})",
+        "PCI {pci} | {band} | {cgi}",
+        "{timestamp}"
+    ),
+    'detailed': (
+        "Network: {network_type}  Operator: {operator}",
+        "CGI: {cgi}  PCI: {pci}  Band: {band}",
+        "NR-CGI: {nr_cgi}  NR-PCI: {nr_pci}  NR Band: {nr_band}",
+        "RSSI: {rssi}  SINR: {sinr}  RSRP: {rsrp}  RSRQ: {rsrq}",
+        "Lat/Lon: {latitude}, {longitude}",
+        "Location: {location_description}",
+        "Time: {timestamp}"
+    )
+}
+
+class _MissingField(dict):
+    """Format mapping that renders unknown template fields as N/A"""
+    
+    def __missing__(self, key):
+        return 'N/A'
+
+class OverlayCompositor:
+    """Draw signal annotations into a small RGBA patch and blend it onto photos
+    
+    Fonts and per-character advance widths are cached, and only the patch
+    area of the photo is touched, so the cost does not depend on photo size.
+    """
+    
+    # Layout at 72 dpi in pixels, scaled by dpi / 72
+    MARGIN = 10
+    PADDING = 5
+    LINE_SPACING = 3
+    
+    def __init__(self, template='default', font_size=12, dpi=72,
+                 background=(0, 0, 0, 128), text_color=(255, 255, 255, 255),
+                 font_paths=FONT_CANDIDATES):
+        self.template = template
+        self.font_size = font_size
+        self.dpi = dpi
+        self.background = background
+        self.text_color = text_color
+        self.font_paths = font_paths
+        self.templates = dict(TEMPLATES)
+        self._fonts = {}
+        self._advances = {}
+        self._lock = threading.Lock()
+    
+    def register_template(self, name, lines):
+        """Add or replace a named template (sequence of format strings)"""
+        self.templates[name] = tuple(lines)
+    
+    def _scale(self, value):
+        """Scale a 72 dpi length to the configured dpi"""
+        return max(1, int(round(value * self.dpi / 72.0)))
+    
+    def _get_font(self):
+        """Get cached font for the configured size"""
+        pixel_size = self._scale(self.font_size)
+        font = self._fonts.get(pixel_size)
+        if font is not None:
+            return font
+        
+        with self._lock:
+            font = self._fonts.get(pixel_size)
+            if font is None:
+                font = self._load_font(pixel_size)
+                self._fonts[pixel_size] = font
+                self._advances[pixel_size] = {}
+        return font
+    
+    def _load_font(self, pixel_size):
+        """Load the first available font candidate"""
+        for path in self.font_paths:
+            try:
+                return ImageFont.truetype(path, pixel_size)
+            except Exception:
+                continue
+        
+        try:
+            # Pillow 10.1+ ships a scalable default font
+            return ImageFont.load_default(pixel_size)
+        except TypeError:
+            return ImageFont.load_default()
+    
+    def _text_width(self, font, pixel_size, text):
+        """Get text width from cached per-character advances"""
+        advances = self._advances[pixel_size]
+        width = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = font.getlength(char)
+                advances[char] = advance
+            width += advance
+        return int(width + 0.5)
+    
+    def _get_template_fields(self, signal_data):
+        """Get the fields templates can use"""
+        fields = _MissingField(signal_data.to_dict())
+        fields['signal_strength'] = signal_data.get_signal_strength()
+        fields['signal_quality'] = signal_data.get_signal_quality()
+        fields['pci'] = signal_data.pci or signal_data.nr_pci
+        fields['band'] = signal_data.band or signal_data.nr_band
+        return fields
+    
+    def get_lines(self, signal_data, template=None):
+        """Format template lines for a reading"""
+        fields = self._get_template_fields(signal_data)
+        lines = self.templates.get(template or self.template, self.templates['default'])
+        return [line.format_map(fields) for line in lines]
+    
+    def render_patch(self, signal_data, template=None):
+        """Render the annotation box as an RGBA patch"""
+        font = self._get_font()
+        pixel_size = self._scale(self.font_size)
+        lines = self.get_lines(signal_data, template)
+        
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent + self._scale(self.LINE_SPACING)
+        padding = self._scale(self.PADDING)
+        
+        width = max(self._text_width(font, pixel_size, line) for line in lines) + 2 * padding
+        height = len(lines) * line_height + 2 * padding
+        
+        patch = Image.new('RGBA', (width, height), self.background)
+        draw = ImageDraw.Draw(patch)
+        for i, line in enumerate(lines):
+            draw.text((padding, padding + i * line_height), line, font=font, fill=self.text_color)
+        return patch
+    
+    def apply(self, image, signal_data, template=None):
+        """Blend the annotation box onto the bottom-left corner of an image in place"""
+        patch = self.render_patch(signal_data, template)
+        margin = self._scale(self.MARGIN)
+        
+        x = margin
+        y = max(0, image.height - margin - patch.height)
+        
+        # Clip to the photo so tiny previews still work
+        patch = patch.crop((
+            0, 0, min(patch.width, image.width - x), min(patch.height, image.height - y)
+        ))
+        if patch.width <= 0 or patch.height <= 0:
+            return image
+        
+        # Alpha-composite only the covered region, not the whole photo
+        box = (x, y, x + patch.width, y + patch.height)
+        region = image.crop(box).convert('RGBA')
+        region.alpha_composite(patch)
+        image.paste(region.convert(image.mode), box)
+        return image
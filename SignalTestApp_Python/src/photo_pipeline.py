@@ -0,0 +1,125 @@
+# Asynchronous photo capture pipeline module
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from kivy.clock import Clock
+
+class PhotoCapturePipeline:
+    """Capture photos with only the frame grab on the UI thread
+    
+    Location lookup, overlay, JPEG encoding, file I/O and the database insert
+    run on a small worker pool. At most max_pending shots can be in flight;
+    further shutter presses are refused until one completes.
+    """
+    
+    # Number of recent shots latency statistics are computed over
+    LATENCY_HISTORY = 100
+    
+    def __init__(self, camera_utils, storage_utils=None, location_service=None,
+                 max_workers=2, max_pending=4):
+        self.camera_utils = camera_utils
+        self.storage_utils = storage_utils
+        self.location_service = location_service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_pending = max_pending
+        self.pending_count = 0
+        self._lock = threading.Lock()
+        
+        # Shutter-to-ready: UI thread time per shot; shutter-to-saved: until the row is stored
+        self.ready_latencies = deque(maxlen=self.LATENCY_HISTORY)
+        self.saved_latencies = deque(maxlen=self.LATENCY_HISTORY)
+    
+    def submit(self, signal_data, callback=None, shutter_time=None):
+        """Grab a frame and queue it for processing
+        
+        Args:
+            signal_data (SignalData): Reading to overlay and store with the photo
+            callback (callable): Called on the UI thread with a result dict
+                (photo_path, signal_data, saved, latency) when the shot completes
+            shutter_time (float): time.perf_counter() of the shutter press, if
+                the caller did work (e.g. reading the signal) before submitting
+        
+        Returns:
+            bool: False if the camera has no frame or the queue is full
+        """
+        if shutter_time is None:
+            shutter_time = time.perf_counter()
+        
+        with self._lock:
+            if self.pending_count >= self.max_pending:
+                print("Photo queue full, shot skipped")
+                return False
+            self.pending_count += 1
+        
+        frame = self.camera_utils.capture_frame()
+        if not frame:
+            self._release_slot()
+            return False
+        
+        self.executor.submit(self._process, frame, signal_data, shutter_time, callback)
+        
+        with self._lock:
+            self.ready_latencies.append(time.perf_counter() - shutter_time)
+        return True
+    
+    def _process(self, frame, signal_data, shutter_time, callback):
+        """Finish a shot on a worker thread"""
+        result = {
+            'photo_path': None,
+            'signal_data': signal_data,
+            'saved': False,
+            'latency': None
+        }
+        
+        try:
+            if self.location_service:
+                self.location_service.update_signal_data_location(signal_data)
+            
+            result['photo_path'] = self.camera_utils.save_photo(frame, signal_data)
+            
+            if result['photo_path'] and self.storage_utils:
+                result['saved'] = self.storage_utils.insert_signal_data(signal_data)
+        except Exception as e:
+            print(f"Error processing photo: {e}")
+        finally:
+            self._release_slot()
+        
+        result['latency'] = time.perf_counter() - shutter_time
+        with self._lock:
+            self.saved_latencies.append(result['latency'])
+        
+        if callback:
+            Clock.schedule_once(lambda dt: callback(result))
+    
+    def _release_slot(self):
+        """Free a queue slot"""
+        with self._lock:
+            self.pending_count -= 1
+    
+    def get_latency_stats(self):
+        """Get shutter-to-ready and shutter-to-saved latency statistics in ms"""
+        with self._lock:
+            return {
+                'shutter_to_ready': _summarize(self.ready_latencies),
+                'shutter_to_saved': _summarize(self.saved_latencies)
+            }
+    
+    def shutdown(self, wait=True):
+        """Stop the worker pool, finishing queued shots by default"""
+        self.executor.shutdown(wait=wait)
+
+def _summarize(latencies):
+    """Get count, mean, p50, p95 and max of latencies (seconds) in ms"""
+    if not latencies:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'max': None}
+    
+    values = sorted(latency * 1000.0 for latency in latencies)
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': values[int(0.5 * (len(values) - 1))],
+        'p95': values[int(0.95 * (len(values) - 1))],
+        'max': values[-1]
+    }
@@ -0,0 +1,229 @@
+# Opt-in profiling module
+
+import os
+import sys
+import json
+import time
+import builtins
+import threading
+import functools
+
+# Profiling is enabled by this environment variable (desktop) or by a file of
+# this name in the working directory (device, where env vars are impractical)
+PROFILE_ENV = 'SIGNALTEST_PROFILE'
+PROFILE_MARKER_FILE = 'profile.enabled'
+
+# Percentiles reported in the summary table
+PERCENTILES = (50, 90, 95, 99)
+
+_enabled = False
+_start_time = time.perf_counter()
+_events = []
+_lock = threading.Lock()
+_original_import = None
+
+def is_enabled():
+    """Check if profiling is on"""
+    return _enabled
+
+def enable_if_requested():
+    """Turn profiling on if requested by environment variable or marker file
+    
+    Call first thing at startup so import times are recorded too.
+    """
+    if os.environ.get(PROFILE_ENV) or os.path.exists(PROFILE_MARKER_FILE):
+        enable()
+    return _enabled
+
+def enable():
+    """Turn profiling on and start timing imports"""
+    global _enabled, _original_import
+    if _enabled:
+        return
+    _enabled = True
+    
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+    print("Profiling enabled")
+
+def _now():
+    """Get microseconds since profiling reference point"""
+    return (time.perf_counter() - _start_time) * 1000000.0
+
+def _record(name, category, start, duration):
+    """Store a complete-duration trace event"""
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': start,
+        'dur': duration,
+        'pid': os.getpid(),
+        'tid': threading.get_ident()
+    }
+    with _lock:
+        _events.append(event)
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """builtins.__import__ replacement that times first-time imports"""
+    # Already loaded modules cost nothing worth recording
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    
+    start = _now()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _record(name, 'import', start, _now() - start)
+
+class span:
+    """Context manager timing a block as a trace event
+    
+    with profiler.span('SignalTestApp.build'):
+        ...
+    """
+    
+    def __init__(self, name, category='phase'):
+        self.name = name
+        self.category = category
+        self.start = None
+    
+    def __enter__(self):
+        if _enabled:
+            self.start = _now()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is not None:
+            _record(self.name, self.category, self.start, _now() - self.start)
+        return False
+
+def timed(category='call'):
+    """Decorator recording each call's duration while profiling is on
+    
+    When profiling is off the wrapper only checks a flag, so it can stay on hot
+    paths permanently.
+    """
+    def decorator(func):
+        name = func.__qualname__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = _now()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, category, start, _now() - start)
+        return wrapper
+    return decorator
+
+def instant(name, category='mark'):
+    """Record a point-in-time trace event"""
+    if not _enabled:
+        return
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'i',
+        's': 'p',
+        'ts': _now(),
+        'pid': os.getpid(),
+        'tid': threading.get_ident()
+    }
+    with _lock:
+        _events.append(event)
+
+def counter(name, value, category='counter'):
+    """Record a counter value (drawn as a graph track in the trace viewer)"""
+    if not _enabled:
+        return
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'C',
+        'ts': _now(),
+        'pid': os.getpid(),
+        'args': {name: value}
+    }
+    with _lock:
+        _events.append(event)
+
+def get_summary():
+    """Get per-name duration statistics in ms
+    
+    Returns:
+        list: Dicts (name, category, count, total, mean, p50, p90, p95, p99,
+            max), slowest total first
+    """
+    with _lock:
+        events = [event for event in _events if event['ph'] == 'X']
+    
+    durations = {}
+    for event in events:
+        durations.setdefault((event['name'], event['cat']), []).append(event['dur'] / 1000.0)
+    
+    summary = []
+    for (name, category), values in durations.items():
+        values.sort()
+        row = {
+            'name': name,
+            'category': category,
+            'count': len(values),
+            'total': sum(values),
+            'mean': sum(values) / len(values),
+            'max': values[-1]
+        }
+        for percentile in PERCENTILES:
+            # Nearest-rank percentile
+            rank = max(0, -(-percentile * len(values) // 100) - 1)
+            row[f'p{percentile}'] = values[rank]
+        summary.append(row)
+    
+    summary.sort(key=lambda row: row['total'], reverse=True)
+    return summary
+
+def format_summary(summary=None, limit=40):
+    """Get the summary as a text table"""
+    summary = get_summary() if summary is None else summary
+    columns = ['count', 'total', 'mean'] + [f'p{p}' for p in PERCENTILES] + ['max']
+    
+    lines = [f"{'Name':<48}{'Category':<10}" + ''.join(f'{column:>10}' for column in columns)]
+    for row in summary[:limit]:
+        values = [f"{row['count']:>10d}"] + [f"{row[column]:>10.2f}" for column in columns[1:]]
+        lines.append(f"{row['name'][:47]:<48}{row['category']:<10}" + ''.join(values))
+    return '\n'.join(lines)
+
+def write_report(directory='.'):
+    """Write the trace (Chrome trace event JSON) and summary table
+    
+    The trace loads in chrome://tracing or ui.perfetto.dev.
+    
+    Returns:
+        tuple: (trace_path, summary_path), or None if profiling is off or
+            writing failed
+    """
+    if not _enabled:
+        return None
+    
+    try:
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        trace_path = os.path.join(directory, f'profile_trace_{timestamp}.json')
+        summary_path = os.path.join(directory, f'profile_summary_{timestamp}.txt')
+        
+        with _lock:
+            events = list(_events)
+        with open(trace_path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        
+        table = format_summary()
+        with open(summary_path, 'w') as f:
+            f.write(table + '\n')
+        
+        print(f"Profile written to: {trace_path}")
+        print(table)
+        return trace_path, summary_path
+    except Exception as e:
+        print(f"Error writing profile: {e}")
+        return None
@@ -0,0 +1,596 @@
+# Drive-test report generation module
+
+import os
+import time
+import base64
+import shutil
+import hashlib
+import sqlite3
+import threading
+from html import escape
+from datetime import datetime
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, Future
+from PIL import Image, ImageDraw
+from chart_export import render_chart_png, safe_file_name, get_label_font
+from event_engine import HANDOVER, RAT_CHANGE, PING_PONG
+from kpi_engine import KPI_COLUMNS, serving_cells, valid_readings
+from time_series import METRICS, lttb, parse_timestamps
+from tile_renderer import QUALITY_COLORS
+from track_geometry import QUALITY_LABELS, signal_strengths, quality_codes
+from worker_pool import get_worker_pool
+
+# Image sizes in pixels
+CHART_SIZE = (800, 300)
+MAP_SIZE = (800, 600)
+PHOTO_WIDTH = 480
+
+# Coverage map samples are averaged over square cells of this many pixels
+MAP_CELL_SIZE = 3
+MAP_BACKGROUND = (236, 236, 236)
+
+# Report limits, so a long day stays readable
+MAX_PHOTOS = 100
+MAX_HANDOVERS = 500
+MAX_CELLS = 20
+
+# Event types listed in the handover table
+HANDOVER_TYPES = (HANDOVER, RAT_CHANGE, PING_PONG)
+
+# Rendered images unused for this long are removed from the cache (seconds)
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+# PDF page size (A4 at 100 dpi) and margin in pixels
+PDF_PAGE_SIZE = (827, 1169)
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 14
+
+REPORT_STYLE = '''
+body { font-family: sans-serif; margin: 24px; color: #333; }
+h1 { font-size: 22px; } h2 { font-size: 18px; margin-top: 32px; border-bottom: 1px solid #ccc; }
+table { border-collapse: collapse; font-size: 13px; margin: 8px 0; }
+th, td { border: 1px solid #ddd; padding: 4px 8px; text-align: right; }
+th { background: #f2f2f2; } td.text { text-align: left; }
+img { max-width: 100%; }
+.photos { display: flex; flex-wrap: wrap; gap: 12px; }
+.photo { width: 240px; font-size: 12px; } .photo img { width: 240px; }
+'''
+
+def render_coverage_map(latitudes, longitudes, strengths, path, size=MAP_SIZE):
+    """Draw sample positions colored by signal quality into a PNG
+    
+    Module-level so it can run in a worker process. Points are projected to
+    Web Mercator and fitted to the image; samples are averaged per
+    MAP_CELL_SIZE pixel cell, as on coverage tiles.
+    """
+    width, height = size
+    image = Image.new('RGB', size, MAP_BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.font = get_label_font()
+    
+    if len(latitudes):
+        lat_rad = np.radians(np.clip(latitudes, -85.0, 85.0))
+        world_x = np.radians(longitudes)
+        world_y = -np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad))
+        
+        # Fit the track with a margin, keeping the aspect ratio
+        margin = 30
+        span = max(
+            (world_x.max() - world_x.min()) / (width - 2 * margin),
+            (world_y.max() - world_y.min()) / (height - 2 * margin - 20),
+            1e-9
+        )
+        center_x = (world_x.max() + world_x.min()) / 2
+        center_y = (world_y.max() + world_y.min()) / 2
+        pixel_x = (world_x - center_x) / span + width / 2
+        pixel_y = (world_y - center_y) / span + (height - 20) / 2
+        
+        cells_x = width // MAP_CELL_SIZE
+        cells_y = height // MAP_CELL_SIZE
+        cell_x = np.clip((pixel_x // MAP_CELL_SIZE).astype(np.int64), 0, cells_x - 1)
+        cell_y = np.clip((pixel_y // MAP_CELL_SIZE).astype(np.int64), 0, cells_y - 1)
+        cell_index = cell_y * cells_x + cell_x
+        counts = np.bincount(cell_index, minlength=cells_x * cells_y)
+        sums = np.bincount(cell_index, weights=strengths, minlength=cells_x * cells_y)
+        filled = np.flatnonzero(counts)
+        
+        cells = np.zeros((cells_y * cells_x, 3), dtype=np.uint8)
+        cells[:] = MAP_BACKGROUND
+        cells[filled] = QUALITY_COLORS[quality_codes(sums[filled] / counts[filled]), :3]
+        track = Image.fromarray(cells.reshape(cells_y, cells_x, 3), 'RGB').resize(
+            (cells_x * MAP_CELL_SIZE, cells_y * MAP_CELL_SIZE), Image.NEAREST
+        )
+        image.paste(track, (0, 0))
+    else:
+        draw.text((width // 2 - 60, height // 2), 'No located samples', fill=(60, 60, 60))
+    
+    # Legend along the bottom edge
+    legend_x = 10
+    for label, color in zip(QUALITY_LABELS, QUALITY_COLORS.tolist()):
+        draw.rectangle([legend_x, height - 16, legend_x + 10, height - 6], fill=tuple(color[:3]))
+        draw.text((legend_x + 14, height - 17), label, fill=(60, 60, 60))
+        legend_x += 24 + 6 * len(label)
+    
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(temp_path, 'PNG', compress_level=1)
+    os.replace(temp_path, path)
+    return path
+
+def render_photo(source_path, path, width=PHOTO_WIDTH):
+    """Downscale a photo (with its baked-in signal overlay) to a report JPEG
+    
+    Module-level so it can run in a worker process. JPEG draft mode decodes
+    at a reduced scale, so large photos are not fully decoded.
+    """
+    with Image.open(source_path) as image:
+        image.draft('RGB', (width, width))
+        image = image.convert('RGB')
+        image.thumbnail((width, width * 2))
+        
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(temp_path, 'JPEG', quality=80)
+    os.replace(temp_path, path)
+    return path
+
+def render_pdf(path, title, text_sections, image_paths):
+    """Write a PDF of text pages followed by image pages
+    
+    Module-level so it can run in a worker process. Pages are drawn with PIL
+    and saved with its PDF writer, so no PDF library is needed.
+    
+    Args:
+        path (str): Output PDF path
+        title (str): Report title, on the first page
+        text_sections (list): (heading, lines) pairs, lines in monospace layout
+        image_paths (list): Images placed in order, as many per page as fit
+    """
+    page_width, page_height = PDF_PAGE_SIZE
+    font = get_label_font()
+    pages = []
+    
+    def new_page():
+        page = Image.new('RGB', PDF_PAGE_SIZE, (255, 255, 255))
+        pages.append(page)
+        return page, ImageDraw.Draw(page)
+    
+    page, draw = new_page()
+    y = PDF_MARGIN
+    draw.text((PDF_MARGIN, y), title, fill=(0, 0, 0), font=font)
+    y += 2 * PDF_LINE_HEIGHT
+    for heading, lines in text_sections:
+        for index, line in enumerate([heading] + list(lines) + ['']):
+            if y > page_height - PDF_MARGIN:
+                page, draw = new_page()
+                y = PDF_MARGIN
+            draw.text((PDF_MARGIN, y), line, fill=(0, 0, 0) if index else (0, 70, 160), font=font)
+            y += PDF_LINE_HEIGHT
+    
+    y = page_height
+    content_width = page_width - 2 * PDF_MARGIN
+    for image_path in image_paths:
+        with Image.open(image_path) as image:
+            image = image.convert('RGB')
+            if image.width > content_width:
+                image = image.resize((content_width, int(image.height * content_width / image.width)))
+            if y + image.height > page_height - PDF_MARGIN:
+                page, draw = new_page()
+                y = PDF_MARGIN
+            page.paste(image, (PDF_MARGIN, y))
+            y += image.height + PDF_LINE_HEIGHT
+    
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pages[0].save(temp_path, 'PDF', save_all=True, append_images=pages[1:], resolution=100.0)
+    os.replace(temp_path, path)
+    return path
+
+def _format_value(value, digits=1):
+    """Format a statistic for a table cell"""
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+def _format_duration(seconds):
+    """Format seconds as H:MM:SS"""
+    seconds = int(seconds or 0)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class ReportGenerator:
+    """Build self-contained HTML (and optionally PDF) reports of test sessions
+    
+    A report covers one or more sessions: session and KPI tables, serving
+    cells, a trend chart per metric, a coverage map, the handover list and
+    photos. Charts, the map and photos are rendered in a worker pool, each
+    cached on disk under a key of the sessions' summary state, so generating
+    a report again for unchanged sessions renders nothing. Images are
+    embedded as data URIs, so the HTML file stands alone.
+    """
+    
+    def __init__(self, storage_utils, session_manager, event_engine=None, report_dir=None):
+        self.storage_utils = storage_utils
+        self.session_manager = session_manager
+        self.event_engine = event_engine
+        self.db_path = storage_utils.db_path
+        data_dir = os.path.dirname(os.path.abspath(self.db_path))
+        self.report_dir = report_dir or os.path.join(data_dir, 'reports')
+        self.cache_dir = os.path.join(data_dir, 'report_cache')
+        self.coordinator = ThreadPoolExecutor(max_workers=1)
+        
+        # Imported or deleted samples can leave the summary state unchanged
+        storage_utils.add_clear_listener(self.clear_cache)
+        storage_utils.add_import_listener(self.clear_cache)
+    
+    def _get_executor(self):
+        """Get the shared worker pool"""
+        return get_worker_pool()
+    
+    def _cache_path(self, kind, key, ext):
+        """Get cache file path of a rendered image"""
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"{kind}_{digest}.{ext}")
+    
+    def _render_cached(self, path, render_func, *args):
+        """Get a future for an image, rendering it in the pool unless cached"""
+        if os.path.exists(path):
+            # Mark as used so cache pruning keeps it
+            os.utime(path)
+            future = Future()
+            future.set_result(path)
+            return future
+        return self._get_executor().submit(render_func, *args)
+    
+    def prune_cache(self, max_age=CACHE_MAX_AGE):
+        """Delete cached images unused for max_age seconds"""
+        try:
+            now = time.time()
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                    os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error pruning report cache: {e}")
+    
+    def clear_cache(self):
+        """Delete all cached images"""
+        try:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            return True
+        except Exception as e:
+            print(f"Error clearing report cache: {e}")
+            return False
+    
+    def get_report_path(self, sessions, fmt='html'):
+        """Get output path of a report for session dicts"""
+        if len(sessions) == 1:
+            name = sessions[0]['name']
+        else:
+            name = f"{sessions[-1]['start_time'][:10]}_{len(sessions)}_sessions"
+        return os.path.join(self.report_dir, f"report_{safe_file_name(name)}.{fmt}")
+    
+    def generate_report(self, session_ids, pdf=False, callback=None):
+        """Build a report of sessions in the background
+        
+        Args:
+            session_ids (list): Sessions to cover
+            pdf (bool): Also write a PDF next to the HTML file
+            callback (callable): Called as callback(paths) when done, with
+                {'html': path, 'pdf': path or None} (paths None on failure).
+                It runs on a worker thread, so UI code should hop back with
+                Clock.schedule_once.
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the same paths dict
+        """
+        return self.coordinator.submit(self._generate, list(session_ids), pdf, callback)
+    
+    def _load_samples(self, session_ids):
+        """Get column arrays of the sessions' samples in time order"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT timestamp, network_type, cgi, nr_cgi, latitude, longitude, {', '.join(KPI_COLUMNS)}
+            FROM signal_data
+            WHERE session_id IN ({', '.join('?' * len(session_ids))})
+            ORDER BY timestamp, id
+        ''', session_ids)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if not rows:
+            return None
+        columns = list(zip(*rows))
+        samples = {
+            'time': parse_timestamps(columns[0]),
+            'network_type': np.array([value or '' for value in columns[1]]),
+            'cell': serving_cells(columns[1], columns[2], columns[3]),
+            'latitude': np.array([value or 0.0 for value in columns[4]], dtype=np.float64),
+            'longitude': np.array([value or 0.0 for value in columns[5]], dtype=np.float64)
+        }
+        for index, column in enumerate(KPI_COLUMNS):
+            samples[column] = np.array([value or 0 for value in columns[6 + index]], dtype=np.float64)
+        samples['signal'] = signal_strengths(samples['network_type'], samples['rsrp'], samples['rssi'])
+        return samples
+    
+    def _load_photos(self, session_ids):
+        """Get (photo path, sample row dict) of the sessions' photos in time order"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='photos'"
+        )
+        if cursor.fetchone() is None:
+            conn.close()
+            return []
+        cursor.execute(f'''
+            SELECT p.path AS photo, s.*
+            FROM photos p
+            JOIN signal_data s ON s.id = p.signal_data_id
+            WHERE s.session_id IN ({', '.join('?' * len(session_ids))})
+            ORDER BY s.timestamp
+            LIMIT {MAX_PHOTOS}
+        ''', session_ids)
+        rows = cursor.fetchall()
+        conn.close()
+        return [(row['photo'], dict(row)) for row in rows if os.path.exists(row['photo'])]
+    
+    def _load_handovers(self, session_ids):
+        """Get the sessions' handover events in time order"""
+        if self.event_engine is None:
+            return []
+        events = []
+        for session_id in session_ids:
+            events.extend(
+                event for event in self.event_engine.get_events(session_id=session_id, limit=-1)
+                if event['event_type'] in HANDOVER_TYPES
+            )
+        events.sort(key=lambda event: (event['timestamp'], event['id']))
+        return events
+    
+    def _submit_renders(self, sessions, session_ids, samples):
+        """Start chart, map and photo renders; get {name: future} and the photo rows"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.prune_cache()
+        
+        # Summaries change with every stored sample, so they identify the data
+        state = tuple((session['id'], session['sample_count'], session['last_sample']) for session in sessions)
+        
+        chart_paths = {
+            metric: self._cache_path('chart', (state, metric, CHART_SIZE), 'png') for metric in METRICS
+        }
+        map_path = self._cache_path('map', (state, MAP_SIZE), 'png')
+        
+        futures = {}
+        for metric, path in chart_paths.items():
+            if samples is not None:
+                column = METRICS[metric][0]
+                measured = valid_readings(samples[column])
+                x, y = lttb(samples['time'][measured], samples[column][measured], CHART_SIZE[0])
+            else:
+                x, y = np.empty(0), np.empty(0)
+            futures[f'chart:{metric}'] = self._render_cached(
+                path, render_chart_png, x, y, path, metric, f"{metric} trend", CHART_SIZE
+            )
+        
+        if samples is not None:
+            located = (samples['latitude'] != 0) | (samples['longitude'] != 0)
+            located &= valid_readings(samples['signal'])
+            map_args = (samples['latitude'][located], samples['longitude'][located], samples['signal'][located])
+        else:
+            map_args = (np.empty(0), np.empty(0), np.empty(0))
+        futures['map'] = self._render_cached(map_path, render_coverage_map, *map_args, map_path, MAP_SIZE)
+        
+        photos = self._load_photos(session_ids)
+        for index, (photo, row) in enumerate(photos):
+            try:
+                modified = os.path.getmtime(photo)
+            except OSError:
+                continue
+            path = self._cache_path('photo', (photo, modified, PHOTO_WIDTH), 'jpg')
+            futures[f'photo:{index}'] = self._render_cached(path, render_photo, photo, path, PHOTO_WIDTH)
+        
+        return futures, photos
+    
+    def _cell_rows(self, samples):
+        """Get per-cell (cell, samples, mean RSRP, mean SINR) rows, busiest first"""
+        if samples is None:
+            return []
+        known = samples['cell'] != ''
+        cells, inverse, counts = np.unique(samples['cell'][known], return_inverse=True, return_counts=True)
+        rows = []
+        means = {}
+        for column in ('rsrp', 'sinr'):
+            values = samples[column][known]
+            measured = valid_readings(values)
+            sums = np.bincount(inverse[measured], weights=values[measured], minlength=len(cells))
+            measured_counts = np.bincount(inverse[measured], minlength=len(cells))
+            means[column] = np.where(measured_counts > 0, sums / np.maximum(measured_counts, 1), np.nan)
+        for index in np.argsort(-counts, kind='stable')[:MAX_CELLS]:
+            rows.append((
+                cells[index], int(counts[index]),
+                None if np.isnan(means['rsrp'][index]) else float(means['rsrp'][index]),
+                None if np.isnan(means['sinr'][index]) else float(means['sinr'][index])
+            ))
+        return rows
+    
+    def _kpi_rows(self, session_ids):
+        """Get (column, stats) of the sessions' merged distributions"""
+        return [
+            (column, self.session_manager.get_distribution(session_ids, column).get_stats())
+            for column in KPI_COLUMNS
+        ]
+    
+    def _generate(self, session_ids, pdf, callback):
+        """Build report files (coordinator thread)"""
+        results = {'html': None, 'pdf': None}
+        try:
+            started = time.monotonic()
+            sessions = [self.session_manager.get_session(session_id) for session_id in session_ids]
+            sessions = sorted((session for session in sessions if session), key=lambda s: s['start_time'])
+            if not sessions:
+                raise ValueError(f"No such sessions: {session_ids}")
+            session_ids = [session['id'] for session in sessions]
+            os.makedirs(self.report_dir, exist_ok=True)
+            
+            # Renders run in the pool while tables are read here
+            samples = self._load_samples(session_ids)
+            futures, photos = self._submit_renders(sessions, session_ids, samples)
+            tables = {
+                'kpis': self._kpi_rows(session_ids),
+                'cells': self._cell_rows(samples),
+                'handovers': self._load_handovers(session_ids)
+            }
+            
+            images = {}
+            for name, future in futures.items():
+                try:
+                    images[name] = future.result()
+                except Exception as e:
+                    print(f"Error rendering report image {name}: {e}")
+                    images[name] = None
+            
+            title = f"Drive test report - {', '.join(session['name'] for session in sessions)}"
+            html_path = self.get_report_path(sessions, 'html')
+            self._write_html(html_path, title, sessions, tables, images, photos)
+            results['html'] = html_path
+            
+            if pdf:
+                pdf_path = self.get_report_path(sessions, 'pdf')
+                image_paths = [path for name, path in images.items() if path]
+                results['pdf'] = self._get_executor().submit(
+                    render_pdf, pdf_path, title, self._text_sections(sessions, tables), image_paths
+                ).result()
+            
+            print(f"Report written to {html_path} in {time.monotonic() - started:.1f} s")
+        except Exception as e:
+            print(f"Error generating report: {e}")
+        
+        if callback:
+            callback(results)
+        return results
+    
+    def _session_rows(self, sessions):
+        """Get table rows of the session list"""
+        return [
+            (
+                session['name'], session['start_time'], _format_duration(session['duration']),
+                f"{session['distance'] / 1000:.2f}", session['sample_count'],
+                f"{session['nr_share'] * 100:.0f}%", f"{session['lte_share'] * 100:.0f}%"
+            )
+            for session in sessions
+        ]
+    
+    def _text_sections(self, sessions, tables):
+        """Get (heading, lines) sections of the PDF's text pages"""
+        def layout(header, rows, widths):
+            lines = [''.join(str(cell)[:width - 1].ljust(width) for cell, width in zip(header, widths))]
+            lines.extend(
+                ''.join(_format_value(cell)[:width - 1].ljust(width) for cell, width in zip(row, widths))
+                for row in rows
+            )
+            return lines
+        
+        kpi_header = ('Metric', 'Count', 'Mean', 'Min', 'P5', 'P50', 'P95', 'Max')
+        kpi_rows = [
+            (column.upper(), stats['count'], stats['mean'], stats['min'], stats['p5'],
+             stats['p50'], stats['p95'], stats['max'])
+            for column, stats in tables['kpis']
+        ]
+        handover_rows = [
+            (event['timestamp'], event['event_type'], event['from_cell'], event['to_cell'])
+            for event in tables['handovers']
+        ]
+        return [
+            ('Sessions', layout(
+                ('Name', 'Start', 'Duration', 'km', 'Samples', '5G', '4G'),
+                self._session_rows(sessions), (28, 20, 10, 8, 9, 6, 6)
+            )),
+            ('KPIs', layout(kpi_header, kpi_rows, (8, 9, 9, 8, 8, 8, 8, 8))),
+            ('Serving cells', layout(('Cell', 'Samples', 'RSRP', 'SINR'), tables['cells'], (30, 10, 10, 10))),
+            (f'Handovers ({len(handover_rows)})', layout(
+                ('Time', 'Type', 'From', 'To'), handover_rows[:MAX_HANDOVERS], (21, 13, 26, 26)
+            ))
+        ]
+    
+    def _write_html(self, path, title, sessions, tables, images, photos):
+        """Write the self-contained HTML report"""
+        def table(header, rows, text_columns=1):
+            parts = ['<table><tr>' + ''.join(f'<th>{escape(str(cell))}</th>' for cell in header) + '</tr>']
+            for row in rows:
+                cells = (
+                    f'<td class="text">{escape(_format_value(cell))}</td>' if index < text_columns
+                    else f'<td>{escape(_format_value(cell))}</td>'
+                    for index, cell in enumerate(row)
+                )
+                parts.append('<tr>' + ''.join(cells) + '</tr>')
+            parts.append('</table>')
+            return '\n'.join(parts)
+        
+        def image(image_path, alt):
+            if not image_path:
+                return f'<p>{escape(alt)} could not be rendered.</p>'
+            mime = 'image/jpeg' if image_path.endswith('.jpg') else 'image/png'
+            with open(image_path, 'rb') as f:
+                data = base64.b64encode(f.read()).decode('ascii')
+            return f'<img src="data:{mime};base64,{data}" alt="{escape(alt)}">'
+        
+        kpi_rows = [
+            (column.upper(), stats['count'], stats['mean'], stats['min'], stats['p5'],
+             stats['p50'], stats['p95'], stats['max'])
+            for column, stats in tables['kpis']
+        ]
+        handovers = tables['handovers']
+        handover_rows = [
+            (event['timestamp'], event['event_type'], event['from_cell'], event['to_cell'],
+             event['from_network_type'], event['to_network_type'], event['signal_before'], event['signal_after'])
+            for event in handovers[:MAX_HANDOVERS]
+        ]
+        
+        parts = [
+            '<!DOCTYPE html>', '<html><head><meta charset="utf-8">',
+            f'<title>{escape(title)}</title>', f'<style>{REPORT_STYLE}</style>', '</head><body>',
+            f'<h1>{escape(title)}</h1>',
+            f'<p>Generated {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>',
+            '<h2>Sessions</h2>',
+            table(('Name', 'Start', 'Duration', 'Distance (km)', 'Samples', '5G', '4G'),
+                  self._session_rows(sessions), text_columns=2),
+            '<h2>KPIs</h2>',
+            table(('Metric', 'Count', 'Mean', 'Min', 'P5', 'P50', 'P95', 'Max'), kpi_rows),
+            '<h2>Serving cells</h2>',
+            table(('Cell', 'Samples', 'Mean RSRP', 'Mean SINR'), tables['cells']),
+            '<h2>Trends</h2>'
+        ]
+        parts.extend(image(images.get(f'chart:{metric}'), f'{metric} trend') for metric in METRICS)
+        parts.extend(['<h2>Coverage map</h2>', image(images.get('map'), 'Coverage map')])
+        
+        parts.append(f'<h2>Handovers ({len(handovers)})</h2>')
+        parts.append(table(
+            ('Time', 'Type', 'From', 'To', 'From RAT', 'To RAT', 'Signal before', 'Signal after'),
+            handover_rows, text_columns=4
+        ))
+        if len(handovers) > MAX_HANDOVERS:
+            parts.append(f'<p>First {MAX_HANDOVERS} of {len(handovers)} shown.</p>')
+        
+        parts.append(f'<h2>Photos ({len(photos)})</h2><div class="photos">')
+        for index, (photo, row) in enumerate(photos):
+            photo_path = images.get(f'photo:{index}')
+            if not photo_path:
+                continue
+            caption = (f"{row['timestamp']} {row['network_type']} "
+                       f"RSRP {_format_value(row['rsrp'])} RSSI {_format_value(row['rssi'])} "
+                       f"SINR {_format_value(row['sinr'])}")
+            parts.append(f'<div class="photo">{image(photo_path, os.path.basename(photo))}'
+                         f'<br>{escape(caption)}</div>')
+        parts.append('</div></body></html>')
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(parts))
+        os.replace(temp_path, path)
+    
+    def shutdown(self):
+        """Stop the coordinator thread (the worker pool is shared)"""
+        self.coordinator.shutdown(wait=False, cancel_futures=True)
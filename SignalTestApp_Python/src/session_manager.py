@@ -0,0 +1,422 @@
+# Test session module
+
+import sqlite3
+from datetime import datetime
+import numpy as np
+from kpi_engine import KPI_COLUMNS, KPI_STATISTICS, QuantileSketch
+from derived_data import RebuildGate, has_samples, rebuild_in_chunks
+
+# Earth radius used for route distances (meters), as in haversine_distance
+EARTH_RADIUS = 6371000.0
+
+def path_distance(latitudes, longitudes):
+    """Get length in meters of a path through points (vectorized haversine)"""
+    if len(latitudes) < 2:
+        return 0.0
+    phi = np.radians(latitudes)
+    lam = np.radians(longitudes)
+    a = np.sin(np.diff(phi) / 2) ** 2 + \
+        np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(np.diff(lam) / 2) ** 2
+    return float((2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).sum())
+
+class SessionManager:
+    """Start and stop test sessions and keep a summary of each
+    
+    While a session is active, stored samples are tagged with its id by
+    StorageUtils. Each session's summary (sample count, 4G/5G counts, route
+    distance and per-column statistics) is updated from the storage insert
+    listener, with the columns' quantile sketches kept alongside, so listing
+    sessions reads only sessions and session_summaries.
+    """
+    
+    # Rows read per chunk when rebuilding summaries from signal_data
+    REBUILD_CHUNK_SIZE = 50000
+    
+    def __init__(self, storage_utils):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.needs_rebuild = False
+        self._init_tables()
+        self.gate = RebuildGate(building=self.needs_rebuild)
+        self._close_unfinished_sessions()
+        
+        # Keep summaries up to date as samples are stored
+        storage_utils.add_insert_listener(self.add_samples)
+        storage_utils.add_clear_listener(self.clear)
+        storage_utils.add_import_listener(self.rebuild)
+    
+    def _init_tables(self):
+        """Create session summary tables; needs_rebuild is set if they are new and samples exist"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='session_summaries'"
+            )
+            table_exists = cursor.fetchone() is not None
+            needs_rebuild = not table_exists and has_samples(cursor)
+            
+            # The last position is kept so route distance extends across batches
+            stat_columns = ',\n'.join(
+                f"{column}_{statistic} {'INTEGER' if statistic == 'count' else 'REAL'}"
+                for column in KPI_COLUMNS for statistic in KPI_STATISTICS
+            )
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS session_summaries (
+                    session_id INTEGER PRIMARY KEY REFERENCES sessions (id),
+                    sample_count INTEGER,
+                    nr_count INTEGER,
+                    lte_count INTEGER,
+                    first_sample TEXT,
+                    last_sample TEXT,
+                    distance REAL,
+                    last_latitude REAL,
+                    last_longitude REAL,
+                    {stat_columns}
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_sketches (
+                    session_id INTEGER,
+                    metric TEXT,
+                    sketch BLOB,
+                    PRIMARY KEY (session_id, metric)
+                ) WITHOUT ROWID
+            ''')
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error initializing session tables: {e}")
+            return
+        
+        # Summaries of existing samples are built by rebuild(), off the UI thread
+        self.needs_rebuild = needs_rebuild
+    
+    def _close_unfinished_sessions(self):
+        """End sessions left open by a previous run at their last sample"""
+        try:
+            # Summaries may not be built yet; signal_data is indexed by session and time
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                UPDATE sessions SET end_time = COALESCE(
+                    (SELECT last_sample FROM session_summaries WHERE session_id = sessions.id),
+                    (SELECT MAX(timestamp) FROM signal_data WHERE session_id = sessions.id),
+                    start_time
+                )
+                WHERE end_time IS NULL
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error closing unfinished sessions: {e}")
+    
+    def get_active_session_id(self):
+        """Get id of the active session, or None"""
+        return self.storage_utils.active_session_id
+    
+    def start_session(self, name=None):
+        """Start a session (ending the active one); samples stored from now on belong to it
+        
+        Returns:
+            int: Session id, or None on failure
+        """
+        if self.storage_utils.active_session_id is not None:
+            self.stop_session()
+        
+        start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO sessions (name, start_time) VALUES (?, ?)',
+                (name or f"Test {start_time}", start_time)
+            )
+            session_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error starting session: {e}")
+            return None
+        
+        self.storage_utils.active_session_id = session_id
+        print(f"Session {session_id} started")
+        return session_id
+    
+    def stop_session(self):
+        """End the active session
+        
+        Returns:
+            int: Id of the ended session, or None if none was active
+        """
+        session_id = self.storage_utils.active_session_id
+        if session_id is None:
+            return None
+        self.storage_utils.active_session_id = None
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                'UPDATE sessions SET end_time = ? WHERE id = ?',
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), session_id)
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error stopping session: {e}")
+        
+        print(f"Session {session_id} stopped")
+        return session_id
+    
+    def _summarize(self, rows):
+        """Summarise rows of one session in time order
+        
+        Args:
+            rows (list): (timestamp, network_type, latitude, longitude, *KPI_COLUMNS) tuples
+        
+        Returns:
+            dict: Batch counts, time range, positions and a QuantileSketch per column
+        """
+        timestamps, network_types, latitudes, longitudes = list(zip(*rows))[:4]
+        network_types = np.array([network_type or '' for network_type in network_types])
+        latitudes = np.array([value or 0.0 for value in latitudes], dtype=np.float64)
+        longitudes = np.array([value or 0.0 for value in longitudes], dtype=np.float64)
+        located = (latitudes != 0) | (longitudes != 0)
+        timestamps = [timestamp or '' for timestamp in timestamps]
+        
+        summary = {
+            'sample_count': len(rows),
+            'nr_count': int((network_types == '5G').sum()),
+            'lte_count': int((network_types == '4G').sum()),
+            'first_sample': min(timestamps),
+            'last_sample': max(timestamps),
+            'latitudes': latitudes[located],
+            'longitudes': longitudes[located]
+        }
+        for index, column in enumerate(KPI_COLUMNS):
+            summary[column] = QuantileSketch.from_samples([row[4 + index] or 0 for row in rows])
+        return summary
+    
+    def _store_summary(self, cursor, session_id, summary):
+        """Merge a batch summary into a session's stored summary and sketches"""
+        cursor.execute('''
+            SELECT sample_count, nr_count, lte_count, first_sample, last_sample,
+                distance, last_latitude, last_longitude
+            FROM session_summaries WHERE session_id = ?
+        ''', (session_id,))
+        stored = cursor.fetchone()
+        
+        latitudes, longitudes = summary['latitudes'], summary['longitudes']
+        if stored is None:
+            stored = (0, 0, 0, summary['first_sample'], summary['last_sample'], 0.0, None, None)
+        elif stored[6] is not None and len(latitudes):
+            # Continue the route from the last stored position
+            latitudes = np.concatenate(([stored[6]], latitudes))
+            longitudes = np.concatenate(([stored[7]], longitudes))
+        
+        last_latitude, last_longitude = stored[6], stored[7]
+        if len(latitudes):
+            last_latitude, last_longitude = float(latitudes[-1]), float(longitudes[-1])
+        
+        stats = []
+        sketch_rows = []
+        cursor.execute(
+            'SELECT metric, sketch FROM session_sketches WHERE session_id = ?', (session_id,)
+        )
+        stored_sketches = dict(cursor.fetchall())
+        for column in KPI_COLUMNS:
+            sketch = QuantileSketch.from_bytes(stored_sketches.get(column)).merge(summary[column])
+            sketch_rows.append((session_id, column, sketch.to_bytes()))
+            column_stats = sketch.get_stats()
+            stats.extend(column_stats[statistic] for statistic in KPI_STATISTICS)
+        
+        stat_names = [f'{column}_{statistic}' for column in KPI_COLUMNS for statistic in KPI_STATISTICS]
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO session_summaries (
+                session_id, sample_count, nr_count, lte_count, first_sample, last_sample,
+                distance, last_latitude, last_longitude, {', '.join(stat_names)}
+            ) VALUES ({', '.join('?' * (9 + len(stat_names)))})
+        ''', [
+            session_id,
+            stored[0] + summary['sample_count'],
+            stored[1] + summary['nr_count'],
+            stored[2] + summary['lte_count'],
+            min(stored[3], summary['first_sample']),
+            max(stored[4], summary['last_sample']),
+            stored[5] + path_distance(latitudes, longitudes),
+            last_latitude, last_longitude
+        ] + stats)
+        cursor.executemany(
+            'INSERT OR REPLACE INTO session_sketches (session_id, metric, sketch) VALUES (?, ?, ?)',
+            sketch_rows
+        )
+    
+    def _store_rows(self, cursor, rows):
+        """Summarise (session_id, timestamp, ...) rows sorted by session and time"""
+        start = 0
+        while start < len(rows):
+            session_id = rows[start][0]
+            end = start
+            while end < len(rows) and rows[end][0] == session_id:
+                end += 1
+            self._store_summary(cursor, session_id, self._summarize([row[1:] for row in rows[start:end]]))
+            start = end
+    
+    def add_samples(self, signal_data_list):
+        """Add newly stored samples to their sessions' summaries"""
+        try:
+            # Take the write lock before reading the stored summaries, so that
+            # concurrent inserts cannot merge into the same old summary
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            rows = sorted(
+                (
+                    (data.session_id, data.timestamp or '', data.network_type,
+                     data.latitude, data.longitude) + tuple(getattr(data, column) for column in KPI_COLUMNS)
+                    for data in self.gate.new_samples(signal_data_list) if data.session_id is not None
+                ),
+                key=lambda row: (row[0], row[1])
+            )
+            self._store_rows(cursor, rows)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error updating session summaries: {e}")
+            return False
+    
+    def _delete_all(self, cursor):
+        """Delete all summaries and sketches"""
+        cursor.execute('DELETE FROM session_summaries')
+        cursor.execute('DELETE FROM session_sketches')
+    
+    def rebuild(self):
+        """Recompute all session summaries from stored samples (safe to run on a background thread)
+        
+        Samples are read in id order, which is recording order; each chunk is
+        sorted by session and time before it is summarised.
+        """
+        def store(cursor, rows):
+            self._store_rows(cursor, sorted(
+                (row[1:] for row in rows if row[1] is not None),
+                key=lambda row: (row[0], row[1] or '')
+            ))
+        
+        try:
+            rebuild_in_chunks(
+                self.db_path, self.gate,
+                f"session_id, timestamp, network_type, latitude, longitude, {', '.join(KPI_COLUMNS)}",
+                self._delete_all, store, self.REBUILD_CHUNK_SIZE
+            )
+            self.needs_rebuild = False
+            return True
+        except Exception as e:
+            print(f"Error rebuilding session summaries: {e}")
+            return False
+    
+    def clear(self):
+        """Delete all session summaries"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            self._delete_all(conn.cursor())
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error clearing session summaries: {e}")
+            return False
+    
+    def _select_sessions(self, where='', params=(), limit=None, offset=0):
+        """Get session dicts with summaries, newest first"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        # Active sessions last until their latest sample
+        query = f'''
+            SELECT s.id, s.name, s.start_time, s.end_time,
+                (julianday(COALESCE(s.end_time, m.last_sample, s.start_time))
+                    - julianday(s.start_time)) * 86400.0 AS duration,
+                m.*
+            FROM sessions s
+            LEFT JOIN session_summaries m ON m.session_id = s.id
+            {where}
+            ORDER BY s.start_time DESC, s.id DESC
+        '''
+        if limit is not None:
+            query += f' LIMIT {int(limit)} OFFSET {int(offset)}'
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        sessions = []
+        for row in rows:
+            session = dict(row)
+            session.pop('session_id', None)
+            session.pop('last_latitude', None)
+            session.pop('last_longitude', None)
+            for field in ('sample_count', 'nr_count', 'lte_count'):
+                session[field] = session[field] or 0
+            session['distance'] = session['distance'] or 0.0
+            
+            sample_count = session['sample_count']
+            session['nr_share'] = session['nr_count'] / sample_count if sample_count else 0.0
+            session['lte_share'] = session['lte_count'] / sample_count if sample_count else 0.0
+            session['active'] = session['id'] == self.storage_utils.active_session_id
+            sessions.append(session)
+        return sessions
+    
+    def get_sessions(self, limit=100, offset=0):
+        """Get sessions with their summaries, newest first
+        
+        Returns:
+            list: Dicts with id, name, start_time, end_time, duration (seconds),
+                sample_count, nr_count, lte_count, nr_share, lte_share,
+                first_sample, last_sample, distance (meters), active and
+                {column}_{statistic} for every KPI column and statistic
+        """
+        try:
+            return self._select_sessions(limit=limit, offset=offset)
+        except Exception as e:
+            print(f"Error getting sessions: {e}")
+            return []
+    
+    def get_session(self, session_id):
+        """Get one session with its summary (as in get_sessions), or None"""
+        try:
+            sessions = self._select_sessions('WHERE s.id = ?', (session_id,))
+            return sessions[0] if sessions else None
+        except Exception as e:
+            print(f"Error getting session: {e}")
+            return None
+    
+    def get_distribution(self, session_ids, metric='rsrp'):
+        """Get the merged distribution of a column over sessions
+        
+        Args:
+            session_ids (list): Session ids
+            metric (str): One of KPI_COLUMNS
+        
+        Returns:
+            QuantileSketch: Counts per value; get_stats() gives its KPIs
+        """
+        if metric not in KPI_COLUMNS:
+            raise ValueError(f"Invalid KPI column: {metric}")
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT sketch FROM session_sketches
+                WHERE metric = ? AND session_id IN ({', '.join('?' * len(session_ids))})
+            ''', [metric] + list(session_ids))
+            merged = QuantileSketch()
+            for (blob,) in cursor.fetchall():
+                merged = merged.merge(QuantileSketch.from_bytes(blob))
+            conn.close()
+            return merged
+        except Exception as e:
+            print(f"Error getting session distribution: {e}")
+            return QuantileSketch()
@@ -2,6 +2,7 @@
 
 import platform
 from datetime import datetime
+from profiler import timed
 
 class SignalCollector:
     """Collect mobile network signal data"""
@@ -10,6 +11,7 @@ class SignalCollector:
         self.context = context
         self.is_android = platform.system() == 'Android'
         self.telephony_manager = None
+        self.sample_listeners = []
         
         if self.is_android and context:
             self._init_android_telephony_manager()
@@ -28,6 +30,7 @@ class SignalCollector:
             print(f"Error initializing TelephonyManager: {e}")
             self.telephony_manager = None
     
+    @timed('signal')
     def get_signal_data(self):
         """Get signal data based on platform"""
         from models.signal_data import SignalData
@@ -41,8 +44,24 @@ class SignalCollector:
             # For non-Android platforms, return mock data
             self._collect_mock_signal_data(signal_data)
         
+        for callback in list(self.sample_listeners):
+            try:
+                callback(signal_data)
+            except Exception as e:
+                print(f"Error in sample listener {callback}: {e}")
+        
         return signal_data
     
+    def add_sample_listener(self, callback):
+        """Register callback(signal_data) called with every collected sample"""
+        if callback not in self.sample_listeners:
+            self.sample_listeners.append(callback)
+    
+    def remove_sample_listener(self, callback):
+        """Unregister a sample callback"""
+        if callback in self.sample_listeners:
+            self.sample_listeners.remove(callback)
+    
     def _collect_android_signal_data(self, signal_data):
         """Collect signal data on Android"""
         try:
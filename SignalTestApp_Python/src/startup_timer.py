@@ -0,0 +1,39 @@
+# Startup timing module
+
+import os
+import json
+import time
+
+# Set to a file path to write the startup marks there as JSON and quit after
+# the first frame (used by tools/measure_startup.py)
+STARTUP_LOG_ENV = 'SIGNALTEST_STARTUP_LOG'
+
+# Reference point: this module is imported first thing in main.py
+_start_time = time.perf_counter()
+_marks = []
+
+def mark(label):
+    """Record time since startup for a step"""
+    elapsed = (time.perf_counter() - _start_time) * 1000.0
+    _marks.append((label, elapsed))
+    return elapsed
+
+def get_marks():
+    """Get recorded (label, ms since startup) marks"""
+    return list(_marks)
+
+def is_benchmark_run():
+    """Check if the app was started by the startup timing harness"""
+    return bool(os.environ.get(STARTUP_LOG_ENV))
+
+def report():
+    """Print the recorded marks and write them to the startup log if enabled"""
+    print("Startup timing: " + ", ".join(f"{label} {elapsed:.0f} ms" for label, elapsed in _marks))
+    
+    log_path = os.environ.get(STARTUP_LOG_ENV)
+    if log_path:
+        try:
+            with open(log_path, 'w') as f:
+                json.dump({label: elapsed for label, elapsed in _marks}, f)
+        except Exception as e:
+            print(f"Error writing startup log: {e}")
@@ -1,18 +1,133 @@
 # Data storage and export module
 
 import os
+import math
+import hashlib
 import sqlite3
 import platform
-import pandas as pd
+import time
+import threading
 from datetime import datetime
+from profiler import timed
+
+# Columns of signal_data that may be used in query filters
+FILTER_COLUMNS = (
+    'id', 'network_type', 'operator', 'cgi', 'frequency', 'band', 'pci',
+    'rssi', 'sinr', 'nr_cgi', 'nr_frequency', 'nr_band', 'rsrp', 'nr_pci',
+    'rsrq', 'latitude', 'longitude', 'location_description', 'timestamp',
+    'photo_path', 'session_id'
+)
+
+# Sample fields of signal_data and their value kinds, in export order (id and
+# session_id are local to a database and not part of a sample's content)
+SAMPLE_COLUMNS = {
+    'network_type': 'text', 'operator': 'text', 'cgi': 'text', 'frequency': 'integer',
+    'band': 'text', 'pci': 'integer', 'rssi': 'integer', 'sinr': 'integer',
+    'nr_cgi': 'text', 'nr_frequency': 'integer', 'nr_band': 'text', 'rsrp': 'integer',
+    'nr_pci': 'integer', 'rsrq': 'integer', 'latitude': 'real', 'longitude': 'real',
+    'location_description': 'text', 'timestamp': 'text', 'photo_path': 'text'
+}
+
+# Columns written on insert, in parameter order
+INSERT_COLUMNS = tuple(SAMPLE_COLUMNS) + ('session_id', 'content_hash')
+
+def normalize_sample_value(kind, value):
+    """Get a sample field value as its SAMPLE_COLUMNS kind (missing values become 0 or '')"""
+    if kind == 'integer':
+        return int(value or 0)
+    if kind == 'real':
+        return float(value or 0.0)
+    return '' if value is None else str(value)
+
+def content_hashes(columns):
+    """Get the content hash of each sample
+    
+    Args:
+        columns (dict): {column: list of normalized values} for SAMPLE_COLUMNS
+            (Python ints, floats and strings, as from normalize_sample_value)
+    
+    Returns:
+        list: 16-byte digests; equal readings hash equal wherever they were stored
+    """
+    # Coordinates are hashed to 7 decimals (about 1 cm): Excel keeps only 15
+    # significant digits, so an XLSX round trip changes the last bits
+    parts = [
+        map('{:.7f}'.format if kind == 'real' else str, columns[column])
+        for column, kind in SAMPLE_COLUMNS.items()
+    ]
+    return [
+        hashlib.blake2b('\x1f'.join(fields).encode('utf-8'), digest_size=16).digest()
+        for fields in zip(*parts)
+    ]
+
+# Search filters beyond exact column matches: name -> (condition, parameter count).
+# {p} is the table prefix; None values are ignored. 5G NSA samples carry both
+# LTE and NR cell fields, so the cell_* filters match either.
+SEARCH_FILTERS = {
+    'start_time': ('{p}timestamp >= ?', 1),
+    'end_time': ('{p}timestamp <= ?', 1),
+    'min_rsrp': ('{p}rsrp >= ?', 1),
+    'max_rsrp': ('{p}rsrp <= ?', 1),
+    'min_rsrq': ('{p}rsrq >= ?', 1),
+    'max_rsrq': ('{p}rsrq <= ?', 1),
+    'min_sinr': ('{p}sinr >= ?', 1),
+    'max_sinr': ('{p}sinr <= ?', 1),
+    'min_rssi': ('{p}rssi >= ?', 1),
+    'max_rssi': ('{p}rssi <= ?', 1),
+    'cell': ('({p}cgi = ? OR {p}nr_cgi = ?)', 2),
+    'cell_pci': ('({p}pci = ? OR {p}nr_pci = ?)', 2),
+    'cell_band': ('({p}band = ? OR {p}nr_band = ?)', 2)
+}
+
+# Composite indexes serving the common filters while keeping newest-first order
+SEARCH_INDEXES = {
+    'idx_signal_data_network_time': ('network_type', 'timestamp'),
+    'idx_signal_data_operator_time': ('operator', 'network_type', 'timestamp'),
+    'idx_signal_data_cgi_time': ('cgi', 'timestamp'),
+    'idx_signal_data_nr_cgi_time': ('nr_cgi', 'timestamp'),
+    'idx_signal_data_pci_time': ('pci', 'timestamp'),
+    'idx_signal_data_nr_pci_time': ('nr_pci', 'timestamp'),
+    'idx_signal_data_session_time': ('session_id', 'timestamp')
+}
+
+# Approximate length of one degree of latitude in meters
+METERS_PER_DEGREE = 111320.0
 
 class StorageUtils:
     """Storage utilities for SQLite and data export"""
     
+    # Search radius the nearest-sample lookup starts from (meters)
+    NEAREST_INITIAL_RADIUS = 50.0
+    
+    # Rows per transaction when migrating samples stored by older versions, and
+    # the pause after each (SQLite's busy handler polls, so a writer waiting for
+    # the lock would otherwise rarely get it between chunks)
+    MIGRATION_CHUNK_SIZE = 10000
+    MIGRATION_PAUSE = 0.05
+    
     def __init__(self, app=None):
         self.app = app
         self.db_path = self._get_db_path()
+        self.spatial_index_available = False
+        self.text_search_available = False
+        self.active_session_id = None
+        self.insert_listeners = []
+        self.clear_listeners = []
+        self.import_listeners = []
+        
+        # Set once samples of older versions have content hashes and are in
+        # the spatial index; the work runs on migration_thread, off the UI thread
+        self.migrated = threading.Event()
+        self.migration_thread = None
+        self._hashes_missing = False
+        self._spatial_backfill = False
         self._init_database()
+        
+        if self._hashes_missing or self._spatial_backfill:
+            self.migration_thread = threading.Thread(target=self._migrate, daemon=True)
+            self.migration_thread.start()
+        else:
+            self.migrated.set()
     
     def _get_db_path(self):
         """Get database path based on platform"""
@@ -45,6 +160,16 @@ class StorageUtils:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            # Create sessions table (one row per test run)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    start_time TEXT,
+                    end_time TEXT
+                )
+            ''')
+            
             # Create signal_data table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS signal_data (
@@ -67,48 +192,638 @@ class StorageUtils:
                     longitude REAL,
                     location_description TEXT,
                     timestamp TEXT,
-                    photo_path TEXT
+                    photo_path TEXT,
+                    session_id INTEGER REFERENCES sessions (id),
+                    content_hash BLOB
+                )
+            ''')
+            
+            # Databases created before sessions or imports lack the columns
+            cursor.execute('PRAGMA table_info(signal_data)')
+            existing_columns = [row[1] for row in cursor.fetchall()]
+            if 'session_id' not in existing_columns:
+                cursor.execute(
+                    'ALTER TABLE signal_data ADD COLUMN session_id INTEGER REFERENCES sessions (id)'
                 )
+            if 'content_hash' not in existing_columns:
+                cursor.execute('ALTER TABLE signal_data ADD COLUMN content_hash BLOB')
+            
+            # Imports skip samples whose hash is stored; identical readings
+            # saved on the device are kept, so the index is not unique
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_signal_data_content_hash
+                ON signal_data (content_hash)
+            ''')
+            
+            # Every insert stores a hash, so only older samples lack one
+            # (found through the index); they are hashed by _migrate
+            cursor.execute('SELECT 1 FROM signal_data WHERE content_hash IS NULL LIMIT 1')
+            self._hashes_missing = cursor.fetchone() is not None
+            
+            # Index timestamps for time-ordered listing and time range scans
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_signal_data_timestamp
+                ON signal_data (timestamp)
             ''')
             
+            for index_name, columns in SEARCH_INDEXES.items():
+                cursor.execute(f'''
+                    CREATE INDEX IF NOT EXISTS {index_name}
+                    ON signal_data ({', '.join(columns)})
+                ''')
+            
+            # Create spatial index for map viewport queries
+            self._init_spatial_index(cursor)
+            
+            # Create full-text index for location search
+            self._init_text_search(cursor)
+            
+            # Refresh planner statistics for the indexes when they are stale
+            cursor.execute('PRAGMA optimize')
+            
             conn.commit()
             conn.close()
             print(f"Database initialized at: {self.db_path}")
         except Exception as e:
             print(f"Error initializing database: {e}")
     
-    def insert_signal_data(self, signal_data):
-        """Insert signal data into database"""
+    def _migrate(self):
+        """Migrate samples stored by older versions (runs on migration_thread)"""
         try:
+            if self._hashes_missing:
+                self._backfill_content_hashes()
+            if self._spatial_backfill:
+                self._backfill_spatial_index()
+        except Exception as e:
+            print(f"Error migrating samples: {e}")
+        finally:
+            self.migrated.set()
+    
+    def _backfill_content_hashes(self):
+        """Hash samples stored before content hashes existed, one chunk per transaction"""
+        sample_count = 0
+        while True:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            try:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(f'''
+                    SELECT id, {', '.join(SAMPLE_COLUMNS)} FROM signal_data
+                    WHERE content_hash IS NULL LIMIT ?
+                ''', (self.MIGRATION_CHUNK_SIZE,))
+                rows = cursor.fetchall()
+                if rows:
+                    values = list(zip(*rows))
+                    columns = {
+                        column: [normalize_sample_value(kind, value) for value in values[1 + index]]
+                        for index, (column, kind) in enumerate(SAMPLE_COLUMNS.items())
+                    }
+                    cursor.executemany(
+                        'UPDATE signal_data SET content_hash = ? WHERE id = ?',
+                        zip(content_hashes(columns), values[0])
+                    )
+                    sample_count += len(rows)
+                conn.commit()
+            finally:
+                conn.close()
+            
+            if not rows:
+                break
+            time.sleep(self.MIGRATION_PAUSE)
+        
+        if sample_count:
+            print(f"Content hashes added for {sample_count} samples")
+    
+    def _backfill_spatial_index(self):
+        """Add samples stored before the spatial index existed, one id range per transaction
+        
+        Progress is kept in signal_data_rtree_backfill, so an interrupted
+        build resumes on the next start; the table is dropped at the end.
+        """
+        sample_count = 0
+        while True:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('SELECT next_id, end_id FROM signal_data_rtree_backfill')
+                next_id, end_id = cursor.fetchone()
+                done = next_id >= end_id
+                if done:
+                    cursor.execute('DROP TABLE signal_data_rtree_backfill')
+                else:
+                    # OR REPLACE: the update trigger may have indexed a sample already
+                    last_id = min(next_id + self.MIGRATION_CHUNK_SIZE, end_id)
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO signal_data_rtree
+                        SELECT id, latitude, latitude, longitude, longitude
+                        FROM signal_data
+                        WHERE id > ? AND id <= ?
+                            AND latitude IS NOT NULL AND longitude IS NOT NULL
+                            AND NOT (latitude = 0 AND longitude = 0)
+                    ''', (next_id, last_id))
+                    sample_count += max(cursor.rowcount, 0)
+                    cursor.execute('UPDATE signal_data_rtree_backfill SET next_id = ?', (last_id,))
+                conn.commit()
+            finally:
+                conn.close()
+            
+            if done:
+                break
+            time.sleep(self.MIGRATION_PAUSE)
+        
+        self.spatial_index_available = True
+        if sample_count:
+            print(f"Spatial index built for {sample_count} existing samples")
+    
+    def _init_spatial_index(self, cursor):
+        """Create R*Tree index on sample coordinates, kept in sync by triggers"""
+        try:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='signal_data_rtree'"
+            )
+            index_exists = cursor.fetchone() is not None
+            
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS signal_data_rtree USING rtree(
+                    id, min_lat, max_lat, min_lon, max_lon
+                )
+            ''')
+            
+            # Samples without a location fix (0, 0) are left out of the index
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS signal_data_rtree_insert
+                AFTER INSERT ON signal_data
+                WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+                    AND NOT (NEW.latitude = 0 AND NEW.longitude = 0)
+                BEGIN
+                    INSERT INTO signal_data_rtree VALUES (
+                        NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+                    );
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS signal_data_rtree_update
+                AFTER UPDATE OF latitude, longitude ON signal_data
+                BEGIN
+                    DELETE FROM signal_data_rtree WHERE id = OLD.id;
+                    INSERT INTO signal_data_rtree
+                    SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+                    WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+                        AND NOT (NEW.latitude = 0 AND NEW.longitude = 0);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS signal_data_rtree_delete
+                AFTER DELETE ON signal_data
+                BEGIN
+                    DELETE FROM signal_data_rtree WHERE id = OLD.id;
+                END
+            ''')
+            
+            if not index_exists:
+                # Existing database: samples up to the current last id are
+                # indexed by _migrate, later ones by the insert trigger
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM signal_data')
+                end_id = cursor.fetchone()[0]
+                if end_id:
+                    cursor.execute(
+                        'CREATE TABLE signal_data_rtree_backfill (next_id INTEGER, end_id INTEGER)'
+                    )
+                    cursor.execute('INSERT INTO signal_data_rtree_backfill VALUES (0, ?)', (end_id,))
             
-            # Convert signal data to dict
-            data = signal_data.to_dict()
+            # Until the index covers every sample, queries scan coordinates
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='signal_data_rtree_backfill'"
+            )
+            self._spatial_backfill = cursor.fetchone() is not None
+            self.spatial_index_available = not self._spatial_backfill
+        except sqlite3.OperationalError as e:
+            # SQLite built without R*Tree support, fall back to coordinate scans
+            print(f"R*Tree spatial index not available: {e}")
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_signal_data_location
+                ON signal_data (latitude, longitude)
+            ''')
+            self.spatial_index_available = False
+    
+    def _init_text_search(self, cursor):
+        """Create FTS5 index on location descriptions, kept in sync by triggers"""
+        try:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='signal_data_fts'"
+            )
+            index_exists = cursor.fetchone() is not None
             
-            # Insert data
+            # External content table: the text is read from signal_data, not duplicated
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS signal_data_fts USING fts5(
+                    location_description, content='signal_data', content_rowid='id'
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS signal_data_fts_insert
+                AFTER INSERT ON signal_data
+                BEGIN
+                    INSERT INTO signal_data_fts (rowid, location_description)
+                    VALUES (NEW.id, NEW.location_description);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS signal_data_fts_update
+                AFTER UPDATE OF location_description ON signal_data
+                BEGIN
+                    INSERT INTO signal_data_fts (signal_data_fts, rowid, location_description)
+                    VALUES ('delete', OLD.id, OLD.location_description);
+                    INSERT INTO signal_data_fts (rowid, location_description)
+                    VALUES (NEW.id, NEW.location_description);
+                END
+            ''')
             cursor.execute('''
-                INSERT INTO signal_data (
-                    network_type, operator, cgi, frequency, band, pci, rssi, sinr,
-                    nr_cgi, nr_frequency, nr_band, rsrp, nr_pci, rsrq,
-                    latitude, longitude, location_description, timestamp, photo_path
-                ) VALUES (
-                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                CREATE TRIGGER IF NOT EXISTS signal_data_fts_delete
+                AFTER DELETE ON signal_data
+                BEGIN
+                    INSERT INTO signal_data_fts (signal_data_fts, rowid, location_description)
+                    VALUES ('delete', OLD.id, OLD.location_description);
+                END
+            ''')
+            
+            if not index_exists:
+                # Existing database: build the index once from stored samples
+                cursor.execute("INSERT INTO signal_data_fts (signal_data_fts) VALUES ('rebuild')")
+            
+            self.text_search_available = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5, fall back to LIKE scans
+            print(f"FTS5 text search not available: {e}")
+            self.text_search_available = False
+    
+    def _build_text_condition(self, text, prefix=''):
+        """Build SQL condition matching location descriptions containing every word of text"""
+        words = text.split()
+        if not words:
+            return None, []
+        
+        if self.text_search_available:
+            # Each word as a quoted prefix term, so user input is never parsed as FTS syntax
+            query = ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+            condition = (
+                f"{prefix}id IN (SELECT rowid FROM signal_data_fts "
+                f"WHERE signal_data_fts MATCH ?)"
+            )
+            return condition, [query]
+        
+        conditions = [f"{prefix}location_description LIKE ?" for word in words]
+        return '(' + ' AND '.join(conditions) + ')', [f'%{word}%' for word in words]
+    
+    def build_filter_clause(self, filters, prefix=''):
+        """Build SQL conditions from a filter dict
+        
+        Keys are signal_data columns, matched exactly (a list, tuple or set value
+        matches any of its items), SEARCH_FILTERS names (ranges and LTE-or-NR
+        cell matches), or 'location_text' for a word search on
+        location_description.
+        """
+        conditions = []
+        params = []
+        
+        for column, value in (filters or {}).items():
+            if column in SEARCH_FILTERS:
+                if value is None:
+                    continue
+                condition, param_count = SEARCH_FILTERS[column]
+                conditions.append(condition.format(p=prefix))
+                params.extend([value] * param_count)
+                continue
+            
+            if column == 'location_text':
+                condition, text_params = self._build_text_condition(value or '', prefix)
+                if condition:
+                    conditions.append(condition)
+                    params.extend(text_params)
+                continue
+            
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Invalid filter column: {column}")
+            
+            if isinstance(value, (list, tuple, set)):
+                values = list(value)
+                if not values:
+                    conditions.append('0')
+                    continue
+                placeholders = ', '.join('?' * len(values))
+                conditions.append(f"{prefix}{column} IN ({placeholders})")
+                params.extend(values)
+            elif value is None:
+                conditions.append(f"{prefix}{column} IS NULL")
+            else:
+                conditions.append(f"{prefix}{column} = ?")
+                params.append(value)
+        
+        return conditions, params
+    
+    def _rows_to_signal_data(self, rows):
+        """Convert database rows to SignalData objects"""
+        from models.signal_data import SignalData
+        return [SignalData.from_dict(dict(row)) for row in rows]
+    
+    def _select_bbox(self, cursor, min_lat, min_lon, max_lat, max_lon, limit=None, filters=None):
+        """Select signal_data rows inside a bounding box"""
+        filter_conditions, filter_params = self.build_filter_clause(filters, 's.')
+        
+        if self.spatial_index_available:
+            # R*Tree stores float32 boxes, so match on overlap and then check exact coordinates
+            sql = '''
+                SELECT s.* FROM signal_data_rtree r
+                JOIN signal_data s ON s.id = r.id
+                WHERE r.max_lat >= ? AND r.min_lat <= ?
+                    AND r.max_lon >= ? AND r.min_lon <= ?
+            '''
+            params = [min_lat, max_lat, min_lon, max_lon]
+        else:
+            sql = '''
+                SELECT s.* FROM signal_data s
+                WHERE NOT (s.latitude = 0 AND s.longitude = 0)
+            '''
+            params = []
+        
+        conditions = ['s.latitude BETWEEN ? AND ?', 's.longitude BETWEEN ? AND ?']
+        conditions.extend(filter_conditions)
+        params.extend([min_lat, max_lat, min_lon, max_lon])
+        params.extend(filter_params)
+        sql += ' AND ' + ' AND '.join(conditions)
+        
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    
+    def _bbox_around(self, latitude, longitude, radius):
+        """Get (min_lat, min_lon, max_lat, max_lon) enclosing a circle of radius meters"""
+        # Small margin so the box always contains the haversine circle
+        lat_delta = radius * 1.01 / METERS_PER_DEGREE
+        lon_delta = lat_delta / max(math.cos(math.radians(latitude)), 0.01)
+        return (
+            latitude - lat_delta, longitude - lon_delta,
+            latitude + lat_delta, longitude + lon_delta
+        )
+    
+    def query_bbox(self, min_lat, min_lon, max_lat, max_lon, limit=1000, filters=None):
+        """Get signal data inside a bounding box (map viewport)
+        
+        Args:
+            min_lat, min_lon, max_lat, max_lon (float): Bounding box in degrees
+            limit (int): Maximum number of samples to return, None for no limit
+            filters (dict): Optional {column: value} conditions on signal_data
+        
+        Returns:
+            list: SignalData objects inside the box
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            rows = self._select_bbox(
+                cursor, min_lat, min_lon, max_lat, max_lon, limit, filters
+            )
+            conn.close()
+            
+            return self._rows_to_signal_data(rows)
+        except Exception as e:
+            print(f"Error querying bounding box: {e}")
+            return []
+    
+    def query_nearest(self, latitude, longitude, max_distance=1000.0, filters=None):
+        """Get the stored sample nearest to a point
+        
+        Args:
+            latitude, longitude (float): Point to search around
+            max_distance (float): Search radius limit in meters
+            filters (dict): Optional {column: value} conditions on signal_data
+        
+        Returns:
+            SignalData: Nearest sample, or None if nothing is within max_distance
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            radius = min(self.NEAREST_INITIAL_RADIUS, max_distance)
+            
+            while True:
+                rows = self._select_bbox(
+                    cursor, *self._bbox_around(latitude, longitude, radius), filters=filters
                 )
-            ''', (
-                data['network_type'], data['operator'], data['cgi'], data['frequency'],
-                data['band'], data['pci'], data['rssi'], data['sinr'],
-                data['nr_cgi'], data['nr_frequency'], data['nr_band'], data['rsrp'],
-                data['nr_pci'], data['rsrq'], data['latitude'], data['longitude'],
-                data['location_description'], data['timestamp'], data['photo_path']
-            ))
+                
+                nearest, distance = None, None
+                for row in rows:
+                    row_distance = haversine_distance(
+                        latitude, longitude, row['latitude'], row['longitude']
+                    )
+                    if distance is None or row_distance < distance:
+                        nearest, distance = row, row_distance
+                
+                # The box encloses the whole circle, so a hit within the radius is exact
+                if nearest is not None and distance <= radius:
+                    break
+                
+                if radius >= max_distance:
+                    nearest = None
+                    break
+                
+                # Widen to the best candidate's distance, or 4x if nothing was found
+                radius = min(distance if nearest is not None else radius * 4, max_distance)
+            
+            conn.close()
+            
+            if nearest is None:
+                return None
+            return self._rows_to_signal_data([nearest])[0]
+        except Exception as e:
+            print(f"Error querying nearest sample: {e}")
+            return None
+    
+    def _insert_row(self, cursor, signal_data):
+        """Insert one sample row and set its id (and the active session, if unset)
+        
+        Every local sample is stored, even with the same readings and time as a
+        stored one (e.g. Save tapped twice); only bulk imports skip duplicates.
+        """
+        if signal_data.session_id is None:
+            signal_data.session_id = self.active_session_id
+        data = signal_data.to_dict()
+        content_hash = content_hashes({
+            column: [normalize_sample_value(kind, data[column])]
+            for column, kind in SAMPLE_COLUMNS.items()
+        })[0]
+        
+        cursor.execute(f'''
+            INSERT INTO signal_data ({', '.join(INSERT_COLUMNS)})
+            VALUES ({', '.join('?' * len(INSERT_COLUMNS))})
+        ''', [data[column] for column in SAMPLE_COLUMNS] + [data['session_id'], content_hash])
+        signal_data.id = cursor.lastrowid
+    
+    @timed('storage')
+    def insert_signal_data(self, signal_data):
+        """Insert signal data into database"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            self._insert_row(cursor, signal_data)
             
             conn.commit()
             conn.close()
-            return True
         except Exception as e:
             print(f"Error inserting signal data: {e}")
             return False
+        
+        self._notify_listeners(self.insert_listeners, [signal_data])
+        return True
+    
+    @timed('storage')
+    def insert_signal_data_batch(self, signal_data_list):
+        """Insert many samples in a single transaction
+        
+        One commit (and one fsync) for the whole batch instead of one per row;
+        listeners are notified once with the full list.
+        """
+        if not signal_data_list:
+            return True
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            for signal_data in signal_data_list:
+                self._insert_row(cursor, signal_data)
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Error inserting signal data batch: {e}")
+            return False
+        
+        self._notify_listeners(self.insert_listeners, signal_data_list)
+        return True
+    
+    @timed('storage')
+    def insert_rows_bulk(self, row_chunks):
+        """Insert prepared rows, one transaction per chunk, skipping stored samples
+        
+        For bulk imports: rows are written with executemany and, instead of
+        insert listeners, import listeners are notified once at the end so
+        derived data is rebuilt once rather than updated row by row.
+        
+        Args:
+            row_chunks (iterable): Lists of INSERT_COLUMNS tuples, with values
+                already normalized and content_hash from content_hashes()
+        
+        Returns:
+            tuple: (inserted, total) row counts, or None on failure
+        """
+        # Duplicates are found by content hash, and the spatial index is filled
+        # per chunk, so samples of older versions must be migrated first
+        self.migrated.wait()
+        
+        inserted = 0
+        total = 0
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # Room for the content hash index, whose inserts land on random pages
+            cursor.execute('PRAGMA cache_size = -262144')
+            
+            # The spatial and text index triggers index samples one at a time;
+            # instead they are dropped for each chunk and the new samples indexed
+            # with one statement each, inside the chunk's transaction, so other
+            # connections never see the triggers missing
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name IN (?, ?)",
+                ('signal_data_rtree_insert', 'signal_data_fts_insert')
+            )
+            triggers = dict(cursor.fetchall())
+            
+            for rows in row_chunks:
+                cursor.execute('BEGIN IMMEDIATE')
+                for name in triggers:
+                    cursor.execute(f'DROP TRIGGER {name}')
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM signal_data')
+                last_id = cursor.fetchone()[0]
+                
+                # The last parameter is content_hash again, for the duplicate check
+                cursor.executemany(f'''
+                    INSERT INTO signal_data ({', '.join(INSERT_COLUMNS)})
+                    SELECT {', '.join('?' * len(INSERT_COLUMNS))}
+                    WHERE NOT EXISTS (SELECT 1 FROM signal_data WHERE content_hash = ?)
+                ''', [tuple(row) + (row[-1],) for row in rows])
+                inserted += max(cursor.rowcount, 0)
+                total += len(rows)
+                
+                self._index_new_rows(cursor, last_id, triggers)
+                for sql in triggers.values():
+                    cursor.execute(sql)
+                conn.commit()
+        except Exception as e:
+            print(f"Error inserting rows: {e}")
+            result = None
+        else:
+            result = (inserted, total)
+        finally:
+            if conn is not None:
+                # Undo a failed chunk, its dropped triggers included
+                conn.rollback()
+                conn.close()
+        
+        # Rows committed before a failure are stored too
+        if inserted:
+            self._notify_listeners(self.import_listeners)
+        return result
+    
+    def _index_new_rows(self, cursor, last_id, triggers):
+        """Add samples after last_id to the indexes whose insert triggers are in triggers"""
+        if 'signal_data_rtree_insert' in triggers:
+            cursor.execute('''
+                INSERT INTO signal_data_rtree
+                SELECT id, latitude, latitude, longitude, longitude
+                FROM signal_data
+                WHERE id > ? AND latitude IS NOT NULL AND longitude IS NOT NULL
+                    AND NOT (latitude = 0 AND longitude = 0)
+            ''', (last_id,))
+        if 'signal_data_fts_insert' in triggers:
+            cursor.execute('''
+                INSERT INTO signal_data_fts (rowid, location_description)
+                SELECT id, location_description FROM signal_data WHERE id > ?
+            ''', (last_id,))
+    
+    def add_insert_listener(self, callback):
+        """Register callback(signal_data_list) called after samples are inserted"""
+        if callback not in self.insert_listeners:
+            self.insert_listeners.append(callback)
+    
+    def add_clear_listener(self, callback):
+        """Register callback() called after all samples are deleted"""
+        if callback not in self.clear_listeners:
+            self.clear_listeners.append(callback)
+    
+    def add_import_listener(self, callback):
+        """Register callback() called after a bulk import, to rebuild derived data"""
+        if callback not in self.import_listeners:
+            self.import_listeners.append(callback)
+    
+    def _notify_listeners(self, listeners, *args):
+        """Call listeners, a failing listener never fails the storage operation"""
+        for callback in list(listeners):
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in storage listener {callback}: {e}")
     
     def get_signal_data(self, limit=100, offset=0):
         """Get signal data from database"""
@@ -126,27 +841,66 @@ class StorageUtils:
             rows = cursor.fetchall()
             conn.close()
             
-            # Convert rows to dicts
-            from models.signal_data import SignalData
-            signal_data_list = []
+            # Convert rows to SignalData objects
+            return self._rows_to_signal_data(rows)
+        except Exception as e:
+            print(f"Error getting signal data: {e}")
+            return []
+    
+    def get_signal_data_page(self, cursor=None, limit=100, newer=False, filters=None):
+        """Get one page of samples, newest first, by keyset pagination
+        
+        Unlike LIMIT/OFFSET, the cost does not grow with the page's depth in
+        the table: the (timestamp, id) cursor is a seek on the timestamp index.
+        
+        Args:
+            cursor (tuple): (timestamp, id) of the row the page continues from,
+                or None for the newest page
+            limit (int): Maximum number of rows
+            newer (bool): Get the rows just newer than cursor instead of older
+            filters (dict): Filters, see build_filter_clause
+        
+        Returns:
+            list: SignalData objects, newest first
+        """
+        try:
+            conditions, params = self.build_filter_clause(filters)
+            if cursor is not None:
+                conditions.append('(timestamp, id) > (?, ?)' if newer else '(timestamp, id) < (?, ?)')
+                params.extend(cursor)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            order = 'ASC' if newer else 'DESC'
             
-            for row in rows:
-                data_dict = dict(row)
-                signal_data = SignalData.from_dict(data_dict)
-                signal_data_list.append(signal_data)
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            db_cursor = conn.cursor()
+            db_cursor.execute(f'''
+                SELECT * FROM signal_data
+                {where}
+                ORDER BY timestamp {order}, id {order}
+                LIMIT ?
+            ''', params + [limit])
+            rows = db_cursor.fetchall()
+            conn.close()
             
+            signal_data_list = self._rows_to_signal_data(rows)
+            if newer:
+                signal_data_list.reverse()
             return signal_data_list
         except Exception as e:
-            print(f"Error getting signal data: {e}")
+            print(f"Error getting signal data page: {e}")
             return []
     
-    def get_signal_data_count(self):
-        """Get total count of signal data"""
+    def get_signal_data_count(self, filters=None):
+        """Get count of signal data, optionally only samples matching filters"""
         try:
+            conditions, params = self.build_filter_clause(filters)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute('SELECT COUNT(*) FROM signal_data')
+            cursor.execute(f'SELECT COUNT(*) FROM signal_data {where}', params)
             count = cursor.fetchone()[0]
             conn.close()
             
@@ -171,6 +925,7 @@ class StorageUtils:
                 return None
             
             # Convert to DataFrame
+            import pandas as pd
             data_list = [data.to_dict() for data in signal_data_list]
             df = pd.DataFrame(data_list)
             
@@ -198,6 +953,7 @@ class StorageUtils:
                 return None
             
             # Convert to DataFrame
+            import pandas as pd
             data_list = [data.to_dict() for data in signal_data_list]
             df = pd.DataFrame(data_list)
             
@@ -219,7 +975,20 @@ class StorageUtils:
             conn.commit()
             conn.close()
             print("All data deleted")
-            return True
         except Exception as e:
             print(f"Error deleting all data: {e}")
             return False
+        
+        self._notify_listeners(self.clear_listeners)
+        return True
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Get great-circle distance between two points in meters"""
+    earth_radius = 6371000.0
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * earth_radius * math.asin(math.sqrt(min(1.0, a)))
@@ -0,0 +1,248 @@
+# Offline coverage tile rendering module
+
+import os
+import shutil
+import sqlite3
+import threading
+import numpy as np
+from PIL import Image
+from geo_utils import lat_lon_to_tile, tile_bounds
+from track_geometry import signal_strengths, quality_codes
+from kpi_engine import valid_readings
+from worker_pool import get_worker_pool
+
+TILE_SIZE = 256
+
+# Zoom levels tiles are rendered and invalidated for
+MIN_ZOOM = 10
+MAX_ZOOM = 18
+
+# Samples are averaged over square cells of this many pixels
+CELL_SIZE = 4
+
+# RGBA fill per quality level, from "Very Poor" to "Excellent"
+QUALITY_COLORS = np.array([
+    (220, 30, 30, 190),
+    (245, 130, 30, 190),
+    (240, 220, 40, 190),
+    (140, 210, 60, 190),
+    (30, 170, 60, 190)
+], dtype=np.uint8)
+
+def render_tile(db_path, spatial_index, tile_path, zoom, x, y):
+    """Render one coverage tile to a PNG file
+    
+    Module-level so it can run in a worker process. Samples are averaged per
+    CELL_SIZE pixel cell and colored by signal quality, which keeps the cost
+    bounded by the tile size rather than the number of samples. Samples
+    without a real reading are left out; cells without any stay transparent.
+    """
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(x, y, zoom)
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    if spatial_index:
+        cursor.execute('''
+            SELECT s.latitude, s.longitude, s.network_type, s.rsrp, s.rssi
+            FROM signal_data_rtree r
+            JOIN signal_data s ON s.id = r.id
+            WHERE r.max_lat >= ? AND r.min_lat <= ?
+                AND r.max_lon >= ? AND r.min_lon <= ?
+        ''', (min_lat, max_lat, min_lon, max_lon))
+    else:
+        cursor.execute('''
+            SELECT latitude, longitude, network_type, rsrp, rssi
+            FROM signal_data
+            WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+                AND NOT (latitude = 0 AND longitude = 0)
+        ''', (min_lat, max_lat, min_lon, max_lon))
+    rows = cursor.fetchall()
+    conn.close()
+    
+    cells = TILE_SIZE // CELL_SIZE
+    pixels = np.zeros((cells, cells, 4), dtype=np.uint8)
+    
+    if rows:
+        latitudes, longitudes, network_types, rsrp, rssi = zip(*rows)
+        latitudes = np.array(latitudes, dtype=np.float64)
+        longitudes = np.array(longitudes, dtype=np.float64)
+        
+        # Position within the tile in world pixel coordinates
+        n = 2 ** zoom
+        lat_rad = np.radians(latitudes)
+        world_x = (longitudes + 180.0) / 360.0 * n
+        world_y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n
+        cell_x = np.floor((world_x - x) * cells).astype(np.int64)
+        cell_y = np.floor((world_y - y) * cells).astype(np.int64)
+        inside = (cell_x >= 0) & (cell_x < cells) & (cell_y >= 0) & (cell_y < cells)
+        
+        if inside.any():
+            strength = signal_strengths(
+                np.array(network_types)[inside],
+                np.array(rsrp, dtype=np.float64)[inside],
+                np.array(rssi, dtype=np.float64)[inside]
+            )
+            
+            # Mean strength per cell, colored with the same quality levels as SignalData
+            measured = valid_readings(strength)
+            cell_index = (cell_y[inside] * cells + cell_x[inside])[measured]
+            counts = np.bincount(cell_index, minlength=cells * cells)
+            sums = np.bincount(cell_index, weights=strength[measured], minlength=cells * cells)
+            filled = np.flatnonzero(counts)
+            quality = quality_codes(sums[filled] / counts[filled])
+            pixels.reshape(-1, 4)[filled] = QUALITY_COLORS[quality]
+    
+    image = Image.fromarray(pixels, 'RGBA').resize((TILE_SIZE, TILE_SIZE), Image.NEAREST)
+    
+    # Write then rename so readers never see a partial file
+    os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+    temp_path = f"{tile_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(temp_path, 'PNG', optimize=False)
+    os.replace(temp_path, tile_path)
+    return tile_path
+
+class TileRenderer:
+    """Render coverage overlay tiles from stored samples with an on-disk cache"""
+    
+    def __init__(self, storage_utils, cache_dir=None):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self.cache_dir = cache_dir or os.path.join(
+            os.path.dirname(os.path.abspath(self.db_path)), 'tile_cache'
+        )
+        self._lock = threading.Lock()
+        
+        # Bumped on invalidation so renders started before it are discarded
+        self._generation = 0
+        self._tile_versions = {}
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        # Only tiles touched by new samples are invalidated
+        storage_utils.add_insert_listener(self._on_samples_inserted)
+        storage_utils.add_clear_listener(self.clear_cache)
+        storage_utils.add_import_listener(self.clear_cache)
+    
+    def _get_executor(self):
+        """Get the shared worker pool"""
+        return get_worker_pool()
+    
+    def get_tile_path(self, zoom, x, y):
+        """Get cache file path of a tile"""
+        return os.path.join(self.cache_dir, str(zoom), str(x), f"{y}.png")
+    
+    def get_cached_tile(self, zoom, x, y):
+        """Get path of a cached tile, or None if it must be rendered"""
+        tile_path = self.get_tile_path(zoom, x, y)
+        return tile_path if os.path.exists(tile_path) else None
+    
+    def get_tile(self, zoom, x, y):
+        """Get path of a tile, rendering it in this thread if not cached"""
+        cached = self.get_cached_tile(zoom, x, y)
+        if cached:
+            return cached
+        
+        try:
+            version = self._get_version(zoom, x, y)
+            tile_path = render_tile(
+                self.db_path, self.storage_utils.spatial_index_available,
+                self.get_tile_path(zoom, x, y), zoom, x, y
+            )
+            return self._check_version(zoom, x, y, version, tile_path)
+        except Exception as e:
+            print(f"Error rendering tile {zoom}/{x}/{y}: {e}")
+            return None
+    
+    def render_tiles(self, tiles, callback=None):
+        """Render tiles in the worker pool
+        
+        Args:
+            tiles (list): (zoom, x, y) tuples; cached tiles are reported immediately
+            callback (callable): Called as callback(zoom, x, y, path) when each tile
+                is ready (path is None on failure). It runs on a pool thread, so UI
+                code should hop back with Clock.schedule_once.
+        
+        Returns:
+            list: Futures of the tiles that had to be rendered
+        """
+        futures = []
+        for zoom, x, y in tiles:
+            cached = self.get_cached_tile(zoom, x, y)
+            if cached:
+                if callback:
+                    callback(zoom, x, y, cached)
+                continue
+            
+            version = self._get_version(zoom, x, y)
+            future = self._get_executor().submit(
+                render_tile, self.db_path, self.storage_utils.spatial_index_available,
+                self.get_tile_path(zoom, x, y), zoom, x, y
+            )
+            future.add_done_callback(
+                lambda f, key=(zoom, x, y), version=version: self._on_tile_rendered(
+                    f, key, version, callback
+                )
+            )
+            futures.append(future)
+        return futures
+    
+    def _on_tile_rendered(self, future, key, version, callback):
+        """Handle a finished worker render"""
+        zoom, x, y = key
+        try:
+            tile_path = self._check_version(zoom, x, y, version, future.result())
+        except Exception as e:
+            print(f"Error rendering tile {zoom}/{x}/{y}: {e}")
+            tile_path = None
+        
+        if callback:
+            callback(zoom, x, y, tile_path)
+    
+    def _check_version(self, zoom, x, y, version, tile_path):
+        """Discard a render that was invalidated while it was running"""
+        if self._get_version(zoom, x, y) == version:
+            return tile_path
+        self._remove_tile(zoom, x, y)
+        return None
+    
+    def _get_version(self, zoom, x, y):
+        """Get current cache version of a tile"""
+        with self._lock:
+            return self._generation, self._tile_versions.get((zoom, x, y), 0)
+    
+    def _remove_tile(self, zoom, x, y):
+        """Delete a cached tile file"""
+        try:
+            os.remove(self.get_tile_path(zoom, x, y))
+        except FileNotFoundError:
+            pass
+    
+    def _on_samples_inserted(self, signal_data_list):
+        """Invalidate the cached tiles new samples fall into"""
+        for signal_data in signal_data_list:
+            if not signal_data.latitude and not signal_data.longitude:
+                continue
+            
+            for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+                x, y = lat_lon_to_tile(signal_data.latitude, signal_data.longitude, zoom)
+                self.invalidate_tile(zoom, x, y)
+    
+    def invalidate_tile(self, zoom, x, y):
+        """Drop one tile from the cache"""
+        with self._lock:
+            key = (zoom, x, y)
+            self._tile_versions[key] = self._tile_versions.get(key, 0) + 1
+        self._remove_tile(zoom, x, y)
+    
+    def clear_cache(self):
+        """Delete all cached tiles"""
+        try:
+            with self._lock:
+                self._generation += 1
+                self._tile_versions = {}
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return True
+        except Exception as e:
+            print(f"Error clearing tile cache: {e}")
+            return False
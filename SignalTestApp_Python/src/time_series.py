@@ -0,0 +1,303 @@
+# Time series query and downsampling module
+
+import time
+import sqlite3
+import threading
+import numpy as np
+from kpi_engine import VALUE_OFFSET, valid_readings
+
+# Metrics that can be charted: name -> (signal_data column, unit)
+METRICS = {
+    'RSRP': ('rsrp', 'dBm'),
+    'RSSI': ('rssi', 'dBm'),
+    'SINR': ('sinr', 'dB'),
+    'RSRQ': ('rsrq', 'dB')
+}
+
+# Fixed y axis of each metric in the live chart, so new samples never rescale it
+METRIC_RANGES = {
+    'RSRP': (-140.0, -44.0),
+    'RSSI': (-113.0, -51.0),
+    'SINR': (-20.0, 40.0),
+    'RSRQ': (-20.0, -3.0)
+}
+
+def parse_timestamps(timestamps):
+    """Convert 'YYYY-MM-DD HH:MM:SS' strings to float seconds since the epoch"""
+    return np.array(timestamps, dtype='datetime64[s]').astype(np.float64)
+
+def format_timestamp(seconds):
+    """Convert seconds since the epoch to a 'YYYY-MM-DD HH:MM:SS' string"""
+    return str(np.datetime64(int(seconds), 's')).replace('T', ' ')
+
+def lttb(x, y, threshold):
+    """Downsample a series with Largest-Triangle-Three-Buckets
+    
+    Keeps the first and last points and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket. Peaks
+    and dips survive, unlike with decimation or bucket averages.
+    
+    Args:
+        x (numpy.ndarray): Sorted x values
+        y (numpy.ndarray): y values
+        threshold (int): Number of points to keep
+    
+    Returns:
+        tuple: (x, y) of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    
+    # Bucket i covers [edges[i], edges[i + 1]); the first and last points stand alone
+    bucket_count = threshold - 2
+    edges = (np.arange(bucket_count + 1) * ((n - 2) / bucket_count)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    
+    # Bucket averages from cumulative sums, with the last point as the final "next bucket"
+    x_offset = x - x[0]
+    x_sums = np.concatenate(([0.0], np.cumsum(x_offset)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y, dtype=np.float64)))
+    bucket_sizes = edges[1:] - edges[:-1]
+    average_x = np.append((x_sums[edges[1:]] - x_sums[edges[:-1]]) / bucket_sizes, x_offset[-1])
+    average_y = np.append((y_sums[edges[1:]] - y_sums[edges[:-1]]) / bucket_sizes, y[-1])
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    
+    previous = 0
+    for bucket in range(bucket_count):
+        start, end = edges[bucket], edges[bucket + 1]
+        previous_x, previous_y = x_offset[previous], y[previous]
+        
+        # Twice the triangle area; the factor does not change the argmax
+        areas = np.abs(
+            (previous_x - average_x[bucket + 1]) * (y[start:end] - previous_y)
+            - (previous_x - x_offset[start:end]) * (average_y[bucket + 1] - previous_y)
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    
+    return x[selected], y[selected]
+
+class TimeSeriesSource:
+    """Load metric series from signal_data for a time window, with a cache
+    
+    The last loaded window is kept in memory; views inside it are sliced
+    without a query, and views outside it re-query only their own window (plus
+    a margin so short pans stay in memory).
+    """
+    
+    # Extra span loaded on each side of a requested window, as a fraction of its width
+    WINDOW_MARGIN = 1.0
+    
+    def __init__(self, storage_utils):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self._cache = {}
+        self._lock = threading.Lock()
+        
+        # Keep cached windows in step with the table
+        storage_utils.add_insert_listener(self._on_samples_inserted)
+        storage_utils.add_clear_listener(self.invalidate)
+        storage_utils.add_import_listener(self.invalidate)
+    
+    def invalidate(self):
+        """Drop cached windows"""
+        with self._lock:
+            self._cache.clear()
+    
+    def _on_samples_inserted(self, signal_data_list):
+        """Append new samples to cached windows covering their time"""
+        times = parse_timestamps([signal_data.timestamp for signal_data in signal_data_list])
+        
+        with self._lock:
+            for metric, (loaded_start, loaded_end, x, y) in list(self._cache.items()):
+                column = METRICS[metric][0]
+                values = np.array(
+                    [getattr(signal_data, column) or 0 for signal_data in signal_data_list],
+                    dtype=np.float64
+                )
+                inside = (times >= loaded_start) & (times <= loaded_end) & valid_readings(values)
+                if not inside.any():
+                    continue
+                
+                if len(x) and times[inside].min() < x[-1]:
+                    # Out-of-order samples (imports): reload on next use
+                    del self._cache[metric]
+                    continue
+                
+                order = np.argsort(times[inside], kind='stable')
+                self._cache[metric] = (
+                    loaded_start, loaded_end,
+                    np.concatenate((x, times[inside][order])),
+                    np.concatenate((y, values[inside][order]))
+                )
+    
+    def get_time_range(self, metric):
+        """Get (first, last) sample time of a metric in seconds, or None if it has no samples"""
+        column = METRICS[metric][0]
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # Ordered LIMIT 1 queries walk the timestamp index from each end
+            times = []
+            for order in ('ASC', 'DESC'):
+                cursor.execute(f'''
+                    SELECT timestamp FROM signal_data
+                    WHERE {column} IS NOT NULL AND {column} != 0 AND ABS({column}) < {VALUE_OFFSET}
+                    ORDER BY timestamp {order}
+                    LIMIT 1
+                ''')
+                row = cursor.fetchone()
+                times.append(row[0] if row else None)
+            conn.close()
+            first, last = times
+            
+            if first is None:
+                return None
+            return tuple(parse_timestamps([first, last]))
+        except Exception as e:
+            print(f"Error getting time range: {e}")
+            return None
+    
+    def _query_window(self, column, start, end):
+        """Get (x, y) arrays of a column between two times in seconds"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        # Zero means "not reported" for signal columns, values beyond
+        # VALUE_OFFSET are placeholders such as CellInfo.UNAVAILABLE
+        cursor.execute(f'''
+            SELECT timestamp, {column} FROM signal_data
+            WHERE timestamp >= ? AND timestamp <= ?
+                AND {column} IS NOT NULL AND {column} != 0 AND ABS({column}) < {VALUE_OFFSET}
+            ORDER BY timestamp
+        ''', (format_timestamp(np.floor(start)), format_timestamp(np.ceil(end))))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if not rows:
+            return np.empty(0), np.empty(0)
+        timestamps, values = zip(*rows)
+        return parse_timestamps(timestamps), np.array(values, dtype=np.float64)
+    
+    def get_window(self, metric, start, end, max_points=None):
+        """Get a metric's samples in a time window, downsampled for display
+        
+        Args:
+            metric (str): Key of METRICS
+            start, end (float): Window in seconds since the epoch
+            max_points (int): Downsample with LTTB to at most this many points
+                (the chart's pixel width), None to keep all
+        
+        Returns:
+            tuple: (x, y) numpy arrays, x in seconds since the epoch
+        """
+        column = METRICS[metric][0]
+        try:
+            with self._lock:
+                cached = self._cache.get(metric)
+            
+            if cached is None or start < cached[0] or end > cached[1]:
+                margin = (end - start) * self.WINDOW_MARGIN
+                loaded_start, loaded_end = start - margin, end + margin
+                x, y = self._query_window(column, loaded_start, loaded_end)
+                cached = (loaded_start, loaded_end, x, y)
+                with self._lock:
+                    self._cache[metric] = cached
+            
+            # Include the points just outside the window so the line reaches the edges
+            x, y = cached[2], cached[3]
+            first = max(int(np.searchsorted(x, start, side='left')) - 1, 0)
+            last = min(int(np.searchsorted(x, end, side='right')) + 1, len(x))
+            x, y = x[first:last], y[first:last]
+            
+            if max_points:
+                x, y = lttb(x, y, max_points)
+            return x, y
+        except Exception as e:
+            print(f"Error getting time series window: {e}")
+            return np.empty(0), np.empty(0)
+
+class SampleRingBuffer:
+    """Latest samples' metrics in fixed preallocated arrays
+    
+    push() overwrites the oldest slot in place, so a sampling run of any length
+    allocates nothing after construction. total counts every push; readers keep
+    the last total they consumed and read slots total % capacity for newer ones.
+    """
+    
+    def __init__(self, capacity=1200):
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.values = np.zeros((capacity, len(METRICS)))
+        self.columns = [column for column, unit in METRICS.values()]
+        self.total = 0
+        self.lock = threading.Lock()
+    
+    def push(self, signal_data, sample_time=None):
+        """Store a sample's metrics (usable as a SignalCollector sample listener)"""
+        with self.lock:
+            slot = self.total % self.capacity
+            self.times[slot] = time.time() if sample_time is None else sample_time
+            for index, column in enumerate(self.columns):
+                self.values[slot, index] = getattr(signal_data, column) or 0
+            self.total += 1
+    
+    def clear(self):
+        """Forget all samples"""
+        with self.lock:
+            self.total = 0
+
+class LiveSampler:
+    """Collect samples on a background thread at a fixed interval
+    
+    Samples reach their consumers through the collector's sample listeners
+    (for example SampleRingBuffer.push), so the UI thread never waits on the
+    telephony API. Every listener therefore runs on this worker thread and
+    must be thread-safe and cheap; anything touching widgets has to hop to
+    the UI thread with Clock.schedule_once.
+    """
+    
+    def __init__(self, signal_collector, interval=0.1):
+        self.signal_collector = signal_collector
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def is_running(self):
+        """Check if sampling is running"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start sampling"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop sampling"""
+        self._stop_event.set()
+        self._thread = None
+    
+    def _run(self):
+        """Sampling loop (worker thread)"""
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.signal_collector.get_signal_data()
+            except Exception as e:
+                print(f"Error collecting live sample: {e}")
+            
+            # Fixed rate; skip missed ticks rather than bursting to catch up
+            next_time += self.interval
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            self._stop_event.wait(next_time - now)
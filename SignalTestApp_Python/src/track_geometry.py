@@ -0,0 +1,354 @@
+# Drive-test track geometry module
+
+import json
+import sqlite3
+import numpy as np
+from xml.sax.saxutils import escape
+from kpi_engine import valid_readings
+
+# Web Mercator meters per pixel at zoom 0 (256 px tiles)
+METERS_PER_PIXEL_Z0 = 156543.03392804097
+EARTH_RADIUS = 6378137.0
+
+# Deepest zoom simplification is precomputed for
+MAX_ZOOM = 19
+
+# Signal strength thresholds and labels matching SignalData.get_signal_quality
+QUALITY_THRESHOLDS = (-100, -90, -80, -70)
+QUALITY_LABELS = ('Very Poor', 'Poor', 'Fair', 'Good', 'Excellent')
+
+# KML line colors per quality level (aabbggrr)
+QUALITY_KML_COLORS = ('ff0000ff', 'ff0080ff', 'ff00ffff', 'ff00ff80', 'ff00ff00')
+
+def signal_strengths(network_types, rsrp, rssi):
+    """Get signal strength for sample arrays (vectorized SignalData.get_signal_strength)"""
+    network_types = np.asarray(network_types)
+    rsrp = np.nan_to_num(np.asarray(rsrp, dtype=np.float64))
+    rssi = np.nan_to_num(np.asarray(rssi, dtype=np.float64))
+    return np.where((network_types == '5G') & (rsrp != 0), rsrp, rssi)
+
+def quality_codes(strength):
+    """Get quality level indexes (into QUALITY_LABELS) for signal strengths"""
+    return np.searchsorted(QUALITY_THRESHOLDS, strength, side='right')
+
+def signal_quality_codes(network_types, rsrp, rssi):
+    """Get quality level indexes (into QUALITY_LABELS) for sample arrays (vectorized)"""
+    return quality_codes(signal_strengths(network_types, rsrp, rssi))
+
+def zoom_tolerance(zoom, pixel_tolerance=1.0):
+    """Get simplification tolerance in Web Mercator meters for a map zoom"""
+    return METERS_PER_PIXEL_Z0 / (2 ** zoom) * pixel_tolerance
+
+def _rdp_significance(x, y, min_tolerance):
+    """Get Ramer-Douglas-Peucker significance of every vertex
+    
+    A vertex is kept by RDP at tolerance t exactly when its significance is >= t,
+    so one pass gives the simplification for every zoom level. The recursion is
+    run one depth at a time over all segments at once; it stops below
+    min_tolerance, where the remaining vertices keep their raw distances.
+    """
+    count = len(x)
+    significance = np.zeros(count)
+    if count == 0:
+        return significance
+    
+    significance[0] = significance[-1] = np.inf
+    anchors = np.array([0, count - 1])
+    active = np.arange(1, count - 1)
+    
+    while active.size:
+        # Segment (anchor pair) each undecided vertex lies in
+        segment = np.searchsorted(anchors, active) - 1
+        first = anchors[segment]
+        last = anchors[segment + 1]
+        distances = _segment_distances(x, y, active, first, last)
+        
+        # The newer endpoint holds the value of the split that created the segment
+        parent = np.minimum(significance[first], significance[last])
+        
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(segment)) + 1))
+        lengths = np.diff(np.append(starts, active.size))
+        segment_max = np.repeat(np.maximum.reduceat(distances, starts), lengths)
+        
+        # Segments flat enough at the finest tolerance are finished
+        finished = segment_max < min_tolerance
+        significance[active[finished]] = np.minimum(distances[finished], parent[finished])
+        
+        # Split every other segment at its farthest vertex (first one on ties)
+        candidates = np.flatnonzero(~finished & (distances == segment_max))
+        _, first_hits = np.unique(segment[candidates], return_index=True)
+        splits = candidates[first_hits]
+        
+        # Capping at the parent's value keeps the levels of detail nested
+        significance[active[splits]] = np.minimum(distances[splits], parent[splits])
+        
+        remaining = ~finished
+        remaining[splits] = False
+        anchors = np.union1d(anchors, active[splits])
+        active = active[remaining]
+    
+    return significance
+
+def _segment_distances(x, y, points, first, last):
+    """Get distances of vertices to the segments first-last (vectorized)"""
+    px = x[points] - x[first]
+    py = y[points] - y[first]
+    dx = x[last] - x[first]
+    dy = y[last] - y[first]
+    length_sq = dx * dx + dy * dy
+    
+    # Degenerate segments (stationary GPS) measure plain distance to the anchor
+    safe_length_sq = np.where(length_sq == 0, 1.0, length_sq)
+    t = np.clip((px * dx + py * dy) / safe_length_sq, 0.0, 1.0)
+    t = np.where(length_sq == 0, 0.0, t)
+    return np.hypot(px - t * dx, py - t * dy)
+
+class Track:
+    """A drive-test route with precomputed levels of detail"""
+    
+    def __init__(self, ids, latitudes, longitudes, timestamps, quality):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.timestamps = list(timestamps)
+        self.quality = np.asarray(quality, dtype=np.int64)
+        self._lod_cache = {}
+        
+        # Project to Web Mercator meters so tolerances map directly to pixels
+        x = np.radians(self.longitudes) * EARTH_RADIUS
+        y = np.log(np.tan(np.pi / 4 + np.radians(self.latitudes) / 2)) * EARTH_RADIUS
+        self.significance = _rdp_significance(x, y, zoom_tolerance(MAX_ZOOM, 0.5))
+        
+        # Always keep both sides of every signal quality change
+        changes = np.flatnonzero(np.diff(self.quality)) + 1
+        self.significance[changes] = np.inf
+        self.significance[changes - 1] = np.inf
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def simplify(self, zoom=None, pixel_tolerance=1.0):
+        """Get indexes of the vertices to draw at a map zoom (None for all)"""
+        if zoom is None:
+            return np.arange(len(self))
+        
+        key = (zoom, pixel_tolerance)
+        if key not in self._lod_cache:
+            tolerance = zoom_tolerance(zoom, pixel_tolerance)
+            self._lod_cache[key] = np.flatnonzero(self.significance >= tolerance)
+        return self._lod_cache[key]
+    
+    def get_coordinates(self, zoom=None, pixel_tolerance=1.0):
+        """Get simplified route as a list of (latitude, longitude)"""
+        indexes = self.simplify(zoom, pixel_tolerance)
+        return list(zip(self.latitudes[indexes].tolist(), self.longitudes[indexes].tolist()))
+    
+    def get_segments(self, zoom=None, pixel_tolerance=1.0):
+        """Split the simplified route into runs of constant signal quality
+        
+        Returns:
+            list: (quality_label, [(longitude, latitude), ...]) tuples; each run ends
+                on the first vertex of the next so the drawn line stays continuous
+        """
+        indexes = self.simplify(zoom, pixel_tolerance)
+        if len(indexes) == 0:
+            return []
+        
+        coordinates = np.column_stack(
+            (self.longitudes[indexes], self.latitudes[indexes])
+        ).tolist()
+        quality = self.quality[indexes]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(quality)) + 1))
+        ends = np.append(starts[1:] + 1, len(indexes))
+        
+        return [
+            (QUALITY_LABELS[quality[start]], coordinates[start:end])
+            for start, end in zip(starts.tolist(), ends.tolist())
+        ]
+    
+    def get_distance(self):
+        """Get route length in meters"""
+        if len(self) < 2:
+            return 0.0
+        lat = np.radians(self.latitudes)
+        lon = np.radians(self.longitudes)
+        a = (np.sin(np.diff(lat) / 2) ** 2 +
+             np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+        return float(np.sum(2 * 6371000.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))))
+    
+    def to_geojson(self, zoom=None, pixel_tolerance=1.0):
+        """Get simplified route as a GeoJSON FeatureCollection dict"""
+        features = []
+        for quality, coordinates in self.get_segments(zoom, pixel_tolerance):
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'LineString', 'coordinates': coordinates},
+                'properties': {'quality': quality}
+            })
+        
+        return {
+            'type': 'FeatureCollection',
+            'features': features,
+            'properties': {
+                'start_time': self.timestamps[0] if self.timestamps else None,
+                'end_time': self.timestamps[-1] if self.timestamps else None,
+                'sample_count': len(self)
+            }
+        }
+    
+    def to_kml(self, zoom=None, pixel_tolerance=1.0, name='Signal Test Track'):
+        """Get simplified route as a KML document string"""
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>',
+            f'<name>{escape(name)}</name>'
+        ]
+        
+        for level, color in enumerate(QUALITY_KML_COLORS):
+            parts.append(
+                f'<Style id="quality{level}"><LineStyle><color>{color}</color>'
+                f'<width>4</width></LineStyle></Style>'
+            )
+        
+        for quality, coordinates in self.get_segments(zoom, pixel_tolerance):
+            level = QUALITY_LABELS.index(quality)
+            coordinate_text = ' '.join(f'{lon:.7f},{lat:.7f}' for lon, lat in coordinates)
+            parts.append(
+                f'<Placemark><name>{escape(quality)}</name>'
+                f'<styleUrl>#quality{level}</styleUrl>'
+                f'<LineString><tessellate>1</tessellate>'
+                f'<coordinates>{coordinate_text}</coordinates></LineString></Placemark>'
+            )
+        
+        parts.append('</Document></kml>')
+        return '\n'.join(parts)
+
+class TrackGeometry:
+    """Build drive-test routes from stored samples and cache their levels of detail"""
+    
+    # Number of tracks kept in the cache
+    CACHE_SIZE = 8
+    
+    def __init__(self, storage_utils):
+        self.storage_utils = storage_utils
+        self.db_path = storage_utils.db_path
+        self._track_cache = {}
+        
+        # Drop cached tracks that new samples fall into
+        storage_utils.add_insert_listener(self._on_samples_inserted)
+        storage_utils.add_clear_listener(self._track_cache.clear)
+        storage_utils.add_import_listener(self._track_cache.clear)
+    
+    def get_track(self, session_id=None, start_time=None, end_time=None):
+        """Get the route of a session's samples, or of samples between two timestamps (inclusive)
+        
+        Args:
+            session_id (int): Only this session's samples, None for all
+            start_time, end_time (str): '%Y-%m-%d %H:%M:%S' bounds, None for open
+        
+        Returns:
+            Track: Route in time order, or None on error
+        """
+        key = (session_id, start_time, end_time)
+        track = self._track_cache.pop(key, None)
+        if track is None:
+            track = self._load_track(session_id, start_time, end_time)
+            if track is None:
+                return None
+        
+        # Re-insert to mark as most recently used
+        self._track_cache[key] = track
+        while len(self._track_cache) > self.CACHE_SIZE:
+            self._track_cache.pop(next(iter(self._track_cache)))
+        return track
+    
+    def _load_track(self, session_id, start_time, end_time):
+        """Load located, measured samples of a session and time range as a Track"""
+        try:
+            conditions = ['NOT (latitude = 0 AND longitude = 0)', 'latitude IS NOT NULL']
+            params = []
+            if session_id is not None:
+                conditions.append('session_id = ?')
+                params.append(session_id)
+            if start_time is not None:
+                conditions.append('timestamp >= ?')
+                params.append(start_time)
+            if end_time is not None:
+                conditions.append('timestamp <= ?')
+                params.append(end_time)
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, latitude, longitude, timestamp, network_type, rsrp, rssi
+                FROM signal_data
+                WHERE {' AND '.join(conditions)}
+                ORDER BY timestamp, id
+            ''', params)
+            rows = cursor.fetchall()
+            conn.close()
+            
+            if not rows:
+                return Track([], [], [], [], [])
+            
+            ids, latitudes, longitudes, timestamps, network_types, rsrp, rssi = zip(*rows)
+            strength = signal_strengths(
+                network_types,
+                np.array(rsrp, dtype=np.float64),
+                np.array(rssi, dtype=np.float64)
+            )
+            
+            # Samples without a real reading have no quality; leaving them in
+            # would add false quality changes that simplification must keep
+            measured = np.flatnonzero(valid_readings(strength))
+            return Track(
+                np.array(ids)[measured], np.array(latitudes)[measured], np.array(longitudes)[measured],
+                [timestamps[index] for index in measured], quality_codes(strength[measured])
+            )
+        except Exception as e:
+            print(f"Error loading track: {e}")
+            return None
+    
+    def _on_samples_inserted(self, signal_data_list):
+        """Invalidate cached tracks whose session and time range contain new samples"""
+        for key in list(self._track_cache):
+            session_id, start_time, end_time = key
+            for signal_data in signal_data_list:
+                if ((session_id is None or signal_data.session_id == session_id) and
+                        (start_time is None or signal_data.timestamp >= start_time) and
+                        (end_time is None or signal_data.timestamp <= end_time)):
+                    # May run on a worker thread (photo pipeline), so tolerate races
+                    self._track_cache.pop(key, None)
+                    break
+    
+    def export_geojson(self, file_path, session_id=None, start_time=None, end_time=None, zoom=None):
+        """Export a simplified route to a GeoJSON file"""
+        try:
+            track = self.get_track(session_id, start_time, end_time)
+            if track is None or len(track) == 0:
+                print("No track to export")
+                return None
+            
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(track.to_geojson(zoom), f, separators=(',', ':'))
+            print(f"Track exported to: {file_path}")
+            return file_path
+        except Exception as e:
+            print(f"Error exporting track to GeoJSON: {e}")
+            return None
+    
+    def export_kml(self, file_path, session_id=None, start_time=None, end_time=None, zoom=None):
+        """Export a simplified route to a KML file"""
+        try:
+            track = self.get_track(session_id, start_time, end_time)
+            if track is None or len(track) == 0:
+                print("No track to export")
+                return None
+            
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(track.to_kml(zoom))
+            print(f"Track exported to: {file_path}")
+            return file_path
+        except Exception as e:
+            print(f"Error exporting track to KML: {e}")
+            return None
@@ -6,16 +6,28 @@ from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.image import Image
 from kivy.clock import Clock
+import time
 
 class CameraScreen(Screen):
     """Camera screen for taking photos with signal info overlay"""
     
+    # Photos per burst and seconds between time-lapse photos
+    BURST_COUNT = 10
+    TIMELAPSE_INTERVAL = 5
+    
+    # Seconds the camera stays open after leaving the screen, for quick returns
+    CAMERA_RELEASE_DELAY = 10
+    
     def __init__(self, **kwargs):
         super(CameraScreen, self).__init__(**kwargs)
         self.camera_utils = None
         self.signal_collector = None
         self.location_service = None
         self.storage_utils = None
+        self.photo_pipeline = None
+        self.burst_capture = None
+        self.camera = None
+        self._release_event = None
         
         # Create layout
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -50,20 +62,55 @@ class CameraScreen(Screen):
         
         self.back_button = Button(text='Back', on_press=self.go_back)
         self.take_photo_button = Button(text='Take Photo', on_press=self.take_photo)
+        self.burst_button = Button(text='Burst', on_press=self.take_burst)
+        self.timelapse_button = Button(text='Time-lapse', on_press=self.toggle_timelapse)
         self.view_photos_button = Button(text='View Photos', on_press=self.view_photos)
         
         self.button_layout.add_widget(self.back_button)
         self.button_layout.add_widget(self.take_photo_button)
+        self.button_layout.add_widget(self.burst_button)
+        self.button_layout.add_widget(self.timelapse_button)
         self.button_layout.add_widget(self.view_photos_button)
         
         self.layout.add_widget(self.button_layout)
         
         # Add layout to screen
         self.add_widget(self.layout)
-        
-        # Initialize camera
+    
+    def on_enter(self, *args):
+        """Open the camera when the screen is shown"""
+        self._cancel_release()
         self._initialize_camera()
     
+    def on_leave(self, *args):
+        """Stop streaming when the screen is hidden, releasing the camera after a delay"""
+        if self.burst_capture and self.burst_capture.is_running():
+            self.burst_capture.stop()
+            self.timelapse_button.text = 'Time-lapse'
+        
+        if self.camera_utils:
+            self.camera_utils.stop_camera()
+            self._cancel_release()
+            self._release_event = Clock.schedule_once(self.release_camera, self.CAMERA_RELEASE_DELAY)
+    
+    def _cancel_release(self):
+        """Cancel a scheduled camera release"""
+        if self._release_event is not None:
+            self._release_event.cancel()
+            self._release_event = None
+    
+    def release_camera(self, *args):
+        """Release the camera device now (screen left or app paused)"""
+        self._cancel_release()
+        if self.camera_utils:
+            self.camera_utils.release_camera()
+        self.camera = None
+        
+        # Put the placeholder back in place of the camera widget
+        self.camera_layout.clear_widgets()
+        self.camera_layout.add_widget(self.camera_preview)
+        self.status_label.text = 'Camera released'
+    
     def _initialize_camera(self):
         """Initialize camera"""
         if self.camera_utils:
@@ -71,9 +118,10 @@ class CameraScreen(Screen):
             if success:
                 self.camera = self.camera_utils.camera
                 if self.camera:
-                    # Add camera to preview
-                    self.camera_layout.clear_widgets()
-                    self.camera_layout.add_widget(self.camera)
+                    # Add camera to preview, unless a warm instance is still shown
+                    if self.camera.parent is not self.camera_layout:
+                        self.camera_layout.clear_widgets()
+                        self.camera_layout.add_widget(self.camera)
                     self.status_label.text = 'Camera initialized'
                 else:
                     self.status_label.text = 'Failed to get camera'
@@ -88,22 +136,33 @@ class CameraScreen(Screen):
             self.status_label.text = 'Camera utilities not available'
             return
         
-        if not self.camera_utils.camera:
+        if not self.camera_utils.is_camera_active():
             self.status_label.text = 'Camera not initialized'
             return
         
+        shutter_time = time.perf_counter()
+        
         # Get current signal data
         signal_data = None
         if self.signal_collector:
             signal_data = self.signal_collector.get_signal_data()
             
-            if self.location_service:
+            # The pipeline looks up the location on its worker thread
+            if self.location_service and not self.photo_pipeline:
                 self.location_service.update_signal_data_location(signal_data)
         
         if not signal_data:
             self.status_label.text = 'Failed to get signal data'
             return
         
+        if self.photo_pipeline:
+            # Only the frame grab happens here; the rest completes in _on_photo_ready
+            if self.photo_pipeline.submit(signal_data, self._on_photo_ready, shutter_time):
+                self.status_label.text = 'Processing photo...'
+            else:
+                self.status_label.text = 'Camera busy, try again'
+            return
+        
         # Take photo
         photo_path = self.camera_utils.take_photo(signal_data)
         
@@ -111,8 +170,7 @@ class CameraScreen(Screen):
             self.status_label.text = f'Photo saved: {photo_path}'
             
             # Update photo preview
-            self.photo_preview.source = photo_path
-            self.photo_preview.reload()
+            self._show_preview(photo_path)
             
             # Save signal data with photo path
             if self.storage_utils:
@@ -121,16 +179,75 @@ class CameraScreen(Screen):
         else:
             self.status_label.text = 'Failed to take photo'
     
+    def _on_photo_ready(self, result):
+        """Handle a photo finished by the capture pipeline"""
+        photo_path = result['photo_path']
+        
+        if photo_path:
+            self.status_label.text = f'Photo saved: {photo_path}'
+            if result['saved']:
+                self.status_label.text += ' (Data saved)'
+            self.status_label.text += f" in {result['latency'] * 1000:.0f} ms"
+            
+            # Update photo preview
+            self._show_preview(photo_path)
+        else:
+            self.status_label.text = 'Failed to take photo'
+    
+    def take_burst(self, *args):
+        """Take a burst of photos, one per frame as fast as encoding keeps up"""
+        if not self.burst_capture:
+            self.status_label.text = 'Burst capture not available'
+            return
+        
+        if self.burst_capture.start(count=self.BURST_COUNT, callback=self._on_burst_progress):
+            self.status_label.text = f'Taking {self.BURST_COUNT} photos...'
+        else:
+            self.status_label.text = 'Camera busy or not initialized'
+    
+    def toggle_timelapse(self, *args):
+        """Start or stop taking a photo every TIMELAPSE_INTERVAL seconds"""
+        if not self.burst_capture:
+            self.status_label.text = 'Burst capture not available'
+            return
+        
+        if self.burst_capture.is_running():
+            self.burst_capture.stop()
+            self.timelapse_button.text = 'Time-lapse'
+            self.status_label.text = 'Time-lapse stopped'
+        elif self.burst_capture.start(self.TIMELAPSE_INTERVAL, callback=self._on_burst_progress):
+            self.timelapse_button.text = 'Stop'
+            self.status_label.text = f'Time-lapse: every {self.TIMELAPSE_INTERVAL} s'
+        else:
+            self.status_label.text = 'Camera busy or not initialized'
+    
+    def _on_burst_progress(self, stats):
+        """Show burst/time-lapse progress after each stored batch"""
+        self.status_label.text = (
+            f"Captured {stats['captured']}, saved {stats['saved']}, "
+            f"failed {stats['failed']}, throttled {stats['throttled']}"
+        )
+        if not stats['running']:
+            self.timelapse_button.text = 'Time-lapse'
+    
+    def _show_preview(self, photo_path):
+        """Show a photo in the preview strip, using its thumbnail when available"""
+        thumbnail_path = self.camera_utils.get_thumbnail(photo_path)
+        self.photo_preview.source = thumbnail_path or photo_path
+        self.photo_preview.reload()
+    
     def view_photos(self, *args):
         """View saved photos"""
         if self.camera_utils:
+            if self.manager and self.manager.has_screen('gallery'):
+                self.manager.current = 'gallery'
+                return
+            
             photos = self.camera_utils.get_photo_list()
             if photos:
                 self.status_label.text = f'Found {len(photos)} photos'
-                # For now, just show the latest photo
-                latest_photo = photos[0]
-                self.photo_preview.source = latest_photo['path']
-                self.photo_preview.reload()
+                # Without a gallery, just show the latest photo
+                self._show_preview(photos[0]['path'])
             else:
                 self.status_label.text = 'No photos found'
         else:
@@ -4,7 +4,9 @@ from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
-import numpy as np
+from kivy.clock import Clock
+from ui.time_series_chart import TimeSeriesChart, LiveChart
+from time_series import METRICS, format_timestamp
 
 class ChartScreen(Screen):
     """Chart screen for signal strength visualization"""
@@ -12,6 +14,12 @@ class ChartScreen(Screen):
     def __init__(self, **kwargs):
         super(ChartScreen, self).__init__(**kwargs)
         self.storage_utils = None
+        self.time_series_source = None
+        self.live_buffer = None
+        self.live_sampler = None
+        self.chart_exporter = None
+        self.loaded = False
+        self.live = False
         
         # Create layout
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -25,9 +33,13 @@ class ChartScreen(Screen):
         # Add chart area
         self.chart_layout = BoxLayout(size_hint_y=0.7)
         
-        # Create initial placeholder
-        self.placeholder_label = Label(text='Chart functionality disabled', font_size='16sp')
-        self.chart_layout.add_widget(self.placeholder_label)
+        # Create time series chart
+        self.chart = TimeSeriesChart()
+        self.chart.bind(on_view=self._on_chart_view)
+        self.chart_layout.add_widget(self.chart)
+        
+        # Live chart replaces the history chart while live mode is on
+        self.live_chart = LiveChart()
         
         self.layout.add_widget(self.chart_layout)
         
@@ -36,39 +48,112 @@ class ChartScreen(Screen):
         
         self.back_button = Button(text='Back', on_press=self.go_back)
         self.refresh_button = Button(text='Refresh', on_press=self.update_chart)
-        self.signal_strength_button = Button(text='Signal Strength', on_press=self.show_signal_strength)
-        self.network_type_button = Button(text='Network Type', on_press=self.show_network_type)
         
         self.button_layout.add_widget(self.back_button)
         self.button_layout.add_widget(self.refresh_button)
-        self.button_layout.add_widget(self.signal_strength_button)
-        self.button_layout.add_widget(self.network_type_button)
+        
+        self.live_button = Button(text='Live', on_press=self.toggle_live)
+        self.button_layout.add_widget(self.live_button)
+        
+        self.export_button = Button(text='Export', on_press=self.export_charts)
+        self.button_layout.add_widget(self.export_button)
+        
+        # One button per metric
+        for metric in METRICS:
+            self.button_layout.add_widget(
+                Button(text=metric, on_press=lambda button: self.show_metric(button.text))
+            )
         
         self.layout.add_widget(self.button_layout)
         
         # Add status label
-        self.status_label = Label(text='Chart functionality disabled', size_hint_y=0.05)
+        self.status_label = Label(text='Loading chart...', size_hint_y=0.05)
         self.layout.add_widget(self.status_label)
         
         # Add layout to screen
         self.add_widget(self.layout)
-        
-        # Initial chart type
-        self.current_chart_type = 'signal_strength'
+    
+    def on_enter(self, *args):
+        """Load the chart the first time the screen is shown"""
+        if not self.loaded:
+            self.update_chart()
+    
+    def on_leave(self, *args):
+        """Stop live sampling when leaving the screen"""
+        if self.live:
+            self.toggle_live()
     
     def update_chart(self, *args):
-        """Update chart based on current chart type"""
-        self.status_label.text = 'Chart functionality disabled'
+        """Reload the chart from storage, fitted to all samples"""
+        if not self.time_series_source:
+            self.status_label.text = 'Storage utilities not available'
+            return
+        
+        self.loaded = True
+        self.time_series_source.invalidate()
+        self.chart.source = self.time_series_source
+        self.status_label.text = 'Loading chart...'
+        self.chart.reset_view()
+    
+    def show_metric(self, metric):
+        """Show the trend chart of a metric"""
+        if self.live:
+            self.live_chart.set_metric(metric)
+            self.status_label.text = f'Live {metric}'
+            return
+        self.status_label.text = f'Loading {metric} chart...'
+        self.chart.set_metric(metric)
+    
+    def toggle_live(self, *args):
+        """Switch between the stored history chart and the live chart"""
+        if not self.live_buffer or not self.live_sampler:
+            self.status_label.text = 'Signal collector not available'
+            return
+        
+        self.live = not self.live
+        self.chart_layout.clear_widgets()
+        if self.live:
+            self.chart_layout.add_widget(self.live_chart)
+            self.live_chart.set_metric(self.chart.metric)
+            self.live_chart.start(self.live_buffer)
+            self.live_sampler.start()
+            self.live_button.text = 'History'
+            self.status_label.text = f'Live {self.chart.metric}'
+        else:
+            self.live_sampler.stop()
+            self.live_chart.stop()
+            self.chart_layout.add_widget(self.chart)
+            self.live_button.text = 'Live'
+            self.chart.set_metric(self.live_chart.metric)
+    
+    def export_charts(self, *args):
+        """Export one chart image per serving cell in the background"""
+        if not self.chart_exporter:
+            self.status_label.text = 'Chart export not available'
+            return
+        
+        metric = self.chart.metric
+        self.export_button.disabled = True
+        self.status_label.text = f'Exporting {metric} charts per cell...'
+        self.chart_exporter.export_cell_charts(
+            metric, callback=lambda paths: Clock.schedule_once(lambda dt: self._on_charts_exported(paths))
+        )
     
-    def show_signal_strength(self, *args):
-        """Show signal strength chart"""
-        self.current_chart_type = 'signal_strength'
-        self.status_label.text = 'Signal Strength chart disabled'
+    def _on_charts_exported(self, paths):
+        """Show the result of a chart export"""
+        self.export_button.disabled = False
+        exported = sum(1 for path in paths.values() if path)
+        self.status_label.text = f'Exported {exported} charts to {self.chart_exporter.export_dir}'
     
-    def show_network_type(self, *args):
-        """Show network type distribution chart"""
-        self.current_chart_type = 'network_type'
-        self.status_label.text = 'Network Type chart disabled'
+    def _on_chart_view(self, chart, start, end, point_count):
+        """Show the charted metric and time window"""
+        if start is None:
+            self.status_label.text = f'No {chart.metric} data'
+            return
+        self.status_label.text = (
+            f'{chart.metric}: {format_timestamp(start)} - {format_timestamp(end)} '
+            f'({point_count} points)'
+        )
     
     def go_back(self, *args):
         """Go back to main screen"""
@@ -0,0 +1,145 @@
+# Photo gallery screen UI module
+
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.button import Button
+from kivy.uix.image import Image
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recyclegridlayout import RecycleGridLayout
+from kivy.properties import StringProperty
+from kivy.clock import Clock
+
+class ThumbnailView(RecycleDataViewBehavior, ButtonBehavior, Image):
+    """Recycled gallery cell that loads its photo's thumbnail on demand"""
+    photo_path = StringProperty('')
+    index = None
+    gallery = None
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """Rebind the recycled cell to another photo"""
+        self.index = index
+        self.gallery = rv.gallery
+        self.source = ''
+        super(ThumbnailView, self).refresh_view_attrs(rv, index, data)
+        
+        # Only cells on screen exist, so only visible thumbnails get decoded
+        camera_utils = self.gallery.camera_utils if self.gallery else None
+        if camera_utils and self.photo_path:
+            camera_utils.request_thumbnail(self.photo_path, self._on_thumbnail)
+    
+    def _on_thumbnail(self, photo_path, thumbnail_path):
+        """Receive a thumbnail from the worker thread"""
+        Clock.schedule_once(lambda dt: self._show_thumbnail(photo_path, thumbnail_path))
+    
+    def _show_thumbnail(self, photo_path, thumbnail_path):
+        """Show a thumbnail unless the cell was recycled for another photo meanwhile"""
+        if thumbnail_path and photo_path == self.photo_path:
+            self.source = thumbnail_path
+    
+    def on_release(self):
+        """Open the full photo"""
+        if self.gallery and self.photo_path:
+            self.gallery.show_photo(self.photo_path)
+
+class GalleryScreen(Screen):
+    """Gallery screen for browsing saved photos as thumbnails"""
+    
+    def __init__(self, **kwargs):
+        super(GalleryScreen, self).__init__(**kwargs)
+        self.camera_utils = None
+        
+        # Create layout
+        self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        
+        # Add header
+        self.header = BoxLayout(size_hint_y=0.1)
+        self.title_label = Label(text='Photos', font_size='24sp', bold=True)
+        self.header.add_widget(self.title_label)
+        self.layout.add_widget(self.header)
+        
+        # Add status label
+        self.status_label = Label(text='Loading photos...', size_hint_y=0.05)
+        self.layout.add_widget(self.status_label)
+        
+        # Add full photo viewer, hidden until a thumbnail is tapped
+        self.viewer = Image(source='', allow_stretch=True, keep_ratio=True,
+                            size_hint_y=None, height=0, opacity=0)
+        self.layout.add_widget(self.viewer)
+        
+        # Create recycle view for thumbnails
+        self.recycle_view = RecycleView(size_hint_y=0.75)
+        self.recycle_view.viewclass = 'ThumbnailView'
+        self.recycle_view.data = []
+        self.recycle_view.gallery = self
+        
+        # Create layout manager
+        layout_manager = RecycleGridLayout(
+            cols=4,
+            spacing=5,
+            default_size=(None, 120),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout_manager.bind(minimum_height=layout_manager.setter('height'))
+        
+        # Add layout manager to recycle view
+        self.recycle_view.add_widget(layout_manager)
+        self.recycle_view.layout_manager = layout_manager
+        
+        self.layout.add_widget(self.recycle_view)
+        
+        # Add buttons
+        self.button_layout = BoxLayout(size_hint_y=0.1, spacing=10)
+        
+        self.back_button = Button(text='Back', on_press=self.go_back)
+        self.refresh_button = Button(text='Refresh', on_press=self.load_photos)
+        
+        self.button_layout.add_widget(self.back_button)
+        self.button_layout.add_widget(self.refresh_button)
+        
+        self.layout.add_widget(self.button_layout)
+        
+        # Add layout to screen
+        self.add_widget(self.layout)
+    
+    def on_enter(self, *args):
+        """Reload photos when the screen is shown"""
+        self.load_photos()
+    
+    def load_photos(self, *args):
+        """Load photo list"""
+        if self.camera_utils:
+            photos = self.camera_utils.get_photo_list()
+            self.status_label.text = f'Found {len(photos)} photos' if photos else 'No photos found'
+            
+            # Only paths go into the data; cells fetch thumbnails when they scroll into view
+            self.recycle_view.data = [{'photo_path': photo['path']} for photo in photos]
+        else:
+            self.status_label.text = 'Camera utilities not available'
+            self.recycle_view.data = []
+    
+    def show_photo(self, photo_path):
+        """Show a full photo above the grid"""
+        self.status_label.text = photo_path
+        self.viewer.source = photo_path
+        self.viewer.size_hint_y = 0.4
+        self.viewer.opacity = 1
+    
+    def hide_photo(self):
+        """Hide the full photo viewer"""
+        self.viewer.source = ''
+        self.viewer.size_hint_y = None
+        self.viewer.height = 0
+        self.viewer.opacity = 0
+    
+    def go_back(self, *args):
+        """Close the viewer, or go back to camera screen"""
+        if self.viewer.source:
+            self.hide_photo()
+            return
+        
+        if self.manager:
+            self.manager.current = 'camera'
@@ -1,9 +1,13 @@
 # History screen UI module
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
+from kivy.uix.textinput import TextInput
+from kivy.uix.spinner import Spinner
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.recycleview import RecycleView
@@ -11,6 +15,7 @@ from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.behaviors import FocusBehavior
 from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.properties import BooleanProperty, ObjectProperty
+from kivy.clock import Clock
 from kivy.lang import Builder
 
 # Kivy language definition for history item
@@ -48,12 +53,42 @@ class SelectableLabel(RecycleDataViewBehavior, Label):
         """Respond to the selection of items in the view"""
         self.selected = is_selected
 
+def format_history_row(signal_data):
+    """Get the list entry of a sample"""
+    display_text = f"{signal_data.timestamp} | {signal_data.network_type} | {signal_data.operator} | "
+    display_text += f"Signal: {signal_data.get_signal_strength()} dBm | "
+    display_text += f"Location: {signal_data.location_description[:30]}..."
+    return {'text': display_text}
+
 class HistoryScreen(Screen):
-    """History screen for viewing saved signal data"""
+    """History screen for viewing saved signal data
+    
+    Rows are loaded in pages as the list scrolls. Only a window of MAX_PAGES
+    pages is kept in the RecycleView; pages far from the viewport are dropped
+    and fetched again if the user scrolls back. Pages are fetched and
+    formatted on a worker thread, ahead of the viewport reaching them.
+    """
+    
+    # Rows per page, pages kept in the list, and rows of headroom that trigger a prefetch
+    PAGE_SIZE = 200
+    MAX_PAGES = 5
+    PREFETCH_ROWS = 100
+    ROW_HEIGHT = 40
+    
+    # Network type choices of the filter bar
+    NETWORK_TYPES = ('All', '5G', '4G', '3G', '2G')
     
     def __init__(self, **kwargs):
         super(HistoryScreen, self).__init__(**kwargs)
         self.storage_utils = None
+        self.filters = {}
+        self.pages = deque()
+        self.at_newest = True
+        self.at_oldest = False
+        self.loaded = False
+        self._executor = None
+        self._loading = False
+        self._generation = 0
         
         # Create layout
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -68,8 +103,11 @@ class HistoryScreen(Screen):
         self.count_label = Label(text='Loading data...', size_hint_y=0.05)
         self.layout.add_widget(self.count_label)
         
+        # Add filter bar
+        self._build_filter_bar()
+        
         # Add history list
-        self.history_layout = BoxLayout(size_hint_y=0.7)
+        self.history_layout = BoxLayout(size_hint_y=0.6)
         
         # Create recycle view for history items
         self.recycle_view = RecycleView()
@@ -79,14 +117,16 @@ class HistoryScreen(Screen):
         # Create layout manager
         layout_manager = RecycleBoxLayout(
             orientation='vertical',
-            default_size=(None, 40),
+            default_size=(None, self.ROW_HEIGHT),
             default_size_hint=(1, None),
             size_hint_y=None
         )
+        layout_manager.bind(minimum_height=layout_manager.setter('height'))
         
         # Add layout manager to recycle view
         self.recycle_view.add_widget(layout_manager)
         self.recycle_view.layout_manager = layout_manager
+        self.recycle_view.bind(scroll_y=self._on_scroll)
         
         self.history_layout.add_widget(self.recycle_view)
         self.layout.add_widget(self.history_layout)
@@ -108,35 +148,217 @@ class HistoryScreen(Screen):
         
         # Add layout to screen
         self.add_widget(self.layout)
+    
+    def _build_filter_bar(self):
+        """Build the two filter rows above the list"""
+        self.filter_row = BoxLayout(size_hint_y=0.05, spacing=5)
+        self.search_input = self._create_filter_input('Location search')
+        self.filter_row.add_widget(self.search_input)
+        self.network_spinner = Spinner(text='All', values=self.NETWORK_TYPES, size_hint_x=0.5)
+        self.filter_row.add_widget(self.network_spinner)
+        self.operator_input = self._create_filter_input('Operator')
+        self.filter_row.add_widget(self.operator_input)
+        self.cell_input = self._create_filter_input('CGI / NR-CGI')
+        self.filter_row.add_widget(self.cell_input)
+        self.layout.add_widget(self.filter_row)
+        
+        self.filter_row2 = BoxLayout(size_hint_y=0.05, spacing=5)
+        self.pci_input = self._create_filter_input('PCI', signed_int=True)
+        self.band_input = self._create_filter_input('Band')
+        self.min_rsrp_input = self._create_filter_input('Min RSRP', signed_int=True)
+        self.min_sinr_input = self._create_filter_input('Min SINR', signed_int=True)
+        self.start_input = self._create_filter_input('From YYYY-MM-DD')
+        self.end_input = self._create_filter_input('To YYYY-MM-DD')
+        for widget in (self.pci_input, self.band_input, self.min_rsrp_input,
+                       self.min_sinr_input, self.start_input, self.end_input):
+            self.filter_row2.add_widget(widget)
+        self.filter_row2.add_widget(Button(text='Filter', on_press=self.apply_filters))
+        self.filter_row2.add_widget(Button(text='Reset', on_press=self.reset_filters))
+        self.layout.add_widget(self.filter_row2)
+    
+    def _create_filter_input(self, hint_text, signed_int=False):
+        """Create a single-line filter text field; Enter applies the filters"""
+        text_input = TextInput(hint_text=hint_text, multiline=False)
+        if signed_int:
+            # Signal thresholds are negative, so Kivy's 'int' filter is not enough
+            text_input.input_filter = lambda text, from_undo: ''.join(c for c in text if c.isdigit() or c == '-')
+        text_input.bind(on_text_validate=self.apply_filters)
+        return text_input
+    
+    def get_filters(self):
+        """Get storage filters from the filter bar"""
+        filters = {}
+        
+        text_fields = (
+            ('location_text', self.search_input),
+            ('operator', self.operator_input),
+            ('cell', self.cell_input),
+            ('cell_band', self.band_input)
+        )
+        for name, text_input in text_fields:
+            value = text_input.text.strip()
+            if value:
+                filters[name] = value
+        
+        if self.network_spinner.text != 'All':
+            filters['network_type'] = self.network_spinner.text
+        
+        number_fields = (
+            ('cell_pci', self.pci_input),
+            ('min_rsrp', self.min_rsrp_input),
+            ('min_sinr', self.min_sinr_input)
+        )
+        for name, text_input in number_fields:
+            try:
+                filters[name] = int(text_input.text.strip())
+            except ValueError:
+                pass
+        
+        # Timestamps are 'YYYY-MM-DD HH:MM:SS' strings, so a bare end date
+        # is extended to the end of that day
+        start = self.start_input.text.strip()
+        end = self.end_input.text.strip()
+        if start:
+            filters['start_time'] = start
+        if end:
+            filters['end_time'] = end + ' 23:59:59' if len(end) == 10 else end
         
-        # Load history data
+        return filters
+    
+    def apply_filters(self, *args):
+        """Reload history with the filter bar's filters"""
+        self.filters = self.get_filters()
         self.load_history()
     
+    def reset_filters(self, *args):
+        """Clear the filter bar and reload all history"""
+        for text_input in (self.search_input, self.operator_input, self.cell_input,
+                           self.pci_input, self.band_input, self.min_rsrp_input,
+                           self.min_sinr_input, self.start_input, self.end_input):
+            text_input.text = ''
+        self.network_spinner.text = 'All'
+        self.apply_filters()
+    
+    def on_enter(self, *args):
+        """Load history the first time the screen is shown"""
+        if not self.loaded:
+            self.load_history()
+    
     def load_history(self, *args):
-        """Load history data"""
-        if self.storage_utils:
-            # Get signal data
-            signal_data_list = self.storage_utils.get_signal_data(limit=100)
-            count = self.storage_utils.get_signal_data_count()
-            
-            self.count_label.text = f'Total records: {count}'
-            
-            # Prepare data for recycle view
-            data = []
-            for signal_data in signal_data_list:
-                # Create display text
-                display_text = f"{signal_data.timestamp} | {signal_data.network_type} | {signal_data.operator} | "
-                display_text += f"Signal: {signal_data.get_signal_strength()} dBm | "
-                display_text += f"Location: {signal_data.location_description[:30]}..."
-                
-                data.append({'text': display_text})
-            
-            # Update recycle view
-            self.recycle_view.data = data
-            
-        else:
+        """Load history data from the newest row"""
+        if not self.storage_utils:
             self.count_label.text = 'Storage utilities not available'
             self.recycle_view.data = [{'text': 'No data available'}]
+            return
+        
+        # Results of requests made before this reload are ignored
+        self._generation += 1
+        self._loading = False
+        self.loaded = True
+        self.pages.clear()
+        self.at_newest = True
+        self.at_oldest = False
+        self.recycle_view.data = []
+        self.recycle_view.scroll_y = 1
+        
+        self._get_executor().submit(self._fetch_count, self._generation, self.filters)
+        self._request_page(None, newer=False)
+    
+    def _get_executor(self):
+        """Get worker thread for page loads"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+    
+    def _fetch_count(self, generation, filters):
+        """Count rows (worker thread)"""
+        count = self.storage_utils.get_signal_data_count(filters)
+        Clock.schedule_once(lambda dt: self._show_count(generation, count, bool(filters)))
+    
+    def _show_count(self, generation, count, filtered):
+        """Show the row count"""
+        if generation == self._generation:
+            self.count_label.text = f'Matching records: {count}' if filtered else f'Total records: {count}'
+    
+    def _request_page(self, cursor, newer):
+        """Fetch the page next to cursor on the worker thread"""
+        if self._loading:
+            return
+        self._loading = True
+        self._get_executor().submit(self._fetch_page, self._generation, cursor, newer, self.filters)
+    
+    def _fetch_page(self, generation, cursor, newer, filters):
+        """Fetch and format one page (worker thread)"""
+        signal_data_list = self.storage_utils.get_signal_data_page(cursor, self.PAGE_SIZE, newer, filters)
+        page = {
+            'rows': [format_history_row(signal_data) for signal_data in signal_data_list],
+            'first_key': (signal_data_list[0].timestamp, signal_data_list[0].id) if signal_data_list else None,
+            'last_key': (signal_data_list[-1].timestamp, signal_data_list[-1].id) if signal_data_list else None
+        }
+        Clock.schedule_once(lambda dt: self._add_page(generation, page, newer))
+    
+    def _add_page(self, generation, page, newer):
+        """Add a fetched page to the window, evicting the page furthest away"""
+        if generation != self._generation:
+            return
+        self._loading = False
+        
+        if len(page['rows']) < self.PAGE_SIZE:
+            if newer:
+                self.at_newest = True
+            else:
+                self.at_oldest = True
+        if not page['rows']:
+            return
+        
+        first_row = self._get_first_visible_row()
+        if newer:
+            self.pages.appendleft(page)
+            first_row += len(page['rows'])
+            if len(self.pages) > self.MAX_PAGES:
+                self.pages.pop()
+                self.at_oldest = False
+        else:
+            self.pages.append(page)
+            if len(self.pages) > self.MAX_PAGES:
+                first_row -= len(self.pages.popleft()['rows'])
+                self.at_newest = False
+        
+        data = []
+        for window_page in self.pages:
+            data.extend(window_page['rows'])
+        self.recycle_view.data = data
+        
+        # Keep the same row at the top of the viewport after the window moved
+        self._scroll_to_row(first_row, len(data))
+    
+    def _get_first_visible_row(self):
+        """Get index of the row at the top of the viewport"""
+        scrollable = len(self.recycle_view.data) * self.ROW_HEIGHT - self.recycle_view.height
+        if scrollable <= 0:
+            return 0
+        return int((1 - self.recycle_view.scroll_y) * scrollable / self.ROW_HEIGHT)
+    
+    def _scroll_to_row(self, row, row_count):
+        """Scroll so that row is at the top of the viewport"""
+        scrollable = row_count * self.ROW_HEIGHT - self.recycle_view.height
+        if scrollable <= 0:
+            self.recycle_view.scroll_y = 1
+            return
+        self.recycle_view.scroll_y = max(0.0, min(1.0, 1 - row * self.ROW_HEIGHT / scrollable))
+    
+    def _on_scroll(self, instance, scroll_y):
+        """Prefetch the neighbouring page when the viewport nears a window edge"""
+        if self._loading or not self.pages:
+            return
+        
+        first_row = self._get_first_visible_row()
+        last_row = first_row + int(self.recycle_view.height / self.ROW_HEIGHT)
+        
+        if not self.at_oldest and len(self.recycle_view.data) - last_row <= self.PREFETCH_ROWS:
+            self._request_page(self.pages[-1]['last_key'], newer=False)
+        elif not self.at_newest and first_row <= self.PREFETCH_ROWS:
+            self._request_page(self.pages[0]['first_key'], newer=True)
     
     def export_data(self, *args):
         """Export data"""
@@ -155,6 +377,9 @@ class HistoryScreen(Screen):
         if self.storage_utils:
             success = self.storage_utils.delete_all_data()
             if success:
+                self._generation += 1
+                self._loading = False
+                self.pages.clear()
                 self.count_label.text = 'All data cleared'
                 self.recycle_view.data = []
             else:
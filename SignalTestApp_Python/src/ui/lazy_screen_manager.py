@@ -0,0 +1,37 @@
+# Lazy screen manager UI module
+
+from kivy.uix.screenmanager import ScreenManager
+
+class LazyScreenManager(ScreenManager):
+    """Screen manager that builds screens on first navigation
+    
+    Screens are registered by name with a factory; the factory (and so the
+    screen module and its imports) runs the first time the screen is needed.
+    """
+    
+    def __init__(self, **kwargs):
+        super(LazyScreenManager, self).__init__(**kwargs)
+        self.factories = {}
+    
+    def register(self, name, factory):
+        """Register factory() returning the screen called name"""
+        self.factories[name] = factory
+    
+    def get_built_screen(self, name):
+        """Get a screen if it has been built, without building it"""
+        for screen in self.screens:
+            if screen.name == name:
+                return screen
+        return None
+    
+    def get_screen(self, name):
+        """Get a screen, building it if needed"""
+        screen = self.get_built_screen(name)
+        if screen is None and name in self.factories:
+            screen = self.factories[name]()
+            self.add_widget(screen)
+        return super(LazyScreenManager, self).get_screen(name)
+    
+    def has_screen(self, name):
+        """Check if a screen is registered or built"""
+        return name in self.factories or self.get_built_screen(name) is not None
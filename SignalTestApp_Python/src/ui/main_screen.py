@@ -8,6 +8,8 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.clock import Clock
 from kivy.graphics import Color, Rectangle
+from dashboard_model import DashboardViewModel
+import profiler
 
 class MainScreen(Screen):
     """Main dashboard screen showing signal information"""
@@ -18,6 +20,12 @@ class MainScreen(Screen):
         self.location_service = None
         self.storage_utils = None
         self.camera_utils = None
+        self.session_manager = None
+        self.report_generator = None
+        self.event_engine = None
+        self.view_model = DashboardViewModel()
+        self.pending_changes = {}
+        self._apply_trigger = Clock.create_trigger(self._apply_changes)
         
         # Create layout
         self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -74,6 +82,7 @@ class MainScreen(Screen):
         self.frequency_label = self._create_info_label('Frequency', 'frequency')
         self.location_label = self._create_info_label('Location', 'location')
         self.timestamp_label = self._create_info_label('Timestamp', 'timestamp')
+        self.last_event_label = self._create_info_label('Last Event', 'last_event')
         
         # Add labels to grid
         self.signal_info_layout.add_widget(self.network_type_label)
@@ -86,6 +95,7 @@ class MainScreen(Screen):
         self.signal_info_layout.add_widget(self.frequency_label)
         self.signal_info_layout.add_widget(self.location_label)
         self.signal_info_layout.add_widget(self.timestamp_label)
+        self.signal_info_layout.add_widget(self.last_event_label)
         
         # Add scroll view for signal info
         self.scroll_view = ScrollView(size_hint_y=0.6)
@@ -93,7 +103,7 @@ class MainScreen(Screen):
         self.layout.add_widget(self.scroll_view)
         
         # Add action buttons
-        self.button_layout = GridLayout(cols=3, spacing=10, size_hint_y=0.2)
+        self.button_layout = GridLayout(cols=4, spacing=10, size_hint_y=0.2)
         
         self.camera_button = Button(text='Camera', on_press=self.go_to_camera)
         self.history_button = Button(text='History', on_press=self.go_to_history)
@@ -101,6 +111,8 @@ class MainScreen(Screen):
         self.save_button = Button(text='Save', on_press=self.save_data)
         self.export_button = Button(text='Export', on_press=self.export_data)
         self.refresh_button = Button(text='Refresh', on_press=self.update_signal_info)
+        self.session_button = Button(text='Start Test', on_press=self.toggle_session)
+        self.report_button = Button(text='Report', on_press=self.generate_report)
         
         self.button_layout.add_widget(self.camera_button)
         self.button_layout.add_widget(self.history_button)
@@ -108,6 +120,8 @@ class MainScreen(Screen):
         self.button_layout.add_widget(self.save_button)
         self.button_layout.add_widget(self.export_button)
         self.button_layout.add_widget(self.refresh_button)
+        self.button_layout.add_widget(self.session_button)
+        self.button_layout.add_widget(self.report_button)
         
         self.layout.add_widget(self.button_layout)
         
@@ -138,30 +152,38 @@ class MainScreen(Screen):
             if self.location_service:
                 self.location_service.update_signal_data_location(signal_data)
             
-            # Update labels
-            self.network_type_value.text = signal_data.network_type
-            self.operator_value.text = signal_data.operator
-            self.signal_strength_value.text = f"{signal_data.get_signal_strength()} dBm"
-            self.signal_quality_value.text = signal_data.get_signal_quality()
-            
-            # Use 5G values if available
-            if signal_data.network_type == "5G":
-                self.cgi_value.text = signal_data.nr_cgi
-                self.pci_value.text = str(signal_data.nr_pci) if signal_data.nr_pci != 0 else "N/A"
-                self.band_value.text = signal_data.nr_band
-                self.frequency_value.text = str(signal_data.nr_frequency) if signal_data.nr_frequency != 0 else "N/A"
-            else:
-                self.cgi_value.text = signal_data.cgi
-                self.pci_value.text = str(signal_data.pci) if signal_data.pci != 0 else "N/A"
-                self.band_value.text = signal_data.band
-                self.frequency_value.text = str(signal_data.frequency) if signal_data.frequency != 0 else "N/A"
-            
-            self.location_value.text = signal_data.location_description
-            self.timestamp_value.text = signal_data.timestamp
+            # Only labels whose text changed are written, all in the next frame;
+            # the latest sample's diff replaces any not yet applied
+            self.pending_changes = self.view_model.diff(signal_data)
+            if self.pending_changes:
+                self._apply_trigger()
             
             # Store current signal data for saving
             self.current_signal_data = signal_data
     
+    def _apply_changes(self, *args):
+        """Write pending text changes to their labels"""
+        changes = self.pending_changes
+        self.pending_changes = {}
+        for field, text in changes.items():
+            getattr(self, f'{field}_value').text = text
+        self.view_model.mark_shown(changes)
+        profiler.counter('dashboard label updates/min', self.view_model.get_updates_per_minute())
+    
+    def on_live_events(self, events):
+        """Event listener for live events; runs on the sampling thread"""
+        Clock.schedule_once(self._show_last_event)
+    
+    def _show_last_event(self, *args):
+        """Show the latest live event"""
+        if not self.event_engine or not self.event_engine.live_events:
+            return
+        event = self.event_engine.live_events[-1]
+        text = event['event_type'].replace('_', ' ').capitalize()
+        if event['from_cell'] != event['to_cell']:
+            text += f"\n{event['from_cell']} -> {event['to_cell']}"
+        self.last_event_value.text = f"{text}\n{event['timestamp']}"
+    
     def save_data(self, *args):
         """Save current signal data"""
         if hasattr(self, 'current_signal_data') and self.storage_utils:
@@ -170,6 +192,7 @@ class MainScreen(Screen):
                 print("Data saved successfully")
                 # Show feedback to user
                 self.timestamp_value.text = f"{self.current_signal_data.timestamp} (Saved)"
+                self.view_model.invalidate('timestamp')
             else:
                 print("Failed to save data")
     
@@ -181,6 +204,55 @@ class MainScreen(Screen):
                 print(f"Data exported to: {csv_path}")
                 # Show feedback to user
                 self.timestamp_value.text = f"Exported to CSV"
+                self.view_model.invalidate('timestamp')
+    
+    def toggle_session(self, *args):
+        """Start a test session, or stop the active one"""
+        if not self.session_manager:
+            print("Session manager not available")
+            return
+        
+        if self.session_manager.get_active_session_id() is None:
+            session_id = self.session_manager.start_session()
+            if session_id is not None:
+                self.session_button.text = 'Stop Test'
+                self.session_button.background_color = (0.8, 0.2, 0.2, 1)
+        else:
+            session_id = self.session_manager.stop_session()
+            session = self.session_manager.get_session(session_id)
+            if session:
+                print(f"Session {session_id}: {session['sample_count']} samples, "
+                      f"{session['distance']:.0f} m, {session['duration']:.0f} s")
+            self.session_button.text = 'Start Test'
+            self.session_button.background_color = (1, 1, 1, 1)
+    
+    def generate_report(self, *args):
+        """Write a report of the latest test session in the background"""
+        if not self.report_generator or not self.session_manager:
+            print("Report generator not available")
+            return
+        
+        sessions = self.session_manager.get_sessions(limit=1)
+        if not sessions:
+            print("No test session to report")
+            return
+        
+        self.report_button.disabled = True
+        self.report_generator.generate_report(
+            [sessions[0]['id']],
+            callback=lambda paths: Clock.schedule_once(lambda dt: self._on_report_done(paths))
+        )
+    
+    def _on_report_done(self, paths):
+        """Show the outcome of a report"""
+        self.report_button.disabled = False
+        if paths['html']:
+            print(f"Report written to: {paths['html']}")
+            # Show feedback to user
+            self.timestamp_value.text = "Report written"
+            self.view_model.invalidate('timestamp')
+        else:
+            print("Failed to write report")
     
     def go_to_camera(self, *args):
         """Go to camera screen"""
@@ -0,0 +1,381 @@
+# Time series chart widget module
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from kivy.uix.stencilview import StencilView
+from kivy.uix.label import Label
+from kivy.graphics import Color, Mesh, PushMatrix, PopMatrix, Translate, Scale
+from kivy.clock import Clock
+from time_series import METRICS, METRIC_RANGES
+from profiler import timed
+
+class TimeSeriesChart(StencilView):
+    """Line chart of one signal metric over time, drawn from vertex buffers
+    
+    The visible window is loaded from a TimeSeriesSource on a worker thread and
+    downsampled with LTTB to one point per pixel column, so drawing cost does
+    not depend on the number of stored samples. Drag pans, pinch or the mouse
+    wheel zooms; each change re-queries only the new window.
+    
+    Events:
+        on_view: (start, end, point_count) after a window is drawn
+    """
+    
+    # Horizontal grid lines (and y labels)
+    GRID_LINES = 5
+    
+    # Shortest visible time span (seconds) and zoom step of one wheel notch
+    MIN_SPAN = 10.0
+    WHEEL_ZOOM = 1.25
+    
+    def __init__(self, **kwargs):
+        self.register_event_type('on_view')
+        super(TimeSeriesChart, self).__init__(**kwargs)
+        self.source = None
+        self.metric = 'RSRP'
+        self.data_range = None
+        self.view_start = None
+        self.view_end = None
+        self.series = (np.empty(0), np.empty(0))
+        self._touches = []
+        self._executor = None
+        self._loading = False
+        self._reload_needed = False
+        self._generation = 0
+        
+        with self.canvas:
+            Color(0.35, 0.35, 0.35, 1)
+            self.grid_mesh = Mesh(mode='lines')
+            Color(0.2, 0.7, 1, 1)
+            self.line_mesh = Mesh(mode='line_strip')
+        
+        self.y_labels = []
+        for i in range(self.GRID_LINES):
+            label = Label(font_size='11sp', size_hint=(None, None), size=(80, 20), halign='left')
+            label.bind(size=label.setter('text_size'))
+            self.y_labels.append(label)
+            self.add_widget(label)
+        
+        self.bind(pos=self._redraw, size=self._on_size)
+    
+    def on_view(self, start, end, point_count):
+        """Default handler of the on_view event"""
+        pass
+    
+    def set_metric(self, metric):
+        """Chart another metric, fitting the view to all of its samples"""
+        self.metric = metric
+        self.reset_view()
+    
+    def reset_view(self, *args):
+        """Fit the view to all samples of the current metric"""
+        self.view_start = None
+        self.view_end = None
+        self._generation += 1
+        self.load()
+    
+    def load(self, *args):
+        """Load the current window on the worker thread"""
+        if not self.source:
+            return
+        if self._loading:
+            # One load at a time; the latest window is loaded when it finishes
+            self._reload_needed = True
+            return
+        
+        self._loading = True
+        self._reload_needed = False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._executor.submit(
+            self._fetch, self._generation, self.metric,
+            self.view_start, self.view_end, max(int(self.width), 3)
+        )
+    
+    def _fetch(self, generation, metric, start, end, max_points):
+        """Query and downsample a window (worker thread)"""
+        data_range = None
+        if start is None:
+            data_range = self.source.get_time_range(metric)
+            if data_range is None:
+                Clock.schedule_once(lambda dt: self._apply(generation, None, None, None))
+                return
+            start, end = data_range
+            if end - start < self.MIN_SPAN:
+                end = start + self.MIN_SPAN
+        
+        series = self.source.get_window(metric, start, end, max_points)
+        Clock.schedule_once(lambda dt: self._apply(generation, data_range, (start, end), series))
+    
+    def _apply(self, generation, data_range, view, series):
+        """Show a loaded window"""
+        self._loading = False
+        
+        if generation == self._generation:
+            if view is None:
+                # No samples for this metric
+                self.data_range = None
+                self.series = (np.empty(0), np.empty(0))
+            else:
+                if data_range is not None:
+                    self.data_range = data_range
+                    self.view_start, self.view_end = view
+                self.series = series
+            self._redraw()
+            self.dispatch('on_view', self.view_start, self.view_end, len(self.series[0]))
+        
+        if self._reload_needed:
+            self.load()
+    
+    def _on_size(self, *args):
+        """Redraw, and reload at the new pixel width"""
+        self._redraw()
+        if self.view_start is not None:
+            self.load()
+    
+    def _redraw(self, *args):
+        """Rebuild the vertex buffers from the loaded series"""
+        x, y = self.series
+        if len(x) < 2 or self.view_start is None or self.width <= 0:
+            self.line_mesh.vertices = []
+            self.line_mesh.indices = []
+            self.grid_mesh.vertices = []
+            self.grid_mesh.indices = []
+            for label in self.y_labels:
+                label.text = ''
+            return
+        
+        # Fit y to the data with a little headroom
+        y_min, y_max = float(y.min()), float(y.max())
+        padding = max((y_max - y_min) * 0.05, 1.0)
+        y_min, y_max = y_min - padding, y_max + padding
+        
+        span = self.view_end - self.view_start
+        pixel_x = self.x + (x - self.view_start) * (self.width / span)
+        pixel_y = self.y + (y - y_min) * (self.height / (y_max - y_min))
+        
+        # Mesh vertex format is (x, y, u, v)
+        vertices = np.zeros((len(x), 4))
+        vertices[:, 0] = pixel_x
+        vertices[:, 1] = pixel_y
+        self.line_mesh.vertices = vertices.ravel().tolist()
+        self.line_mesh.indices = list(range(len(x)))
+        
+        unit = METRICS[self.metric][1]
+        grid_vertices = []
+        for i, label in enumerate(self.y_labels):
+            fraction = (i + 0.5) / self.GRID_LINES
+            line_y = self.y + fraction * self.height
+            grid_vertices.extend([self.x, line_y, 0, 0, self.right, line_y, 0, 0])
+            label.text = f"{y_min + fraction * (y_max - y_min):.0f} {unit}"
+            label.pos = (self.x + 4, line_y)
+        self.grid_mesh.vertices = grid_vertices
+        self.grid_mesh.indices = list(range(len(grid_vertices) // 4))
+    
+    def _set_view(self, start, end):
+        """Move the view, kept inside the data range, and redraw"""
+        if self.data_range is None:
+            return
+        
+        data_start, data_end = self.data_range
+        span = min(max(end - start, self.MIN_SPAN), max(data_end - data_start, self.MIN_SPAN))
+        start = min(max(start, data_start), max(data_end - span, data_start))
+        self.view_start, self.view_end = start, start + span
+        
+        # Redraw the loaded points at once, then refine with the re-queried window
+        self._redraw()
+        self.load()
+    
+    def _zoom(self, factor, anchor_x):
+        """Zoom by factor (>1 zooms out) keeping the time under anchor_x in place"""
+        span = self.view_end - self.view_start
+        anchor = self.view_start + (anchor_x - self.x) / self.width * span
+        self._set_view(anchor - (anchor - self.view_start) * factor,
+                       anchor + (self.view_end - anchor) * factor)
+    
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos) or self.view_start is None:
+            return super(TimeSeriesChart, self).on_touch_down(touch)
+        
+        if touch.is_mouse_scrolling:
+            if touch.button == 'scrolldown':
+                self._zoom(1 / self.WHEEL_ZOOM, touch.x)
+            elif touch.button == 'scrollup':
+                self._zoom(self.WHEEL_ZOOM, touch.x)
+            return True
+        
+        touch.grab(self)
+        self._touches.append(touch)
+        return True
+    
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self:
+            return super(TimeSeriesChart, self).on_touch_move(touch)
+        
+        if len(self._touches) == 1:
+            shift = touch.dx / self.width * (self.view_end - self.view_start)
+            self._set_view(self.view_start - shift, self.view_end - shift)
+        elif len(self._touches) == 2:
+            other = self._touches[0] if self._touches[1] is touch else self._touches[1]
+            previous = abs(touch.px - other.x)
+            current = abs(touch.x - other.x)
+            if previous > 0 and current > 0:
+                self._zoom(previous / current, (touch.x + other.x) / 2)
+        return True
+    
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super(TimeSeriesChart, self).on_touch_up(touch)
+        touch.ungrab(self)
+        if touch in self._touches:
+            self._touches.remove(touch)
+        return True
+
+class LiveChart(StencilView):
+    """Scrolling chart of the latest samples in a SampleRingBuffer
+    
+    Each buffer slot owns one line segment (previous sample to its sample) in
+    a preallocated vertex list, so an update writes only the new samples'
+    vertices in Python and the index list never changes. Vertices are in
+    (seconds since start, value) units; scrolling and scaling are a
+    Translate/Scale in front of the mesh, not a rewrite of the vertices.
+    
+    Mesh has no partial upload, though: every tick with new samples assigns
+    the whole list, which Kivy converts to floats and re-uploads, capacity * 8
+    floats (9600 at the default 1200). Measured on a desktop CPU at that
+    capacity, update() takes about 0.3 ms including the conversion, inside
+    the 1 ms per-tick budget but growing linearly with capacity; expect a few
+    times that on phones. update() is profiled under 'ui' to check on device.
+    """
+    
+    # Seconds shown, and chart updates per second
+    WINDOW = 60.0
+    UPDATE_RATE = 10
+    
+    # Vertices of unused or broken segments, far outside the view
+    OFFSCREEN = -1.0e9
+    
+    def __init__(self, **kwargs):
+        super(LiveChart, self).__init__(**kwargs)
+        self.buffer = None
+        self.metric = 'RSRP'
+        self._column = list(METRICS).index(self.metric)
+        self._seen = 0
+        self._last_point = None
+        self._origin = time.time()
+        self._vertices = []
+        self._event = None
+        
+        with self.canvas:
+            Color(0.35, 0.35, 0.35, 1)
+            self.grid_mesh = Mesh(mode='lines')
+            PushMatrix()
+            self.translate = Translate()
+            self.scale = Scale()
+            Color(0.2, 0.7, 1, 1)
+            self.line_mesh = Mesh(mode='lines')
+            PopMatrix()
+        
+        self.y_labels = []
+        for i in range(TimeSeriesChart.GRID_LINES):
+            label = Label(font_size='11sp', size_hint=(None, None), size=(80, 20), halign='left')
+            label.bind(size=label.setter('text_size'))
+            self.y_labels.append(label)
+            self.add_widget(label)
+        
+        self.bind(pos=self._update_layout, size=self._update_layout)
+    
+    def start(self, buffer):
+        """Start drawing a buffer's samples"""
+        if self.buffer is not buffer:
+            self.buffer = buffer
+            # Two vertices of four floats per slot, allocated once per buffer
+            self._vertices = [self.OFFSCREEN, 0.0, 0.0, 0.0] * (2 * buffer.capacity)
+            self.line_mesh.indices = list(range(2 * buffer.capacity))
+        self.rebuild()
+        if self._event is None:
+            self._event = Clock.schedule_interval(self.update, 1.0 / self.UPDATE_RATE)
+    
+    def stop(self):
+        """Stop updating"""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+    
+    def set_metric(self, metric):
+        """Draw another metric from the same buffer"""
+        self.metric = metric
+        self._column = list(METRICS).index(metric)
+        self._update_layout()
+        self.rebuild()
+    
+    def rebuild(self):
+        """Rewrite all segments from the buffer"""
+        if not self.buffer:
+            return
+        for index in range(0, len(self._vertices), 4):
+            self._vertices[index] = self.OFFSCREEN
+            self._vertices[index + 1] = 0.0
+        self._last_point = None
+        self._seen = max(self.buffer.total - self.buffer.capacity, 0)
+        self.update()
+    
+    def _write_segment(self, slot, x, y):
+        """Write the segment ending at (x, y) into a slot, in place"""
+        index = slot * 8
+        vertices = self._vertices
+        if self._last_point is None or y == 0:
+            # First sample, or a gap: no line into this point
+            for offset in (0, 4):
+                vertices[index + offset] = self.OFFSCREEN
+                vertices[index + offset + 1] = 0.0
+        else:
+            vertices[index] = self._last_point[0]
+            vertices[index + 1] = self._last_point[1]
+            vertices[index + 4] = x
+            vertices[index + 5] = y
+        self._last_point = (x, y) if y != 0 else None
+    
+    @timed('ui')
+    def update(self, *args):
+        """Add samples pushed since the last update and scroll to now"""
+        if not self.buffer:
+            return
+        
+        buffer = self.buffer
+        column = self._column
+        with buffer.lock:
+            total = buffer.total
+            first = max(self._seen, total - buffer.capacity)
+            for sample in range(first, total):
+                slot = sample % buffer.capacity
+                self._write_segment(
+                    slot, float(buffer.times[slot] - self._origin), float(buffer.values[slot, column])
+                )
+        
+        if total != self._seen:
+            self._seen = total
+            self.line_mesh.vertices = self._vertices
+        
+        # The newest time is at the right edge
+        self.translate.x = self.x + self.width - (time.time() - self._origin) * self.scale.x
+    
+    def _update_layout(self, *args):
+        """Fit the transform and grid to the widget and metric"""
+        y_min, y_max = METRIC_RANGES[self.metric]
+        self.scale.x = self.width / self.WINDOW
+        self.scale.y = self.height / (y_max - y_min)
+        self.translate.y = self.y - y_min * self.scale.y
+        self.translate.x = self.x + self.width - (time.time() - self._origin) * self.scale.x
+        
+        unit = METRICS[self.metric][1]
+        grid_vertices = []
+        for i, label in enumerate(self.y_labels):
+            fraction = (i + 0.5) / len(self.y_labels)
+            line_y = self.y + fraction * self.height
+            grid_vertices.extend([self.x, line_y, 0, 0, self.right, line_y, 0, 0])
+            label.text = f"{y_min + fraction * (y_max - y_min):.0f} {unit}"
+            label.pos = (self.x + 4, line_y)
+        self.grid_mesh.vertices = grid_vertices
+        self.grid_mesh.indices = list(range(len(grid_vertices) // 4))
@@ -0,0 +1,65 @@
+# Worker pool module
+
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# The pool shared by every CPU-bound helper, see get_worker_pool
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def create_worker_pool(max_workers=None, activity='running tasks'):
+    """Create a process pool for CPU-bound work, or a thread pool where processes are unavailable
+    
+    Workers are forked: spawned workers re-import main.py, which would set up
+    Kivy and open a window in every worker. Where fork does not exist
+    (Windows) threads are used instead.
+    
+    Args:
+        max_workers (int): Number of workers, None for the CPU count
+        activity (str): What the pool does, for the fallback message
+    
+    Returns:
+        Executor: Process pool, or thread pool as fallback
+    """
+    try:
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise NotImplementedError("fork start method not available")
+        return ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context('fork')
+        )
+    except (ImportError, NotImplementedError, OSError) as e:
+        # Android's Python has no working multiprocessing semaphores
+        print(f"Process pool not available, {activity} in threads: {e}")
+        return ThreadPoolExecutor(max_workers=max_workers or 2)
+
+def get_worker_pool(max_workers=None):
+    """Get the pool shared by tile rendering, reports, chart export, imports and photo encoding
+    
+    The pool is created on the first call, which also sets its size. A
+    process pool forks all its workers right away: a child forked while
+    another thread holds a lock (stdout, an SQLite handle, the allocator) can
+    deadlock, so the app calls this before anything starts a thread.
+    
+    Args:
+        max_workers (int): Number of workers if the pool is created, None for the CPU count
+    
+    Returns:
+        Executor: The shared pool
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = create_worker_pool(max_workers, 'running CPU-bound tasks')
+            if isinstance(_shared_pool, ProcessPoolExecutor):
+                # The first task makes a fork pool start every worker
+                _shared_pool.submit(int)
+        return _shared_pool
+
+def shutdown_worker_pool():
+    """Stop the shared pool, cancelling tasks not yet started"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            _shared_pool.shutdown(wait=False, cancel_futures=True)
+            _shared_pool = None
@@ -0,0 +1,119 @@
+# Photo encoding benchmark
+#
+# Compares file size against encode time for the photo encoding settings.
+#
+# Usage: python tools/benchmark_photo_encoding.py [photo ...] [--repeat N] [--size WxH]
+#
+# Without photos a synthetic camera-like frame is used; real photos give more
+# representative sizes.
+
+import os
+import sys
+import io
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+from PIL import Image
+from photo_encoder import get_save_options, build_exif, build_xmp
+from photo_overlay import OverlayCompositor
+from models.signal_data import SignalData
+
+# Settings compared, from PIL's defaults to the slowest/smallest options
+SETTINGS = (
+    ('PIL default JPEG (q75)', {'format': 'JPEG', 'quality': 75, 'optimize': False, 'progressive': False}),
+    ('JPEG q85', {'format': 'JPEG', 'quality': 85, 'optimize': False, 'progressive': False}),
+    ('JPEG q85 optimize', {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': False}),
+    ('JPEG q85 optimize progressive', {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}),
+    ('JPEG q75 optimize', {'format': 'JPEG', 'quality': 75, 'optimize': True, 'progressive': False}),
+    ('JPEG q75 optimize progressive', {'format': 'JPEG', 'quality': 75, 'optimize': True, 'progressive': True}),
+    ('JPEG q60 optimize progressive', {'format': 'JPEG', 'quality': 60, 'optimize': True, 'progressive': True}),
+    ('WebP q75 method 0', {'format': 'WEBP', 'quality': 75, 'method': 0}),
+    ('WebP q75 method 4', {'format': 'WEBP', 'quality': 75, 'method': 4}),
+    ('WebP q60 method 4', {'format': 'WEBP', 'quality': 60, 'method': 4})
+)
+
+def synthetic_frame(width, height):
+    """Get a camera-like test frame: smooth gradients, edges and sensor noise"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    red = 128 + 100 * np.sin(x / width * 6.0) * np.cos(y / height * 3.0)
+    green = 128 + 90 * np.sin((x + y) / (width + height) * 9.0)
+    blue = 255.0 * y / height
+    pixels = np.stack([red, green, blue], axis=-1)
+    
+    # Hard-edged blocks stand in for buildings and signs
+    for _ in range(40):
+        x0, y0 = rng.integers(0, width - 40), rng.integers(0, height - 40)
+        pixels[y0:y0 + rng.integers(20, height // 4), x0:x0 + rng.integers(20, width // 4)] = rng.integers(0, 255, 3)
+    
+    pixels += rng.normal(0, 6, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGB')
+
+def sample_reading():
+    """Get a representative reading for the overlay and metadata"""
+    signal_data = SignalData()
+    signal_data.network_type = '5G'
+    signal_data.operator = 'China Mobile'
+    signal_data.nr_cgi = '460-00-123456789'
+    signal_data.nr_pci = 256
+    signal_data.nr_band = 'n78'
+    signal_data.rsrp = -92
+    signal_data.rsrq = -11
+    signal_data.sinr = 14
+    signal_data.latitude = 39.9042
+    signal_data.longitude = 116.4074
+    signal_data.location_description = '北京市东城区'
+    signal_data.timestamp = '2024-05-01 10:30:00'
+    return signal_data
+
+def benchmark(image, signal_dict, encoding, repeat):
+    """Get (bytes, best encode time in ms) of one setting"""
+    image_format, options = get_save_options(encoding)
+    options['exif'] = build_exif(signal_dict)
+    options['xmp'] = build_xmp(signal_dict)
+    
+    best = None
+    size = 0
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        image.save(buffer, image_format, **options)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        size = buffer.tell()
+    return size, best * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare photo encoding settings')
+    parser.add_argument('photos', nargs='*', help='Photos to encode (default: synthetic frame)')
+    parser.add_argument('--repeat', type=int, default=5, help='Encodes per setting, best time is reported')
+    parser.add_argument('--size', default='1920x1080', help='Synthetic frame size, WxH')
+    args = parser.parse_args()
+    
+    if args.photos:
+        images = [(os.path.basename(path), Image.open(path).convert('RGB')) for path in args.photos]
+    else:
+        width, height = (int(value) for value in args.size.lower().split('x'))
+        images = [(f'synthetic {width}x{height}', synthetic_frame(width, height))]
+    
+    signal_data = sample_reading()
+    signal_dict = signal_data.to_dict()
+    compositor = OverlayCompositor()
+    
+    for name, image in images:
+        compositor.apply(image, signal_data)
+        print(f"\n{name}")
+        print(f"{'Setting':<32}{'Size (KB)':>12}{'Encode (ms)':>14}{'vs default':>12}")
+        
+        baseline = None
+        for label, encoding in SETTINGS:
+            size, elapsed = benchmark(image, signal_dict, encoding, args.repeat)
+            if baseline is None:
+                baseline = size
+            print(f"{label:<32}{size / 1024:>12.1f}{elapsed:>14.1f}{size / baseline:>12.0%}")
+
+if __name__ == '__main__':
+    main()
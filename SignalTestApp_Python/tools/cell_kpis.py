@@ -0,0 +1,69 @@
+# Per-cell KPI report
+#
+# Ranks serving cells by a KPI, or combines cells and days into one
+# distribution, from the KPI tables the app keeps up to date.
+#
+# Usage: python tools/cell_kpis.py [--metric rsrp] [--statistic p50] [--worst] [--limit N]
+#        python tools/cell_kpis.py --merge [--cells CELL ...] [--periods YYYY-MM-DD ...]
+#
+# The database is DIR/signal_test.db (--data-dir, default: the current directory).
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from kpi_engine import KPI_COLUMNS, KPI_STATISTICS
+
+def print_ranking(kpi_engine, args):
+    """Print cells ranked by one KPI"""
+    cells = kpi_engine.get_top_cells(
+        args.metric, args.statistic, limit=args.limit, worst=args.worst, min_samples=args.min_samples
+    )
+    print(f"{'Cell':<28}{'Type':<6}{'Samples':>9}{'Last seen':>21}{args.metric + ' ' + args.statistic:>14}")
+    for cell in cells:
+        print(f"{cell['cell']:<28}{cell['network_type'] or '':<6}{cell['sample_count']:>9}"
+              f"{cell['last_seen']:>21}{cell[f'{args.metric}_{args.statistic}']:>14.1f}")
+
+def print_merged(kpi_engine, args):
+    """Print the statistics of cells and periods merged into one distribution"""
+    print(f"Periods: {', '.join(args.periods) if args.periods else 'all time'}")
+    print(f"Cells: {', '.join(args.cells) if args.cells else 'all'}")
+    for column in KPI_COLUMNS:
+        stats = kpi_engine.merge_sketches(column, cells=args.cells, periods=args.periods).get_stats()
+        if not stats['count']:
+            print(f"{column:<6}no readings")
+            continue
+        print(f"{column:<6}count={stats['count']}" + ''.join(
+            f"  {statistic}={stats[statistic]:.1f}" for statistic in KPI_STATISTICS if statistic != 'count'
+        ))
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank cells by KPI or merge cell distributions')
+    parser.add_argument('--data-dir', default='.', help='Directory of signal_test.db')
+    parser.add_argument('--metric', default='rsrp', choices=KPI_COLUMNS)
+    parser.add_argument('--statistic', default='p50', choices=KPI_STATISTICS)
+    parser.add_argument('--worst', action='store_true', help='Lowest values first')
+    parser.add_argument('--limit', type=int, default=20, help='Cells listed')
+    parser.add_argument('--min-samples', type=int, default=10, help='Leave out cells with fewer readings')
+    parser.add_argument('--merge', action='store_true', help='Merge distributions instead of ranking')
+    parser.add_argument('--cells', nargs='+', default=None, help='Cells to merge (default: all)')
+    parser.add_argument('--periods', nargs='+', default=None, help='Days to merge (default: all time)')
+    args = parser.parse_args()
+    
+    os.chdir(args.data_dir)
+    
+    from storage_utils import StorageUtils
+    from kpi_engine import KpiEngine
+    
+    kpi_engine = KpiEngine(StorageUtils())
+    if kpi_engine.needs_rebuild:
+        kpi_engine.rebuild()
+    if args.merge:
+        print_merged(kpi_engine, args)
+    else:
+        print_ranking(kpi_engine, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Coverage bins of an area
+#
+# Prints the aggregated coverage of the map tiles covering a bounding box, or
+# writes them as GeoJSON polygons (e.g. to open in QGIS or geojson.io), from
+# the heatmap bins the app keeps up to date.
+#
+# Usage: python tools/coverage_bins.py MIN_LAT MIN_LON MAX_LAT MAX_LON [--zoom Z] [--geojson FILE]
+#
+# The database is DIR/signal_test.db (--data-dir, default: the current directory).
+# Zooms are snapped down to the nearest stored level (10, 12, 14 or 16).
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+def to_feature(tile):
+    """Get a GeoJSON polygon feature of a bin"""
+    min_lat, min_lon, max_lat, max_lon = tile['bounds']
+    return {
+        'type': 'Feature',
+        'geometry': {
+            'type': 'Polygon',
+            'coordinates': [[
+                [min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat],
+                [min_lon, max_lat], [min_lon, min_lat]
+            ]]
+        },
+        'properties': {
+            key: tile[key] for key in ('zoom', 'x', 'y', 'sample_count', 'avg_rsrp', 'avg_rssi')
+        }
+    }
+
+def format_average(value):
+    """Format a bin average, '-' for bins without that measurement"""
+    return f"{value:.1f}" if value is not None else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description='Print or export coverage bins of an area')
+    parser.add_argument('bounds', nargs=4, type=float, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'))
+    parser.add_argument('--zoom', type=int, default=14, help='Map zoom of the bins')
+    parser.add_argument('--geojson', default=None, help='Write the bins to this GeoJSON file')
+    parser.add_argument('--data-dir', default='.', help='Directory of signal_test.db')
+    args = parser.parse_args()
+    
+    geojson_path = os.path.abspath(args.geojson) if args.geojson else None
+    os.chdir(args.data_dir)
+    
+    from storage_utils import StorageUtils
+    from heatmap_engine import HeatmapEngine
+    
+    heatmap_engine = HeatmapEngine(StorageUtils())
+    if heatmap_engine.needs_rebuild:
+        heatmap_engine.rebuild()
+    tiles = heatmap_engine.query_viewport(*args.bounds, args.zoom)
+    tiles.sort(key=lambda tile: (tile['y'], tile['x']))
+    
+    if geojson_path:
+        with open(geojson_path, 'w') as f:
+            json.dump({'type': 'FeatureCollection', 'features': [to_feature(tile) for tile in tiles]}, f)
+        print(f"{len(tiles)} bins written to {geojson_path}")
+        return
+    
+    print(f"Zoom {heatmap_engine.resolve_zoom(args.zoom)}, {len(tiles)} bins")
+    print(f"{'X':>8}{'Y':>8}{'Samples':>10}{'RSRP':>9}{'RSSI':>9}")
+    for tile in tiles:
+        print(f"{tile['x']:>8}{tile['y']:>8}{tile['sample_count']:>10}"
+              f"{format_average(tile['avg_rsrp']):>9}{format_average(tile['avg_rssi']):>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# Route export of a test session
+#
+# Writes the route of a recorded session as GeoJSON or KML lines colored by
+# signal quality, simplified for a map zoom, e.g. to open in Google Earth,
+# QGIS or geojson.io.
+#
+# Usage: python tools/export_track.py SESSION_ID FILE [--zoom Z] [--start TIME] [--end TIME]
+#
+# The format follows FILE's extension (.kml, otherwise GeoJSON). Without --zoom
+# every sample is kept. The database is DIR/signal_test.db (--data-dir,
+# default: the current directory); generate_report.py lists the sessions.
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a test session's route as GeoJSON or KML")
+    parser.add_argument('session_id', type=int, help='Session to export')
+    parser.add_argument('file', help='Output .kml or .geojson file')
+    parser.add_argument('--zoom', type=int, default=None, help='Map zoom to simplify for (default: all samples)')
+    parser.add_argument('--start', default=None, help="Leave out samples before 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument('--end', default=None, help="Leave out samples after 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument('--data-dir', default='.', help='Directory of signal_test.db')
+    args = parser.parse_args()
+    
+    file_path = os.path.abspath(args.file)
+    os.chdir(args.data_dir)
+    
+    from storage_utils import StorageUtils
+    from track_geometry import TrackGeometry
+    
+    track_geometry = TrackGeometry(StorageUtils())
+    if file_path.lower().endswith('.kml'):
+        export = track_geometry.export_kml
+    else:
+        export = track_geometry.export_geojson
+    
+    if not export(file_path, args.session_id, args.start, args.end, zoom=args.zoom):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
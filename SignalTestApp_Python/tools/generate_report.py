@@ -0,0 +1,66 @@
+# Drive-test report generation
+#
+# Lists the recorded test sessions, or writes an HTML (and optionally PDF)
+# report of one or more of them, e.g. to hand over a drive from a laptop.
+#
+# Usage: python tools/generate_report.py [SESSION_ID ...] [--pdf] [--data-dir DIR]
+#
+# Without session ids the sessions are listed. Reports are written to
+# DIR/reports, the same place the app uses.
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+def main():
+    parser = argparse.ArgumentParser(description='List test sessions or write a report of them')
+    parser.add_argument('session_ids', nargs='*', type=int, help='Sessions to cover (default: list sessions)')
+    parser.add_argument('--pdf', action='store_true', help='Also write a PDF')
+    parser.add_argument('--data-dir', default='.', help='Directory of signal_test.db')
+    parser.add_argument('--limit', type=int, default=50, help='Sessions listed')
+    args = parser.parse_args()
+    
+    os.chdir(args.data_dir)
+    
+    # Workers are forked before the storage starts its migration thread
+    from worker_pool import get_worker_pool, shutdown_worker_pool
+    get_worker_pool()
+    
+    from storage_utils import StorageUtils
+    from event_engine import EventEngine
+    from session_manager import SessionManager
+    from report_generator import ReportGenerator
+    
+    storage_utils = StorageUtils()
+    session_manager = SessionManager(storage_utils)
+    if session_manager.needs_rebuild:
+        session_manager.rebuild()
+    
+    if not args.session_ids:
+        print(f"{'Id':>5}  {'Name':<30}{'Start':<21}{'Samples':>9}{'Km':>8}")
+        for session in session_manager.get_sessions(limit=args.limit):
+            print(f"{session['id']:>5}  {session['name'][:28]:<30}{session['start_time']:<21}"
+                  f"{session['sample_count']:>9}{session['distance'] / 1000.0:>8.1f}")
+        return
+    
+    event_engine = EventEngine(storage_utils)
+    if event_engine.needs_rebuild:
+        event_engine.rebuild()
+    
+    report_generator = ReportGenerator(storage_utils, session_manager, event_engine)
+    try:
+        paths = report_generator.generate_report(args.session_ids, pdf=args.pdf).result()
+    finally:
+        report_generator.shutdown()
+        shutdown_worker_pool()
+    
+    if not paths['html']:
+        sys.exit(1)
+    for path in paths.values():
+        if path:
+            print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Bulk import of exported samples
+#
+# Merges CSV/XLSX files written by the app's export functions into a database,
+# e.g. to combine the exports of several devices on a laptop. Samples already
+# in the database and files imported before are skipped.
+#
+# Usage: python tools/import_exports.py FILE [FILE ...] [--data-dir DIR] [--workers N]
+#
+# The database is DIR/signal_test.db (default: the current directory, as the
+# desktop app uses). Heatmap, KPI, event and session tables are rebuilt once
+# after the import, and cached map tiles and report images are deleted.
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+def main():
+    parser = argparse.ArgumentParser(description='Import exported CSV/XLSX samples')
+    parser.add_argument('files', nargs='+', help='Files written by the export functions')
+    parser.add_argument('--data-dir', default='.', help='Directory of signal_test.db')
+    parser.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    args = parser.parse_args()
+    
+    files = [os.path.abspath(path) for path in args.files]
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.chdir(args.data_dir)
+    
+    # Workers are forked before the storage starts its migration thread
+    from worker_pool import get_worker_pool, shutdown_worker_pool
+    get_worker_pool(args.workers)
+    
+    from storage_utils import StorageUtils
+    from heatmap_engine import HeatmapEngine
+    from kpi_engine import KpiEngine
+    from event_engine import EventEngine
+    from session_manager import SessionManager
+    from tile_renderer import TileRenderer
+    from report_generator import ReportGenerator
+    from data_importer import DataImporter
+    
+    storage_utils = StorageUtils()
+    
+    # The engines register import listeners that rebuild their tables, the
+    # renderers ones that delete their caches
+    session_manager = SessionManager(storage_utils)
+    event_engine = EventEngine(storage_utils)
+    engines = [HeatmapEngine(storage_utils), KpiEngine(storage_utils), event_engine, session_manager]
+    renderers = [TileRenderer(storage_utils), ReportGenerator(storage_utils, session_manager, event_engine)]
+    importer = DataImporter(storage_utils, max_workers=args.workers)
+    
+    failed = False
+    try:
+        print(f"{'File':<40}{'Inserted':>10}{'Duplicates':>12}{'Rejected':>10}{'Seconds':>9}")
+        for path in files:
+            start = time.perf_counter()
+            result = importer.import_file_sync(path)
+            elapsed = time.perf_counter() - start
+            
+            name = os.path.basename(path)
+            if 'error' in result:
+                failed = True
+                print(f"{name:<40}  failed: {result['error']}")
+            elif result['skipped']:
+                print(f"{name:<40}  already imported")
+            else:
+                print(f"{name:<40}{result['inserted']:>10}{result['duplicates']:>12}"
+                      f"{result['rejected']:>10}{elapsed:>9.1f}")
+    finally:
+        importer.shutdown()
+        shutdown_worker_pool()
+    
+    # Tables new to this database are built here if no import rebuilt them
+    for engine in engines:
+        if engine.needs_rebuild:
+            engine.rebuild()
+    
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Startup timing harness
+#
+# Starts the app several times and reports how long imports, build, the first
+# frame and the deferred services took, from the startup_timer marks.
+#
+# Usage: python tools/measure_startup.py [--runs N]
+#
+# On Android, read the "Startup timing:" line the app prints to logcat instead.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+from startup_timer import STARTUP_LOG_ENV
+
+def run_once(timeout):
+    """Start the app once and get (startup marks, wall time to exit in ms)"""
+    fd, log_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    env = dict(os.environ, **{STARTUP_LOG_ENV: log_path})
+    
+    try:
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, 'main.py'], cwd=SRC_DIR, env=env, timeout=timeout,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        )
+        wall_time = (time.perf_counter() - start) * 1000.0
+        
+        with open(log_path) as f:
+            content = f.read()
+        return (json.loads(content) if content else None), wall_time
+    finally:
+        os.remove(log_path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app cold start')
+    parser.add_argument('--runs', type=int, default=5, help='Number of app starts')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds before a run is aborted')
+    args = parser.parse_args()
+    
+    results = []
+    for run in range(args.runs):
+        marks, wall_time = run_once(args.timeout)
+        if marks is None:
+            print(f"Run {run + 1}: no startup log written (app failed to start?)")
+            continue
+        marks['process exit'] = wall_time
+        results.append(marks)
+        print(f"Run {run + 1}: " + ", ".join(f"{label} {elapsed:.0f} ms" for label, elapsed in marks.items()))
+    
+    if not results:
+        return 1
+    
+    print(f"\n{'Step':<20}{'Median (ms)':>12}{'Min (ms)':>12}{'Max (ms)':>12}")
+    for label in results[0]:
+        values = sorted(marks[label] for marks in results if label in marks)
+        median = values[len(values) // 2]
+        print(f"{label:<20}{median:>12.0f}{values[0]:>12.0f}{values[-1]:>12.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())